@@ -0,0 +1,300 @@
+"""Micro-benchmarks of the Markdown converter.
+
+Times parse_inline, Post.from_markdown, iter_markdown_nodes (streaming from a file
+object, the nodes discarded as they come) and Post.get_draft on synthetic corpora
+(see corpus.py) and reports, for each function and size, the best time of the runs, the
+throughput in blocks/s and MB/s and the peak memory allocated during one run.
+
+    python -m benchmarks.bench_converter --sizes small medium large --json before.json
+    python -m benchmarks.bench_converter --json after.json --compare before.json
+
+Peak memory is measured with tracemalloc in a separate run, as tracing slows the
+code down. With --compare the exit status is 1 when a function got slower, or used
+more memory, than the threshold allows.
+"""
+
+import argparse
+import datetime
+import functools
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from substack.post import Post, iter_markdown_nodes, parse_inline
+
+from .corpus import SIZES, Corpus, corpus
+
+DEFAULT_SIZES = ("small", "medium", "large")
+
+# peak memory increases below this many bytes are not reported as regressions
+MEMORY_NOISE = 64 * 1024
+
+
+class Case(NamedTuple):
+    """A benchmarked function on a corpus.
+
+    prepare builds the input of one run, outside of the timing, and returns the
+    callable to time.
+    """
+
+    function: str
+    blocks: int
+    bytes: int
+    prepare: Callable[[], Callable[[], object]]
+
+
+def _new_post() -> Post:
+    return Post(title="Benchmark", subtitle="", user_id=1)
+
+
+def cases(data: Corpus) -> List[Case]:
+    """The benchmarked functions, with the blocks and bytes each run processes."""
+    texts = data.inline_texts
+
+    def parse_all():
+        for text in texts:
+            parse_inline(text)
+
+    def convert():
+        return _new_post().from_markdown(data.markdown)
+
+    post = convert()
+
+    def prepare_stream():
+        file = io.StringIO(data.markdown)
+        return lambda: deque(iter_markdown_nodes(file), maxlen=0)
+
+    draft_bytes = len(post.get_draft()["draft_body"].encode())
+
+    return [
+        Case(
+            "parse_inline",
+            len(texts),
+            sum(len(text.encode()) for text in texts),
+            lambda: parse_all,
+        ),
+        Case(
+            "from_markdown",
+            data.blocks,
+            len(data.markdown.encode()),
+            lambda: functools.partial(_new_post().from_markdown, data.markdown),
+        ),
+        Case(
+            "iter_markdown_nodes",
+            data.blocks,
+            len(data.markdown.encode()),
+            prepare_stream,
+        ),
+        Case("get_draft", data.blocks, draft_bytes, lambda: post.get_draft),
+    ]
+
+
+def _best_time(case: Case, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        run = case.prepare()
+        # like timeit, keep the collector from adding noise to the timing
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        finally:
+            if gc_enabled:
+                gc.enable()
+        best = min(best, elapsed)
+    return best
+
+
+def _peak_memory(case: Case) -> int:
+    run = case.prepare()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(case: Case, data: Corpus, repeat: int, memory: bool = True) -> Dict:
+    """Benchmark one case.
+
+    Returns:
+        The function, size, blocks, bytes, best seconds, blocks_per_s, mb_per_s and
+        peak_memory (bytes, None without memory).
+    """
+    seconds = _best_time(case, repeat)
+    return {
+        "function": case.function,
+        "size": data.name,
+        "blocks": case.blocks,
+        "bytes": case.bytes,
+        "seconds": seconds,
+        "blocks_per_s": case.blocks / seconds,
+        "mb_per_s": case.bytes / seconds / 1e6,
+        "peak_memory": _peak_memory(case) if memory else None,
+    }
+
+
+def run_benchmarks(
+    sizes=DEFAULT_SIZES,
+    repeat: int = 5,
+    seed: int = 0,
+    functions: Optional[List[str]] = None,
+    memory: bool = True,
+) -> Dict:
+    """Run the benchmarks.
+
+    Args:
+        sizes: corpus sizes, names of corpus.SIZES.
+        repeat: runs of each case, the best one is reported.
+        seed: seed of the corpus generator.
+        functions: names of the functions to benchmark, all by default.
+        memory: if False, skip the peak memory runs.
+
+    Returns:
+        {"environment": {...}, "settings": {...}, "results": [...]}, see measure.
+    """
+    results = []
+    for size in sizes:
+        data = corpus(size, seed)
+        for case in cases(data):
+            if functions and case.function not in functions:
+                continue
+            results.append(measure(case, data, repeat, memory))
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "settings": {"sizes": list(sizes), "repeat": repeat, "seed": seed},
+        "results": results,
+    }
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = 0.1) -> List[str]:
+    """Compare a report with a baseline report.
+
+    Args:
+        report: the current results, from run_benchmarks.
+        baseline: earlier results, from run_benchmarks.
+        threshold: relative increase of the time or peak memory counted as a
+            regression, 0.1 is 10%.
+
+    Returns:
+        The regressions, as printable lines.
+    """
+    previous = {(r["function"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["function"], result["size"]))
+        if before is None:
+            continue
+        for metric in ("seconds", "peak_memory"):
+            if not before.get(metric) or result.get(metric) is None:
+                continue
+            ratio = result[metric] / before[metric]
+            if metric == "peak_memory":
+                if result[metric] - before[metric] < MEMORY_NOISE:
+                    continue
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{result['function']} {result['size']}: {metric} "
+                    f"{before[metric]:.6g} -> {result[metric]:.6g} ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def format_table(report: Dict, baseline: Optional[Dict] = None) -> str:
+    previous = {}
+    if baseline is not None:
+        previous = {(r["function"], r["size"]): r for r in baseline["results"]}
+    header = (
+        f"{'function':<20} {'size':<7} {'blocks':>7} {'ms':>10} {'blocks/s':>11} "
+        f"{'MB/s':>8} {'peak MiB':>9}"
+    )
+    if previous:
+        header += f" {'speedup':>8}"
+    lines = [header]
+    for r in report["results"]:
+        peak = r["peak_memory"]
+        line = (
+            f"{r['function']:<20} {r['size']:<7} {r['blocks']:>7} "
+            f"{r['seconds'] * 1000:>10.2f} {r['blocks_per_s']:>11.0f} "
+            f"{r['mb_per_s']:>8.2f} "
+            f"{peak / 2**20 if peak is not None else float('nan'):>9.2f}"
+        )
+        before = previous.get((r["function"], r["size"]))
+        if before is not None:
+            line += f" {before['seconds'] / r['seconds']:>7.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(SIZES),
+        default=list(DEFAULT_SIZES),
+        help="corpus sizes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--functions",
+        nargs="+",
+        choices=["parse_inline", "from_markdown", "iter_markdown_nodes", "get_draft"],
+        help="functions to benchmark (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each case")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the peak memory runs"
+    )
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="JSON results to compare with"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown reported as a regression (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.sizes, args.repeat, args.seed, args.functions, not args.no_memory
+    )
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print(format_table(report, baseline))
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Benchmark of the incremental re-conversion of an edited document.
+
+Converts a corpus once with IncrementalConverter, then times the update after
+editing one block, inserting one and deleting one, against a full from_markdown.
+
+    python -m benchmarks.bench_incremental --sizes medium large --json incremental.json
+"""
+
+import argparse
+import json
+import sys
+
+from substack.convert import IncrementalConverter
+
+from .bench_converter import Case, _best_time, _new_post
+from .corpus import SIZES, corpus, generate
+
+EDITS = ("edit", "insert", "delete")
+
+
+def _edited(markdown: str, edit: str, seed: int) -> str:
+    blocks = markdown.split("\n\n")
+    middle = len(blocks) // 2
+    replacement = generate(1, seed + 1).markdown
+    if edit == "edit":
+        blocks[middle] = replacement
+    elif edit == "insert":
+        blocks.insert(middle, replacement)
+    else:
+        del blocks[middle]
+    return "\n\n".join(blocks)
+
+
+def run_incremental(sizes=("medium", "large"), repeat: int = 5, seed: int = 0):
+    """Time a full conversion and the update after each kind of edit.
+
+    Returns:
+        [{"size", "blocks", "full", "edit", "insert", "delete"}] in seconds, with the
+        speedup of each update over the full conversion.
+    """
+    results = []
+    for size in sizes:
+        data = corpus(size, seed)
+        full = _best_time(
+            Case(
+                "from_markdown",
+                data.blocks,
+                0,
+                lambda: lambda: _new_post().from_markdown(data.markdown),
+            ),
+            repeat,
+        )
+        result = {"size": size, "blocks": data.blocks, "full": full}
+        for edit in EDITS:
+            edited = _edited(data.markdown, edit, seed)
+
+            def prepare():
+                converter = IncrementalConverter(_new_post())
+                converter.update(data.markdown)
+                return lambda: converter.update(edited)
+
+            seconds = _best_time(Case(edit, data.blocks, 0, prepare), repeat)
+            result[edit] = seconds
+            result[f"{edit}_speedup"] = full / seconds
+        results.append(result)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(SIZES),
+        default=["medium", "large"],
+        help="corpus sizes (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each case")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_incremental(args.sizes, args.repeat, args.seed)
+    print(
+        f"{'size':<7} {'blocks':>7} {'full ms':>9}"
+        + "".join(f" {edit + ' ms':>10} {'speedup':>8}" for edit in EDITS)
+    )
+    for r in results:
+        print(
+            f"{r['size']:<7} {r['blocks']:>7} {r['full'] * 1000:>9.2f}"
+            + "".join(
+                f" {r[edit] * 1000:>10.2f} {r[edit + '_speedup']:>7.1f}x"
+                for edit in EDITS
+            )
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Benchmark of parse_inline on paragraphs dense in inline marks.
+
+Times parse_inline on single paragraphs of 100 to 20k bold, italic and link spans,
+flat and with nested marks, and fits the time/marks exponent (see bench_scaling).
+
+    python -m benchmarks.bench_inline --json inline.json
+
+The exit status is 1 when an exponent is above --max-exponent.
+"""
+
+import argparse
+import json
+import sys
+
+from substack.post import parse_inline
+
+from .bench_converter import Case, _best_time
+from .bench_scaling import exponent
+from .corpus import dense_paragraph
+
+DEFAULT_MARKS = (100, 1_000, 5_000, 20_000)
+
+
+def run_inline(marks=DEFAULT_MARKS, repeat: int = 5, seed: int = 0) -> dict:
+    """Time parse_inline on flat and nested paragraphs of every size.
+
+    Returns:
+        {"flat" | "nested": {"marks": [...], "seconds": [...], "marks_per_s": [...],
+        "mb_per_s": [...], "exponent": ...}}
+    """
+    results = {}
+    for variant in ("flat", "nested"):
+        result = results[variant] = {
+            "marks": [],
+            "seconds": [],
+            "marks_per_s": [],
+            "mb_per_s": [],
+        }
+        for count in marks:
+            text = dense_paragraph(count, seed, nested=variant == "nested")
+            size = len(text.encode())
+            seconds = _best_time(
+                Case("parse_inline", count, size, lambda: lambda: parse_inline(text)),
+                repeat,
+            )
+            result["marks"].append(count)
+            result["seconds"].append(seconds)
+            result["marks_per_s"].append(count / seconds)
+            result["mb_per_s"].append(size / seconds / 1e6)
+        result["exponent"] = exponent(result["marks"], result["seconds"])
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--marks",
+        nargs="+",
+        type=int,
+        default=list(DEFAULT_MARKS),
+        help="inline marks per paragraph (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each size")
+    parser.add_argument("--seed", type=int, default=0, help="paragraph seed")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        default=1.25,
+        help="highest exponent accepted as linear (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_inline(args.marks, args.repeat, args.seed)
+    status = 0
+    for variant, result in results.items():
+        rates = " ".join(f"{rate:.2f}" for rate in result["mb_per_s"])
+        print(
+            f"{variant:<7} exponent {result['exponent']:.2f}  "
+            f"MB/s at {result['marks']} marks: {rates}"
+        )
+        if result["exponent"] > args.max_exponent:
+            print(
+                f"regression: parse_inline is not linear ({variant})", file=sys.stderr
+            )
+            status = 1
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
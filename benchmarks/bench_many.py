@@ -0,0 +1,87 @@
+"""Benchmark of the process-pool batch conversion.
+
+Converts a batch of documents with convert_markdown_many for each number of
+workers and reports documents/s, MB/s and the speedup over one worker.
+
+    python -m benchmarks.bench_many --documents 500 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from substack.convert import convert_markdown_many
+
+from .corpus import generate
+
+
+def run_many(
+    documents: int = 200,
+    blocks: int = 200,
+    workers=(1, 2, 4),
+    chunksize: int = 16,
+    seed: int = 0,
+) -> dict:
+    """Time the conversion of the same batch with each number of workers.
+
+    Returns:
+        {"documents", "blocks", "bytes", "results": [{"workers", "seconds",
+        "documents_per_s", "mb_per_s", "speedup"}]}
+    """
+    batch = [generate(blocks, seed + index).markdown for index in range(documents)]
+    size = sum(len(markdown.encode()) for markdown in batch)
+    results = []
+    for count in workers:
+        started = time.perf_counter()
+        convert_markdown_many(batch, workers=count, chunksize=chunksize)
+        seconds = time.perf_counter() - started
+        results.append(
+            {
+                "workers": count,
+                "seconds": seconds,
+                "documents_per_s": documents / seconds,
+                "mb_per_s": size / seconds / 1e6,
+                "speedup": results[0]["seconds"] / seconds if results else 1.0,
+            }
+        )
+    return {"documents": documents, "blocks": blocks, "bytes": size, "results": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--documents", type=int, default=200, help="batch size")
+    parser.add_argument("--blocks", type=int, default=200, help="blocks per document")
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=int,
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="numbers of workers to compare, the first one is the reference",
+    )
+    parser.add_argument("--chunksize", type=int, default=16, help="documents per chunk")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_many(
+        args.documents, args.blocks, args.workers, args.chunksize, args.seed
+    )
+    print(f"{args.documents} documents of {args.blocks} blocks, {os.cpu_count()} cpus")
+    print(f"{'workers':>7} {'seconds':>9} {'docs/s':>9} {'MB/s':>8} {'speedup':>8}")
+    for r in report["results"]:
+        print(
+            f"{r['workers']:>7} {r['seconds']:>9.2f} {r['documents_per_s']:>9.1f} "
+            f"{r['mb_per_s']:>8.2f} {r['speedup']:>7.2f}x"
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Scaling benchmark of the draft builder.
+
+Times building posts of growing sizes, up to 100k blocks, and fits the exponent of
+time ~ blocks**exponent: about 1 when the cost per block stays constant, 2 when
+the builder is quadratic.
+
+    python -m benchmarks.bench_scaling --json scaling.json
+
+The exit status is 1 when an exponent is above --max-exponent.
+"""
+
+import argparse
+import functools
+import json
+import math
+import sys
+from typing import Dict, List
+
+from substack.post import Post
+
+from .bench_converter import Case, _best_time, _new_post
+from .corpus import generate
+
+DEFAULT_BLOCKS = (1_000, 5_000, 20_000, 100_000)
+
+_PARAGRAPH = [
+    {"content": "Some "},
+    {"content": "bold", "marks": [{"type": "strong"}]},
+    {"content": " text with "},
+    {"content": "a link", "marks": [{"type": "link", "href": "https://example.com"}]},
+]
+
+
+def _build(post: Post, blocks: int):
+    # the builder api alone, without the Markdown parsing
+    for index in range(blocks):
+        kind = index % 4
+        if kind == 0:
+            post.heading("Section", level=2)
+        elif kind == 1:
+            post.blockquote("A *quoted* line")
+        else:
+            post.paragraph(_PARAGRAPH)
+
+
+def _cases(blocks: int, seed: int) -> List[Case]:
+    markdown = generate(blocks, seed).markdown
+    return [
+        Case(
+            "builder",
+            blocks,
+            0,
+            lambda: functools.partial(_build, _new_post(), blocks),
+        ),
+        Case(
+            "from_markdown",
+            blocks,
+            len(markdown.encode()),
+            lambda: functools.partial(_new_post().from_markdown, markdown),
+        ),
+    ]
+
+
+def exponent(blocks: List[int], seconds: List[float]) -> float:
+    """Least squares slope of log(seconds) against log(blocks)."""
+    xs = [math.log(n) for n in blocks]
+    ys = [math.log(s) for s in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return covariance / sum((x - mean_x) ** 2 for x in xs)
+
+
+def run_scaling(blocks=DEFAULT_BLOCKS, repeat: int = 3, seed: int = 0) -> Dict:
+    """Time every function at every size.
+
+    Returns:
+        {function: {"blocks": [...], "seconds": [...], "us_per_block": [...],
+        "exponent": ...}}
+    """
+    results: Dict[str, Dict] = {}
+    for count in blocks:
+        for case in _cases(count, seed):
+            result = results.setdefault(
+                case.function, {"blocks": [], "seconds": [], "us_per_block": []}
+            )
+            seconds = _best_time(case, repeat)
+            result["blocks"].append(count)
+            result["seconds"].append(seconds)
+            result["us_per_block"].append(seconds / count * 1e6)
+    for result in results.values():
+        result["exponent"] = exponent(result["blocks"], result["seconds"])
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--blocks",
+        nargs="+",
+        type=int,
+        default=list(DEFAULT_BLOCKS),
+        help="post sizes in blocks (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each size")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        default=1.25,
+        help="highest exponent accepted as linear (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_scaling(args.blocks, args.repeat, args.seed)
+    status = 0
+    for function, result in results.items():
+        per_block = " ".join(f"{us:.1f}" for us in result["us_per_block"])
+        print(
+            f"{function:<14} exponent {result['exponent']:.2f}  "
+            f"us/block at {result['blocks']}: {per_block}"
+        )
+        if result["exponent"] > args.max_exponent:
+            print(f"regression: {function} is not linear", file=sys.stderr)
+            status = 1
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Deterministic synthetic Markdown corpora for the benchmarks."""
+
+import random
+from typing import List, NamedTuple
+
+# number of Markdown blocks of each named corpus size
+SIZES = {
+    "small": 100,
+    "medium": 1_000,
+    "large": 10_000,
+    "xlarge": 100_000,
+}
+
+WORDS = (
+    "substack newsletter python publish draft writer reader paragraph markdown "
+    "latency throughput benchmark converter inline bold italic link image quote "
+    "code list heading section essay weekly issue subscriber archive"
+).split()
+
+LANGUAGES = ("python", "javascript", "bash", "")
+
+
+class Corpus(NamedTuple):
+    name: str
+    markdown: str
+    blocks: int
+    # the inline texts of the corpus (paragraphs, headings, list items, quotes)
+    inline_texts: List[str]
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _inline(rng: random.Random, words: int = 24) -> str:
+    """A line of text dense in inline marks: bold, italic, links and nested marks."""
+    parts = []
+    for _ in range(max(1, words // 4)):
+        kind = rng.randrange(6)
+        text = _words(rng, rng.randint(1, 3))
+        if kind == 0:
+            parts.append(f"**{text}**")
+        elif kind == 1:
+            parts.append(f"*{text}*")
+        elif kind == 2:
+            parts.append(f"[{text}](https://example.com/{rng.randrange(1000)})")
+        elif kind == 3:
+            parts.append(f"**{text} [{_words(rng, 1)}](https://example.com/)**")
+        else:
+            parts.append(text)
+    return " ".join(parts)
+
+
+def _block(rng: random.Random, index: int, texts: List[str]) -> str:
+    kind = rng.choices(
+        ("heading", "paragraph", "bullets", "quote", "code", "image", "linked_image"),
+        weights=(1, 8, 3, 2, 1, 1, 1),
+    )[0]
+    if kind == "heading":
+        text = _inline(rng, 6)
+        texts.append(text)
+        return f"{'#' * rng.randint(1, 6)} {text}"
+    if kind == "paragraph":
+        lines = [_inline(rng) for _ in range(rng.randint(1, 3))]
+        texts.extend(lines)
+        return "\n".join(lines)
+    if kind == "bullets":
+        items = [_inline(rng, 8) for _ in range(rng.randint(5, 40))]
+        texts.extend(items)
+        return "\n".join(f"{rng.choice('-*')} {item}" for item in items)
+    if kind == "quote":
+        lines = [_inline(rng) for _ in range(rng.randint(1, 4))]
+        texts.extend(lines)
+        return "\n".join(f"> {line}" for line in lines)
+    if kind == "code":
+        body = "\n".join(
+            f"    {_words(rng, rng.randint(2, 8))}" for _ in range(rng.randint(2, 20))
+        )
+        return f"```{rng.choice(LANGUAGES)}\n{body}\n```"
+    url = f"https://example.com/images/{index}.png"
+    if kind == "image":
+        return f"![{_words(rng, 2)}]({url})"
+    return f"[![{_words(rng, 2)}]({url})](https://example.com/{index})"
+
+
+def generate(blocks: int, seed: int = 0, name: str = "") -> Corpus:
+    """Generate a Markdown document of the given number of blocks."""
+    rng = random.Random(seed)
+    texts: List[str] = []
+    markdown = "\n\n".join(_block(rng, index, texts) for index in range(blocks))
+    return Corpus(name or str(blocks), markdown, blocks, texts)
+
+
+def corpus(size: str, seed: int = 0) -> Corpus:
+    """Generate one of the named corpora, see SIZES."""
+    return generate(SIZES[size], seed, size)
+
+
+def dense_paragraph(marks: int, seed: int = 0, nested: bool = False) -> str:
+    """A single paragraph with the given number of inline marks.
+
+    Args:
+        marks: number of bold, italic and link spans.
+        seed: seed of the generator.
+        nested: if True, some spans nest a mark in another, e.g. bold in a link.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for index in range(marks):
+        text = _words(rng, rng.randint(1, 3))
+        kind = index % (4 if nested else 3)
+        if kind == 0:
+            parts.append(f"**{text}**")
+        elif kind == 1:
+            parts.append(f"*{text}*")
+        elif kind == 2:
+            parts.append(f"[{text}](https://example.com/{index})")
+        else:
+            parts.append(f"[**{text}** {_words(rng, 1)}](https://example.com/{index})")
+        parts.append(_words(rng, rng.randint(0, 3)))
+    return " ".join(part for part in parts if part)
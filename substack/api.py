@@ -4,22 +4,59 @@ API Wrapper
 
 """
 
-import base64
 import json
 import logging
 import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urljoin, unquote
 
 import requests
 
+from substack import cancellation
 from substack.exceptions import SubstackAPIException, SubstackRequestException
+from substack.hooks import LoggingHook, call_hooks
+from substack.image_cache import ImageCache
+from substack.images import encode_image_form
+from substack.metrics import MetricsCollector
+from substack.ratelimit import RateLimiter
+from substack.retry import RetryPolicy, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
 __all__ = ["Api"]
 
 
+def _iter_pages(fetch_page, prefetch: bool = True):
+    """
+    Yield the items of successive pages, fetching the next page in the background.
+
+    Args:
+        fetch_page: callable taking a zero based page number and returning (items, more).
+        prefetch: if True, the next page is requested while the current one is consumed.
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    # background fetches run in the consumer's context, cancel scope included
+    fetch_page = cancellation.bind_context(fetch_page)
+    try:
+        page = 0
+        future = executor.submit(fetch_page, page) if prefetch else None
+        while True:
+            items, more = future.result() if prefetch else fetch_page(page)
+            page += 1
+            if more and prefetch:
+                future = executor.submit(fetch_page, page)
+            yield from items
+            if not more:
+                return
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
 class Api:
     """
 
@@ -36,6 +73,16 @@ class Api:
         publication_url=None,
         debug=False,
         cookies_string=None,
+        retry_policy: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        lazy: bool = False,
+        profile_ttl: float = 300.0,
+        bootstrap_path=None,
+        bootstrap_max_age: float = 24 * 3600,
+        image_cache: ImageCache = None,
+        hooks: list = None,
+        metrics: MetricsCollector = None,
+        timeout: float = 30.0,
     ):
         """
 
@@ -57,49 +104,276 @@ class Api:
           base_url:
             The base URL to use to contact the Substack API.
             Defaults to https://substack.com/api/v1.
+          retry_policy:
+            How 429s, server errors and connection errors are retried.
+            Defaults to RetryPolicy(), pass RetryPolicy(max_retries=0) to disable retries.
+          rate_limiter:
+            Optional RateLimiter applied to every request, retries included.
+            It can be shared between several Api instances.
+          lazy:
+            If True, the constructor makes no request: login and publication resolution
+            happen once, on the first call that needs them, even when several threads
+            make that first call at the same time.
+          profile_ttl:
+            Seconds the user profile is cached for. get_user_id, get_user_publications and
+            get_user_primary_publication all read from this one cached fetch.
+          bootstrap_path:
+            Path of a bootstrap snapshot (cookies, user id and resolved publication).
+            If a fresh snapshot exists the Api starts without any request, otherwise the
+            full handshake runs and its result is saved there. A snapshot whose session
+            gets rejected (401/403) is discarded and the handshake is done again.
+          bootstrap_max_age:
+            Seconds after which a snapshot is considered stale.
+          image_cache:
+            Optional ImageCache, so that get_image does not upload an unchanged image again.
+          hooks:
+            RequestHook objects notified of every HTTP attempt (on_request, on_response,
+            on_error). More can be added with add_hook.
+          metrics:
+            Optional MetricsCollector recording per-endpoint counts, statuses, bytes and
+            latency percentiles, available as api.metrics.
+          timeout:
+            Timeout in seconds of every request, for connecting and for each read of
+            the response, so that a stuck request cannot block its caller forever.
+            A request passing its own timeout keeps it.
         """
         self.base_url = base_url or "https://substack.com/api/v1"
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.image_cache = image_cache
+        self.metrics = metrics
+        self.timeout = timeout
+        self._hooks = list(hooks or [])
+        if metrics is not None:
+            self._hooks.append(metrics)
 
         if debug:
             logging.basicConfig()
             logging.getLogger().setLevel(logging.DEBUG)
+            self._hooks.append(LoggingHook())
+        # add_hook and remove_hook replace the list instead of changing it, so a
+        # request in flight keeps notifying the hooks it started with
+        self._hooks_lock = threading.Lock()
 
         self._session = requests.Session()
 
+        self._credentials = None
+        self._initial_cookies = None
+        self._target_publication_url = publication_url
+        self._publication = None
+        self._publication_url = None
+        self._user_id = None
+        self._bootstrap_path = bootstrap_path
+        self._from_snapshot = False
+        # incremented each time the session is replaced, see _discard_snapshot
+        self._session_generation = 0
+        self._bootstrap_lock = threading.RLock()
+        self._bootstrapped = False
+        self._bootstrapping = False
+
+        self.profile_ttl = profile_ttl
+        self._profile = None
+        self._profile_fetched_at = 0.0
+        # incremented by invalidate_user_profile, so a fetch in flight does not
+        # store a profile that was invalidated meanwhile
+        self._profile_generation = 0
+        # Future of the profile fetch in flight, which concurrent callers wait for
+        self._profile_fetch = None
+        self._profile_lock = threading.Lock()
+
+        self._tag_ids = {}
+        self._tags_lock = threading.Lock()
+        self._tag_create_lock = threading.Lock()
+
         # Load cookies from file if provided
         # Helps with Captcha errors by reusing cookies from "local" auth, then switching to running code in the cloud
         if cookies_path is not None:
             with open(cookies_path) as f:
-                cookies = json.load(f)
-            self._session.cookies.update(cookies)
+                self._initial_cookies = json.load(f)
+            self._session.cookies.update(self._initial_cookies)
 
         elif cookies_string is not None:
-            cookies = self._parse_cookies_string(cookies_string)
-            self._session.cookies.update(cookies)
+            self._initial_cookies = self._parse_cookies_string(cookies_string)
+            self._session.cookies.update(self._initial_cookies)
 
         elif email is not None and password is not None:
-            self.login(email, password)
-        else:
+            self._credentials = (email, password)
+
+        if bootstrap_path is not None:
+            self.load_bootstrap(bootstrap_path, max_age=bootstrap_max_age)
+
+        if (
+            self._initial_cookies is None
+            and self._credentials is None
+            and not self._from_snapshot
+        ):
             raise ValueError(
                 "Must provide email and password, cookies_path, or cookies_string to authenticate."
             )
 
-        user_publication = None
+        if not lazy:
+            self._ensure_bootstrapped()
+
+    @property
+    def publication_url(self):
+        """
+        API url of the current publication, resolved on first access in lazy mode.
+        """
+        self._ensure_bootstrapped()
+        return self._publication_url
+
+    @publication_url.setter
+    def publication_url(self, value):
+        self._publication_url = value
+
+    def _ensure_bootstrapped(self):
+        """
+        Login and resolve the publication, once.
+
+        Concurrent first calls wait for the thread doing the bootstrap; the requests
+        made by the bootstrap itself re-enter here and pass through.
+        """
+        if self._bootstrapped:
+            return
+        with self._bootstrap_lock:
+            if self._bootstrapped or self._bootstrapping:
+                return
+            self._bootstrapping = True
+            try:
+                self._bootstrap()
+                self._bootstrapped = True
+            finally:
+                self._bootstrapping = False
+            if self._bootstrap_path is not None:
+                try:
+                    self.save_bootstrap(self._bootstrap_path)
+                except OSError as ex:
+                    logger.warning("Could not save bootstrap snapshot: %s", ex)
+
+    def save_bootstrap(self, path):
+        """
+        Save a bootstrap snapshot, so that another process can start without any request.
+
+        The snapshot contains the session cookies, keep it private.
+
+        Args:
+            path: path of the json file.
+        """
+        self._ensure_bootstrapped()
+        snapshot = {
+            "version": 1,
+            "saved_at": time.time(),
+            "base_url": self.base_url,
+            "cookies": self._session.cookies.get_dict(),
+            "user_id": self.get_user_id(),
+            "publication": self._publication,
+            "publication_url": self._publication_url,
+        }
+        # write to a temporary file first, so that concurrent readers never see a partial snapshot
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(
+            os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+        ) as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def load_bootstrap(self, path, max_age: float = None) -> bool:
+        """
+        Restore the state saved by save_bootstrap, skipping login and publication resolution.
+
+        Args:
+            path: path of the json file.
+            max_age: seconds after which the snapshot is ignored as stale.
+
+        Returns:
+            True if the snapshot was applied, False if it is missing, stale or does not match
+            this Api (base url or requested publication).
+        """
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if snapshot.get("version") != 1 or snapshot.get("base_url") != self.base_url:
+            return False
+        if max_age is not None and time.time() - snapshot.get("saved_at", 0) > max_age:
+            return False
+        publication = snapshot.get("publication")
+        if not publication or not snapshot.get("publication_url"):
+            return False
+        if self._target_publication_url and not self._find_publication(
+            [publication], self._target_publication_url
+        ):
+            return False
+
+        with self._bootstrap_lock:
+            self._session.cookies.update(snapshot.get("cookies", {}))
+            self._user_id = snapshot.get("user_id")
+            self._publication = publication
+            self._publication_url = snapshot["publication_url"]
+            self._from_snapshot = True
+            self._bootstrapped = True
+        return True
+
+    def _discard_snapshot(self, method: str, generation: int) -> bool:
+        """
+        Forget the state restored from a rejected snapshot and run the full handshake.
+
+        Args:
+            method: HTTP method of the rejected request.
+            generation: _session_generation when the request was sent on the
+                snapshot's session.
+
+        Returns:
+            True if the request that was rejected is worth sending again.
+        """
+        with self._bootstrap_lock:
+            if generation != self._session_generation:
+                # another thread already replaced the rejected snapshot session
+                return True
+            if not self._from_snapshot:
+                return False
+            if self._credentials is None and self._initial_cookies is None:
+                return False
+            if method.upper() not in RetryPolicy.IDEMPOTENT_METHODS:
+                # a write may be rejected for its own reasons: only send it again
+                # if the session itself is dead
+                try:
+                    self._send("GET", f"{self.base_url}/user/profile/self")
+                    return False
+                except SubstackAPIException as ex:
+                    if ex.status_code not in (401, 403):
+                        return False
+            logger.debug("bootstrap snapshot rejected, logging in again")
+            self._from_snapshot = False
+            self._session_generation += 1
+            self._session.cookies.clear()
+            self._session.cookies.update(self._initial_cookies or {})
+            self._user_id = None
+            self._publication = None
+            self._publication_url = None
+            self.invalidate_user_profile()
+            self._bootstrapped = False
+            self._ensure_bootstrapped()
+        return True
+
+    def _bootstrap(self):
+        """
+        Authenticate and switch to the configured publication.
+        """
+        if self._credentials is not None:
+            self.login(*self._credentials)
+
+        # the publication was already chosen with change_publication
+        if self._publication_url is not None:
+            return
+
         # if the user provided a publication url, then use that
-        if publication_url:
-            import re
-
-            # Regular expression to extract subdomain name
-            match = re.search(r"https://(.*).substack.com", publication_url.lower())
-            subdomain = match.group(1) if match else None
-
-            user_publications = self.get_user_publications()
-            # search through publications to find the publication with the matching subdomain
-            for publication in user_publications:
-                if publication["subdomain"] == subdomain:
-                    # set the current publication to the users publication
-                    user_publication = publication
-                    break
+        if self._target_publication_url:
+            user_publication = self._find_publication(
+                self.get_user_publications(), self._target_publication_url
+            )
         else:
             # get the users primary publication
             user_publication = self.get_user_primary_publication()
@@ -111,10 +385,10 @@ class Api:
     def _parse_cookies_string(cookies_string: str) -> dict:
         """
         Parse a semicolon-separated cookie string into a dictionary.
-        
+
         Args:
             cookies_string: A semicolon-separated string of cookies (e.g., "cookie1=value1; cookie2=value2")
-            
+
         Returns:
             A dictionary of cookie name-value pairs
         """
@@ -132,6 +406,48 @@ class Api:
                 cookies[key] = value
         return cookies
 
+    @staticmethod
+    def _find_publication(user_publications: list, publication_url: str):
+        """
+        Find the publication matching the subdomain of a publication url.
+
+        Args:
+            user_publications: publications as returned by get_user_publications.
+            publication_url: url of the publication, e.g. https://name.substack.com
+
+        Returns:
+            The matching publication dict or None.
+        """
+        # Regular expression to extract subdomain name
+        match = re.search(r"https://(.*).substack.com", publication_url.lower())
+        subdomain = match.group(1) if match else None
+
+        # search through publications to find the publication with the matching subdomain
+        for publication in user_publications:
+            if publication["subdomain"] == subdomain:
+                return publication
+        return None
+
+    @staticmethod
+    def _login_payload(email, password) -> dict:
+        """
+        Body of the login request.
+        """
+        return {
+            "captcha_response": None,
+            "email": email,
+            "for_pub": "",
+            "password": password,
+            "redirect": "/",
+        }
+
+    @staticmethod
+    def _signin_url(publication: dict) -> str:
+        """
+        Url of the sign-in page of a publication.
+        """
+        return f"https://substack.com/sign-in?redirect=%2F&for_pub={publication['subdomain']}"
+
     def login(self, email, password) -> dict:
         """
 
@@ -141,29 +457,18 @@ class Api:
           email: substack account email
           password: substack account password
         """
-
-        response = self._session.post(
-            f"{self.base_url}/login",
-            json={
-                "captcha_response": None,
-                "email": email,
-                "for_pub": "",
-                "password": password,
-                "redirect": "/",
-            },
+        response = self._request(
+            "POST", f"{self.base_url}/login", json=self._login_payload(email, password)
         )
-
-        return Api._handle_response(response=response)
+        self.invalidate_user_profile()
+        return response
 
     def signin_for_pub(self, publication):
         """
         Complete the signin process
         """
-        response = self._session.get(
-            f"https://substack.com/sign-in?redirect=%2F&for_pub={publication['subdomain']}",
-        )
         try:
-            output = Api._handle_response(response=response)
+            output = self._request("GET", self._signin_url(publication))
         except SubstackRequestException as ex:
             output = {}
         return output
@@ -172,6 +477,7 @@ class Api:
         """
         Change the publication URL
         """
+        self._publication = publication
         self.publication_url = urljoin(publication["publication_url"], "api/v1")
 
         # sign-in to the publication
@@ -183,22 +489,139 @@ class Api:
         Args:
             path: path to the json file
         """
+        self._ensure_bootstrapped()
         cookies = self._session.cookies.get_dict()
         with open(path, "w") as f:
             json.dump(cookies, f)
 
+    def _request(self, method: str, url: str, **kwargs):
+        """
+
+        Internal helper through which every call to the Substack server goes.
+        Sends the request on the shared session, throttled by the rate limiter and
+        retried according to the retry policy, and returns the handled response.
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the endpoint.
+            **kwargs: passed to requests.Session.request (params, json, data, ...).
+
+        """
+        self._ensure_bootstrapped()
+        # only a request sent on the session of a snapshot is sent again on a 401/403
+        generation = self._session_generation if self._from_snapshot else None
+        try:
+            return self._send(method, url, **kwargs)
+        except SubstackAPIException as ex:
+            if (
+                generation is None
+                or ex.status_code not in (401, 403)
+                or not self._discard_snapshot(method, generation)
+            ):
+                raise
+        return self._send(method, url, **kwargs)
+
+    def _send(self, method: str, url: str, **kwargs):
+        """
+        Send a request, with rate limiting and retries, and handle its response.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            cancellation.raise_if_cancelled()
+            if self.rate_limiter is not None:
+                # the wait for a slot is interrupted by a cancellation, like retry waits
+                self.rate_limiter.acquire(method, url, sleep=cancellation.sleep)
+            try:
+                return self._attempt(method, url, attempt, **kwargs)
+            except SubstackAPIException as ex:
+                delay = self.retry_policy.next_delay(
+                    method, attempt, started, ex.status_code, ex.retry_after
+                )
+                if delay is None:
+                    raise
+                logger.debug("%s %s failed with %s", method, url, ex.status_code)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                delay = self.retry_policy.next_delay(method, attempt, started)
+                if delay is None:
+                    raise
+                logger.debug("%s %s failed: %s", method, url, ex)
+            hooks = self._hooks
+            if hooks:
+                call_hooks(hooks, "on_retry", method, url, attempt, delay)
+            attempt += 1
+            cancellation.sleep(delay)
+
+    def _attempt(self, method: str, url: str, attempt: int, **kwargs):
+        """
+        Send one attempt of a request, notifying the hooks.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        hooks = self._hooks
+        if not hooks:
+            response = self._session.request(method, url, **kwargs)
+            return Api._handle_response(response=response, method=method)
+
+        call_hooks(hooks, "on_request", method, url, attempt)
+        sent = time.perf_counter()
+        try:
+            response = self._session.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - sent
+            call_hooks(hooks, "on_response", method, url, response, elapsed)
+            return Api._handle_response(response=response, method=method)
+        except Exception as ex:
+            call_hooks(hooks, "on_error", method, url, ex, time.perf_counter() - sent)
+            raise
+
+    def add_hook(self, hook) -> bool:
+        """
+        Notify hook of every HTTP attempt from now on. Adding a hook twice has no effect.
+
+        Args:
+            hook: a RequestHook, or any object with some of its methods.
+
+        Returns:
+            True if the hook was added, False if it was already there.
+        """
+        with self._hooks_lock:
+            if hook in self._hooks:
+                return False
+            self._hooks = [*self._hooks, hook]
+        return True
+
+    def remove_hook(self, hook):
+        """
+        Stop notifying hook.
+
+        Args:
+            hook: a hook added with add_hook or passed to the constructor.
+        """
+        with self._hooks_lock:
+            hooks = list(self._hooks)
+            hooks.remove(hook)
+            self._hooks = hooks
+
     @staticmethod
-    def _handle_response(response: requests.Response):
+    def _handle_response(response: requests.Response, method: str = None):
         """
 
         Internal helper for handling API responses from the Substack server.
         Raises the appropriate exceptions when necessary; otherwise, returns the
         response.
 
+        Args:
+            response: the response to handle.
+            method: HTTP method of the request, recorded on the raised exception.
+
         """
 
         if not (200 <= response.status_code < 300):
-            raise SubstackAPIException(response.status_code, response.text)
+            raise SubstackAPIException(
+                response.status_code,
+                response.text,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                method=method,
+            )
         try:
             return response.json()
         except ValueError:
@@ -210,6 +633,10 @@ class Api:
         Returns:
 
         """
+        # restored from a bootstrap snapshot
+        if self._user_id is not None:
+            return self._user_id
+
         profile = self.get_user_profile()
         user_id = profile["id"]
 
@@ -235,10 +662,18 @@ class Api:
         """
         Gets the users primary publication
         """
+        return self._primary_publication_from_profile(self.get_user_profile())
 
-        profile = self.get_user_profile()
+    @staticmethod
+    def _primary_publication_from_profile(profile: dict) -> dict:
+        """
+        Extract the primary publication from a user profile.
+
+        Args:
+            profile: user profile as returned by get_user_profile.
+        """
         primary_publication = None
-        
+
         # Try old API format first (backward compatibility)
         if "primaryPublication" in profile and profile["primaryPublication"] is not None:
             primary_publication = profile["primaryPublication"]
@@ -252,17 +687,17 @@ class Api:
                         primary_publication = pub_user.get("publication")
                         if primary_publication:
                             break
-                
+
                 # If no primary found, use the first publication
                 if primary_publication is None:
                     primary_publication = publication_users[0].get("publication")
-        
+
         if primary_publication is None:
             raise SubstackRequestException(
                 "Could not find primary publication in profile"
             )
-            
-        primary_publication["publication_url"] = self.get_publication_url(
+
+        primary_publication["publication_url"] = Api.get_publication_url(
             primary_publication
         )
 
@@ -272,34 +707,93 @@ class Api:
         """
         Gets the users publications
         """
+        return self._publications_from_profile(self.get_user_profile())
 
-        profile = self.get_user_profile()
+    @staticmethod
+    def _publications_from_profile(profile: dict) -> list:
+        """
+        Extract the publications of the user from a user profile.
 
+        Args:
+            profile: user profile as returned by get_user_profile.
+        """
         # Loop through users "publicationUsers" list, and return a list
         # of dictionaries of "name", and "subdomain", and "id"
         user_publications = []
         publication_users = profile.get("publicationUsers")
-        
+
         if publication_users is None:
             # If publicationUsers is None, return empty list or try to construct from other fields
             # This maintains backward compatibility while handling new API format
             return user_publications
-        
+
         for publication in publication_users:
             pub = publication.get("publication")
             if pub is not None:
-                pub["publication_url"] = self.get_publication_url(pub)
+                pub["publication_url"] = Api.get_publication_url(pub)
                 user_publications.append(pub)
 
         return user_publications
 
-    def get_user_profile(self):
+    def get_user_profile(self, refresh: bool = False):
         """
         Gets the users profile
-        """
-        response = self._session.get(f"{self.base_url}/user/profile/self")
 
-        return Api._handle_response(response=response)
+        The profile is cached for profile_ttl seconds and shared by every profile
+        derived accessor, treat the returned dict as read-only.
+
+        Args:
+            refresh: if True, fetch the profile again even if the cached one is fresh.
+        """
+        self._ensure_bootstrapped()
+        with self._profile_lock:
+            if (
+                not refresh
+                and self._profile is not None
+                and time.monotonic() - self._profile_fetched_at <= self.profile_ttl
+            ):
+                return self._profile
+            fetch = self._profile_fetch
+            # the bootstrap does not wait for a fetch that may be waiting for it
+            if fetch is not None and not self._bootstrapping:
+                owner = False
+            else:
+                owner = True
+                fetch = Future()
+                if self._profile_fetch is None:
+                    self._profile_fetch = fetch
+                generation = self._profile_generation
+        if not owner:
+            return fetch.result()
+
+        # the lock is not held during the request: a rejected snapshot session
+        # invalidates the profile and runs the handshake, which reads it again
+        try:
+            profile = self._request("GET", f"{self.base_url}/user/profile/self")
+        except BaseException as ex:
+            with self._profile_lock:
+                if self._profile_fetch is fetch:
+                    self._profile_fetch = None
+            fetch.set_exception(ex)
+            raise
+        with self._profile_lock:
+            if self._profile_fetch is fetch:
+                self._profile_fetch = None
+            if generation == self._profile_generation:
+                self._profile = profile
+                self._profile_fetched_at = time.monotonic()
+        fetch.set_result(profile)
+        return profile
+
+    def invalidate_user_profile(self):
+        """
+        Drop the cached user profile, the next access fetches it again.
+        """
+        with self._profile_lock:
+            self._profile = None
+            self._profile_generation += 1
+            # a fetch in flight may predate the invalidation, the next caller fetches
+            self._profile_fetch = None
 
     def get_user_settings(self):
         """
@@ -308,9 +802,7 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(f"{self.base_url}/settings")
-
-        return Api._handle_response(response=response)
+        return self._request("GET", f"{self.base_url}/settings")
 
     def get_publication_users(self):
         """
@@ -319,9 +811,7 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(f"{self.publication_url}/publication/users")
-
-        return Api._handle_response(response=response)
+        return self._request("GET", f"{self.publication_url}/publication/users")
 
     def get_publication_subscriber_count(self):
 
@@ -331,11 +821,11 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(
-            f"{self.publication_url}/publication_launch_checklist"
+        response = self._request(
+            "GET", f"{self.publication_url}/publication_launch_checklist"
         )
 
-        return Api._handle_response(response=response)["subscriberCount"]
+        return response["subscriberCount"]
 
     def get_published_posts(
         self, offset=0, limit=25, order_by="post_date", order_direction="desc"
@@ -343,7 +833,8 @@ class Api:
         """
         Get list of published posts for the publication.
         """
-        response = self._session.get(
+        return self._request(
+            "GET",
             f"{self.publication_url}/post_management/published",
             params={
                 "offset": offset,
@@ -353,7 +844,44 @@ class Api:
             },
         )
 
-        return Api._handle_response(response=response)
+    def iter_published_posts(
+        self,
+        page_size: int = 25,
+        order_by="post_date",
+        order_direction="desc",
+        prefetch: bool = True,
+    ):
+        """
+        Iterate over all the published posts of the publication, one page at a time.
+
+        Args:
+            page_size: number of posts requested per page. The server may return
+                fewer, iteration ends on the first empty page.
+            order_by:
+            order_direction:
+            prefetch: if True, fetch the next page while the current one is consumed.
+
+        Returns:
+            A generator of post dicts.
+        """
+        offset = 0
+
+        def fetch_page(page):
+            nonlocal offset
+            response = self.get_published_posts(
+                offset=offset,
+                limit=page_size,
+                order_by=order_by,
+                order_direction=order_direction,
+            )
+            posts = (
+                response.get("posts", []) if isinstance(response, dict) else response
+            )
+            # pages are fetched one after the other: the next one starts here
+            offset += len(posts)
+            return posts, bool(posts)
+
+        return _iter_pages(fetch_page, prefetch)
 
     def get_posts(self) -> dict:
         """
@@ -361,9 +889,7 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(f"{self.base_url}/reader/posts")
-
-        return Api._handle_response(response=response)
+        return self._request("GET", f"{self.base_url}/reader/posts")
 
     def get_drafts(self, filter=None, offset=None, limit=None):
         """
@@ -376,19 +902,42 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(
+        return self._request(
+            "GET",
             f"{self.publication_url}/drafts",
             params={"filter": filter, "offset": offset, "limit": limit},
         )
-        return Api._handle_response(response=response)
+
+    def iter_drafts(self, filter=None, page_size: int = 25, prefetch: bool = True):
+        """
+        Iterate over all the drafts of the publication, one page at a time.
+
+        Args:
+            filter:
+            page_size: number of drafts requested per page. The server may return
+                fewer, iteration ends on the first empty page.
+            prefetch: if True, fetch the next page while the current one is consumed.
+
+        Returns:
+            A generator of draft dicts.
+        """
+        offset = 0
+
+        def fetch_page(page):
+            nonlocal offset
+            drafts = self.get_drafts(filter=filter, offset=offset, limit=page_size)
+            # pages are fetched one after the other: the next one starts here
+            offset += len(drafts)
+            return drafts, bool(drafts)
+
+        return _iter_pages(fetch_page, prefetch)
 
     def get_draft(self, draft_id):
         """
         Gets a draft given it's id.
 
         """
-        response = self._session.get(f"{self.publication_url}/drafts/{draft_id}")
-        return Api._handle_response(response=response)
+        return self._request("GET", f"{self.publication_url}/drafts/{draft_id}")
 
     def delete_draft(self, draft_id):
         """
@@ -399,8 +948,7 @@ class Api:
         Returns:
 
         """
-        response = self._session.delete(f"{self.publication_url}/drafts/{draft_id}")
-        return Api._handle_response(response=response)
+        return self._request("DELETE", f"{self.publication_url}/drafts/{draft_id}")
 
     def post_draft(self, body) -> dict:
         """
@@ -411,8 +959,7 @@ class Api:
         Returns:
 
         """
-        response = self._session.post(f"{self.publication_url}/drafts", json=body)
-        return Api._handle_response(response=response)
+        return self._request("POST", f"{self.publication_url}/drafts", json=body)
 
     def put_draft(self, draft, **kwargs) -> dict:
         """
@@ -424,11 +971,11 @@ class Api:
         Returns:
 
         """
-        response = self._session.put(
+        return self._request(
+            "PUT",
             f"{self.publication_url}/drafts/{draft}",
             json=kwargs,
         )
-        return Api._handle_response(response=response)
 
     def prepublish_draft(self, draft) -> dict:
         """
@@ -440,10 +987,7 @@ class Api:
 
         """
 
-        response = self._session.get(
-            f"{self.publication_url}/drafts/{draft}/prepublish"
-        )
-        return Api._handle_response(response=response)
+        return self._request("GET", f"{self.publication_url}/drafts/{draft}/prepublish")
 
     def publish_draft(
         self, draft, send: bool = True, share_automatically: bool = False
@@ -458,11 +1002,11 @@ class Api:
         Returns:
 
         """
-        response = self._session.post(
+        return self._request(
+            "POST",
             f"{self.publication_url}/drafts/{draft}/publish",
             json={"send": send, "share_automatically": share_automatically},
         )
-        return Api._handle_response(response=response)
 
     def schedule_draft(self, draft, draft_datetime: datetime) -> dict:
         """
@@ -474,11 +1018,11 @@ class Api:
         Returns:
 
         """
-        response = self._session.post(
+        return self._request(
+            "POST",
             f"{self.publication_url}/drafts/{draft}/schedule",
             json={"post_date": draft_datetime.isoformat()},
         )
-        return Api._handle_response(response=response)
 
     def unschedule_draft(self, draft) -> dict:
         """
@@ -489,32 +1033,53 @@ class Api:
         Returns:
 
         """
-        response = self._session.post(
-            f"{self.publication_url}/drafts/{draft}/schedule", json={"post_date": None}
+        return self._request(
+            "POST",
+            f"{self.publication_url}/drafts/{draft}/schedule",
+            json={"post_date": None},
         )
-        return Api._handle_response(response=response)
 
-    def get_image(self, image: str):
+    def get_image(self, image):
         """
 
         This method generates a new substack link that contains the image.
 
+        Local images are encoded in chunks with their real MIME type, see
+        substack.images.encode_image_form. With an image cache, an image already
+        uploaded returns {"url": <cached url>} without any request.
+
         Args:
-            image: filepath or original url of image.
+            image: filepath or original url of image, binary file object, or bytes-like
+                object (bytes, bytearray, memoryview, mmap).
 
         Returns:
 
         """
-        if os.path.exists(image):
-            with open(image, "rb") as file:
-                image = b"data:image/jpeg;base64," + base64.b64encode(file.read())
+        cache_key = None
+        if self.image_cache is not None:
+            cache_key = self.image_cache.key_for(image)
+            cached_url = self.image_cache.get(cache_key) if cache_key else None
+            if cached_url is not None:
+                return {"url": cached_url}
+
+        if isinstance(image, str) and not os.path.exists(image):
+            response = self._request(
+                "POST",
+                f"{self.publication_url}/image",
+                data={"image": image},
+            )
+        else:
+            response = self._request(
+                "POST",
+                f"{self.publication_url}/image",
+                data=encode_image_form(image),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+
+        if cache_key is not None and response.get("url"):
+            self.image_cache.put(cache_key, response["url"])
+        return response
 
-        response = self._session.post(
-            f"{self.publication_url}/image",
-            data={"image": image},
-        )
-        return Api._handle_response(response=response)
-    
     def add_tags_to_post(self, post_id: int, tag_names: list) -> dict:
         """
         Add multiple tags to a post.
@@ -526,12 +1091,48 @@ class Api:
         Returns:
             A dictionary with the results of applying all tags.
         """
+        tag_ids = [self.get_tag_id(tag_name) for tag_name in tag_names]
         results = []
-        for tag_name in tag_names:
-            result = self.add_tag_to_post(post_id, tag_name)
-            results.append(result)
+        for tag_id in tag_ids:
+            results.append(self._apply_tag(post_id, tag_id))
         return {"tags_added": results}
 
+    def add_tags_to_posts(
+        self, post_ids: list, tag_names: list, max_workers: int = 4
+    ) -> list:
+        """
+        Add the same tags to many posts, applying them with bounded parallelism.
+
+        Tag ids are resolved once for the whole batch. A failing post does not stop the others.
+
+        Args:
+            post_ids: The IDs of the posts to tag.
+            tag_names: A list of tag names to add to every post.
+            max_workers: Maximum number of tag applications in flight.
+
+        Returns:
+            One dict per post, in order, with "post_id" and either "tags_added" or "error".
+        """
+        tag_ids = [self.get_tag_id(tag_name) for tag_name in tag_names]
+        apply_tag = cancellation.bind_context(self._apply_tag)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                [executor.submit(apply_tag, post_id, tag_id) for tag_id in tag_ids]
+                for post_id in post_ids
+            ]
+            results = []
+            for post_id, post_futures in zip(post_ids, futures):
+                try:
+                    results.append(
+                        {
+                            "post_id": post_id,
+                            "tags_added": [future.result() for future in post_futures],
+                        }
+                    )
+                except Exception as ex:
+                    results.append({"post_id": post_id, "error": str(ex)})
+        return results
+
     def get_publication_post_tags(self) -> list:
         """
         Retrieve all post tags for the current publication.
@@ -539,12 +1140,75 @@ class Api:
         Returns:
             List of tag dicts as returned by Substack API.
         """
-        response = self._session.get(f"{self.publication_url}/publication/post-tag")
-        return Api._handle_response(response=response)
+        return self._request("GET", f"{self.publication_url}/publication/post-tag")
+
+    def _tag_index(self, refresh: bool = False) -> dict:
+        """
+        Name to id index of the tags of the current publication, fetched once.
+        """
+        publication_url = self.publication_url
+        with self._tags_lock:
+            index = self._tag_ids.get(publication_url)
+            if index is None or refresh:
+                tags = self.get_publication_post_tags() or []
+                index = {tag.get("name"): tag["id"] for tag in tags}
+                self._tag_ids[publication_url] = index
+            return index
+
+    def invalidate_tag_cache(self):
+        """
+        Drop the cached tag ids, the next tagging call fetches the tag list again.
+        """
+        with self._tags_lock:
+            self._tag_ids.clear()
+
+    def get_tag_id(self, tag_name: str, create: bool = True):
+        """
+        Get the id of a publication tag, creating the tag if needed.
+
+        The tag list is fetched once per publication and updated as tags are created.
+        Creation is serialized, so concurrent callers never create the same tag twice.
+
+        Args:
+            tag_name: The name of the tag.
+            create: If False, return None instead of creating a missing tag.
+
+        Returns:
+            The tag id.
+        """
+        tag_id = self._tag_index().get(tag_name)
+        if tag_id is not None or not create:
+            return tag_id
+
+        with self._tag_create_lock:
+            index = self._tag_index()
+            tag_id = index.get(tag_name)
+            if tag_id is not None:
+                return tag_id
+            try:
+                tag_data = self._request(
+                    "POST",
+                    f"{self.publication_url}/publication/post-tag",
+                    json={"name": tag_name},
+                )
+            except SubstackAPIException:
+                # the tag may have been created elsewhere since the list was fetched
+                tag_id = self._tag_index(refresh=True).get(tag_name)
+                if tag_id is None:
+                    raise
+                return tag_id
+            index[tag_name] = tag_data["id"]
+            return tag_data["id"]
+
+    def _apply_tag(self, post_id: int, tag_id) -> dict:
+        return self._request(
+            "POST",
+            f"{self.publication_url}/post/{post_id}/tag/{tag_id}",
+        )
 
     def add_tag_to_post(self, post_id: int, tag_name: str) -> dict:
         """
-        Add a tag to a post by first checking published tags and creating only if needed.
+        Add a tag to a post, creating the tag only if the publication does not have it yet.
 
         Args:
             post_id: The ID of the post to tag.
@@ -553,28 +1217,7 @@ class Api:
         Returns:
             The response from applying the tag to the post.
         """
-        # Fetch existing publication tags first (avoid re-creating an already existing tag)
-        existing_tags = self.get_publication_post_tags() or []
-        existing_tag = next(
-            (tag for tag in existing_tags if tag.get("name") == tag_name),
-            None,
-        )
-
-        if existing_tag is not None:
-            tag_id = existing_tag["id"]
-        else:
-            create_tag_response = self._session.post(
-                f"{self.publication_url}/publication/post-tag",
-                json={"name": tag_name},
-            )
-            tag_data = Api._handle_response(create_tag_response)
-            tag_id = tag_data["id"]
-
-        apply_tag_response = self._session.post(
-            f"{self.publication_url}/post/{post_id}/tag/{tag_id}",
-        )
-        return Api._handle_response(apply_tag_response)
-
+        return self._apply_tag(post_id, self.get_tag_id(tag_name))
 
     def get_categories(self):
         """
@@ -584,8 +1227,7 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(f"{self.base_url}/categories")
-        return Api._handle_response(response=response)
+        return self._request("GET", f"{self.base_url}/categories")
 
     def get_category(self, category_id, category_type, page):
         """
@@ -598,13 +1240,15 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(
+        return self._request(
+            "GET",
             f"{self.base_url}/category/public/{category_id}/{category_type}",
             params={"page": page},
         )
-        return Api._handle_response(response=response)
 
-    def get_single_category(self, category_id, category_type, page=None, limit=None):
+    def get_single_category(
+        self, category_id, category_type, page=None, limit=None, concurrency: int = 1
+    ):
         """
 
         Args:
@@ -613,11 +1257,17 @@ class Api:
             page: by default substack retrieves only the first 25 publications in the category. If this is left None,
                   then all pages will be retrieved. The page size is 25 publications.
             limit:
+            concurrency: when retrieving all pages, number of pages requested speculatively in parallel.
+                  Requests past the last page are cancelled or discarded, the output keeps page order.
         Returns:
 
         """
         if page is not None:
             output = self.get_category(category_id, category_type, page)
+        elif concurrency > 1:
+            output = self._get_category_concurrently(
+                category_id, category_type, limit, concurrency
+            )
         else:
             publications = []
             page = 0
@@ -636,9 +1286,61 @@ class Api:
             }
         return output
 
+    def _get_category_concurrently(self, category_id, category_type, limit, window):
+        """
+        Retrieve the pages of a category keeping a window of requests in flight.
+        """
+        publications = []
+        get_category = cancellation.bind_context(self.get_category)
+        executor = ThreadPoolExecutor(max_workers=window)
+        try:
+            futures = {
+                page: executor.submit(get_category, category_id, category_type, page)
+                for page in range(window)
+            }
+            page = 0
+            while True:
+                page_output = futures.pop(page).result()
+                publications.extend(page_output.get("publications", []))
+                more = page_output.get("more", False)
+                if (limit is not None and limit <= len(publications)) or not more:
+                    break
+                page += 1
+                futures[page + window - 1] = executor.submit(
+                    get_category, category_id, category_type, page + window - 1
+                )
+        finally:
+            # pages past the last one are not needed: cancel those not started yet
+            # and let those in flight finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+        return {"publications": publications[:limit], "more": more}
+
+    def iter_category_publications(
+        self, category_id, category_type, prefetch: bool = True
+    ):
+        """
+        Iterate over all the publications of a category, one page at a time.
+
+        Args:
+            category_id:
+            category_type: paid or all
+            prefetch: if True, fetch the next page while the current one is consumed.
+
+        Returns:
+            A generator of publication dicts.
+        """
+
+        def fetch_page(page):
+            page_output = self.get_category(category_id, category_type, page)
+            return page_output.get("publications", []), page_output.get("more", False)
+
+        return _iter_pages(fetch_page, prefetch)
+
     def delete_all_drafts(self):
         """
 
+        Deletes the drafts one at a time, see delete_drafts for a parallel bulk deletion.
+
         Returns:
 
         """
@@ -651,6 +1353,43 @@ class Api:
                 response = self.delete_draft(draft.get("id"))
         return response
 
+    def delete_drafts(
+        self, predicate=None, max_workers: int = 4, dry_run: bool = False
+    ) -> list:
+        """
+        Delete drafts in bulk with bounded concurrency.
+
+        The matching drafts are listed first, then deleted in parallel. Deletions go
+        through the rate limiter, if any, and a failing deletion does not stop the others.
+
+        Args:
+            predicate: optional callable receiving a draft dict, only drafts for which it
+                returns True are deleted. By default every draft is deleted.
+            max_workers: maximum number of deletions in flight.
+            dry_run: if True, only report which drafts would be deleted.
+
+        Returns:
+            One dict per matching draft with "id", "title" and "status" ("deleted",
+            "dry_run" or "error"), plus "response" or "error".
+        """
+        targets = [
+            {"id": draft.get("id"), "title": draft.get("draft_title")}
+            for draft in self.iter_drafts(filter="draft", prefetch=False)
+            if predicate is None or predicate(draft)
+        ]
+        if dry_run:
+            return [dict(target, status="dry_run") for target in targets]
+
+        def delete(target):
+            try:
+                response = self.delete_draft(target["id"])
+            except Exception as ex:
+                return dict(target, status="error", error=str(ex))
+            return dict(target, status="deleted", response=response)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(cancellation.bind_context(delete), targets))
+
     def get_sections(self):
         """
         Get a list of the sections of your publication.
@@ -659,10 +1398,10 @@ class Api:
         Returns:
 
         """
-        response = self._session.get(
+        content = self._request(
+            "GET",
             f"{self.publication_url}/subscriptions",
         )
-        content = Api._handle_response(response=response)
         sections = [
             p.get("sections")
             for p in content.get("publications")
@@ -692,9 +1431,8 @@ class Api:
         Returns:
 
         """
-        response = self._session.request(
-            method=method,
-            url=f"{self.publication_url}/{endpoint}",
+        return self._request(
+            method,
+            f"{self.publication_url}/{endpoint}",
             params=params,
         )
-        return Api._handle_response(response=response)
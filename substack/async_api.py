@@ -0,0 +1,686 @@
+"""
+
+Asyncio API Wrapper
+
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urljoin
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from substack.api import Api
+from substack.exceptions import SubstackAPIException, SubstackRequestException
+from substack.hooks import LoggingHook, call_hooks
+from substack.images import encode_image_form
+from substack.metrics import MetricsCollector
+from substack.ratelimit import RateLimiter
+from substack.retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["AsyncApi"]
+
+
+class AsyncApi:
+    """
+
+    An asyncio python interface into the Substack API.
+
+    It mirrors substack.Api, but every call is a coroutine running on a pooled
+    httpx.AsyncClient, so many requests can be in flight on one event loop.
+
+    """
+
+    def __init__(
+        self,
+        email=None,
+        password=None,
+        cookies_path=None,
+        base_url=None,
+        publication_url=None,
+        debug=False,
+        cookies_string=None,
+        max_connections: int = 100,
+        timeout: float = 30.0,
+        retry_policy: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        hooks: list = None,
+        metrics: MetricsCollector = None,
+    ):
+        """
+
+        To create an instance of the substack.AsyncApi class:
+            >>> import substack
+            >>> async with substack.AsyncApi(email="substack email", password="substack password") as api:
+            ...     drafts = await api.get_drafts()
+
+        Authentication and publication resolution happen in connect(), which is
+        awaited by the async context manager.
+
+        Args:
+          email:
+          password:
+          cookies_path
+            Path to a json file of cookies, see substack.Api.
+          base_url:
+            The base URL to use to contact the Substack API.
+            Defaults to https://substack.com/api/v1.
+          publication_url:
+            Publication to use, defaults to the users primary publication.
+          cookies_string
+            Semicolon-separated cookie string, see substack.Api.
+          max_connections:
+            Maximum number of pooled connections shared by concurrent calls.
+          timeout:
+            Timeout in seconds of every request.
+          retry_policy:
+            How failed requests are retried, see substack.Api.
+          rate_limiter:
+            Optional RateLimiter applied to every request, see substack.Api.
+          hooks:
+            RequestHook objects notified of every HTTP attempt, see substack.Api.
+          metrics:
+            Optional MetricsCollector, see substack.Api.
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncApi requires httpx, install it with: pip install python-substack[async]"
+            )
+
+        self.base_url = base_url or "https://substack.com/api/v1"
+        self.publication_url = None
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self._hooks = list(hooks or [])
+        if metrics is not None:
+            self._hooks.append(metrics)
+
+        if debug:
+            logging.basicConfig()
+            logging.getLogger().setLevel(logging.DEBUG)
+            self._hooks.append(LoggingHook())
+        # add_hook and remove_hook replace the list instead of changing it, so a
+        # request in flight keeps notifying the hooks it started with
+        self._hooks_lock = threading.Lock()
+
+        self._client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+        # credentials are only used by connect() when no cookies are provided
+        self._credentials = None
+        if cookies_path is not None:
+            with open(cookies_path) as f:
+                cookies = json.load(f)
+            self._client.cookies.update(cookies)
+        elif cookies_string is not None:
+            self._client.cookies.update(Api._parse_cookies_string(cookies_string))
+        elif email is not None and password is not None:
+            self._credentials = (email, password)
+        else:
+            raise ValueError(
+                "Must provide email and password, cookies_path, or cookies_string to authenticate."
+            )
+
+        self._target_publication_url = publication_url
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def connect(self):
+        """
+        Login, if needed, and switch to the configured publication.
+
+        Returns:
+            Self for method chaining.
+        """
+        if self._credentials is not None:
+            await self.login(*self._credentials)
+
+        if self._target_publication_url:
+            user_publication = Api._find_publication(
+                await self.get_user_publications(), self._target_publication_url
+            )
+        else:
+            user_publication = await self.get_user_primary_publication()
+
+        await self.change_publication(user_publication)
+        return self
+
+    async def aclose(self):
+        """
+        Close the underlying connection pool.
+        """
+        await self._client.aclose()
+
+    async def login(self, email, password) -> dict:
+        """
+
+        Login to the substack account.
+
+        Args:
+          email: substack account email
+          password: substack account password
+        """
+        return await self._request(
+            "POST", f"{self.base_url}/login", json=Api._login_payload(email, password)
+        )
+
+    async def signin_for_pub(self, publication):
+        """
+        Complete the signin process
+        """
+        try:
+            output = await self._request("GET", Api._signin_url(publication))
+        except SubstackRequestException:
+            output = {}
+        return output
+
+    async def change_publication(self, publication):
+        """
+        Change the publication URL
+        """
+        self.publication_url = urljoin(publication["publication_url"], "api/v1")
+
+        # sign-in to the publication
+        await self.signin_for_pub(publication)
+
+    def export_cookies(self, path: str = "cookies.json"):
+        """
+        Export cookies to a json file.
+        Args:
+            path: path to the json file
+        """
+        cookies = {cookie.name: cookie.value for cookie in self._client.cookies.jar}
+        with open(path, "w") as f:
+            json.dump(cookies, f)
+
+    async def _request(self, method: str, url: str, params=None, **kwargs):
+        """
+
+        Internal helper through which every call to the Substack server goes.
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the endpoint.
+            params: query parameters, None values are dropped like requests does.
+            **kwargs: passed to httpx.AsyncClient.request (json, data, ...).
+
+        """
+        if params is not None:
+            params = {k: v for k, v in params.items() if v is not None}
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(method, url)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                return await self._attempt(
+                    method, url, attempt, params=params, **kwargs
+                )
+            except SubstackAPIException as ex:
+                delay = self.retry_policy.next_delay(
+                    method, attempt, started, ex.status_code, ex.retry_after
+                )
+                if delay is None:
+                    raise
+                logger.debug("%s %s failed with %s", method, url, ex.status_code)
+            except httpx.TransportError as ex:
+                delay = self.retry_policy.next_delay(method, attempt, started)
+                if delay is None:
+                    raise
+                logger.debug("%s %s failed: %s", method, url, ex)
+            hooks = self._hooks
+            if hooks:
+                call_hooks(hooks, "on_retry", method, url, attempt, delay)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, method: str, url: str, attempt: int, **kwargs):
+        """
+        Send one attempt of a request, notifying the hooks.
+        """
+        hooks = self._hooks
+        if not hooks:
+            response = await self._client.request(method, url, **kwargs)
+            return Api._handle_response(response=response, method=method)
+
+        call_hooks(hooks, "on_request", method, url, attempt)
+        sent = time.perf_counter()
+        try:
+            response = await self._client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - sent
+            call_hooks(hooks, "on_response", method, url, response, elapsed)
+            return Api._handle_response(response=response, method=method)
+        except Exception as ex:
+            call_hooks(hooks, "on_error", method, url, ex, time.perf_counter() - sent)
+            raise
+
+    def add_hook(self, hook) -> bool:
+        """
+        Notify hook of every HTTP attempt from now on, see substack.Api.add_hook.
+        """
+        with self._hooks_lock:
+            if hook in self._hooks:
+                return False
+            self._hooks = [*self._hooks, hook]
+        return True
+
+    def remove_hook(self, hook):
+        """
+        Stop notifying hook.
+        """
+        with self._hooks_lock:
+            hooks = list(self._hooks)
+            hooks.remove(hook)
+            self._hooks = hooks
+
+    async def get_user_id(self):
+        """
+
+        Returns:
+
+        """
+        profile = await self.get_user_profile()
+        return profile["id"]
+
+    async def get_user_primary_publication(self):
+        """
+        Gets the users primary publication
+        """
+        return Api._primary_publication_from_profile(await self.get_user_profile())
+
+    async def get_user_publications(self):
+        """
+        Gets the users publications
+        """
+        return Api._publications_from_profile(await self.get_user_profile())
+
+    async def get_user_profile(self):
+        """
+        Gets the users profile
+        """
+        return await self._request("GET", f"{self.base_url}/user/profile/self")
+
+    async def get_user_settings(self):
+        """
+        Get user settings.
+        """
+        return await self._request("GET", f"{self.base_url}/settings")
+
+    async def get_publication_users(self):
+        """
+        Get list of users.
+        """
+        return await self._request("GET", f"{self.publication_url}/publication/users")
+
+    async def get_publication_subscriber_count(self):
+        """
+        Get subscriber count.
+        """
+        response = await self._request(
+            "GET", f"{self.publication_url}/publication_launch_checklist"
+        )
+        return response["subscriberCount"]
+
+    async def get_published_posts(
+        self, offset=0, limit=25, order_by="post_date", order_direction="desc"
+    ):
+        """
+        Get list of published posts for the publication.
+        """
+        return await self._request(
+            "GET",
+            f"{self.publication_url}/post_management/published",
+            params={
+                "offset": offset,
+                "limit": limit,
+                "order_by": order_by,
+                "order_direction": order_direction,
+            },
+        )
+
+    async def get_posts(self) -> dict:
+        """
+        Get the posts of the reader feed.
+        """
+        return await self._request("GET", f"{self.base_url}/reader/posts")
+
+    async def get_drafts(self, filter=None, offset=None, limit=None):
+        """
+
+        Args:
+            filter:
+            offset:
+            limit:
+
+        Returns:
+
+        """
+        return await self._request(
+            "GET",
+            f"{self.publication_url}/drafts",
+            params={"filter": filter, "offset": offset, "limit": limit},
+        )
+
+    async def get_draft(self, draft_id):
+        """
+        Gets a draft given it's id.
+        """
+        return await self._request("GET", f"{self.publication_url}/drafts/{draft_id}")
+
+    async def delete_draft(self, draft_id):
+        """
+
+        Args:
+            draft_id:
+
+        Returns:
+
+        """
+        return await self._request(
+            "DELETE", f"{self.publication_url}/drafts/{draft_id}"
+        )
+
+    async def post_draft(self, body) -> dict:
+        """
+
+        Args:
+          body:
+
+        Returns:
+
+        """
+        return await self._request("POST", f"{self.publication_url}/drafts", json=body)
+
+    async def put_draft(self, draft, **kwargs) -> dict:
+        """
+
+        Args:
+            draft:
+            **kwargs:
+
+        Returns:
+
+        """
+        return await self._request(
+            "PUT", f"{self.publication_url}/drafts/{draft}", json=kwargs
+        )
+
+    async def prepublish_draft(self, draft) -> dict:
+        """
+
+        Args:
+            draft: draft id
+
+        Returns:
+
+        """
+        return await self._request(
+            "GET", f"{self.publication_url}/drafts/{draft}/prepublish"
+        )
+
+    async def publish_draft(
+        self, draft, send: bool = True, share_automatically: bool = False
+    ) -> dict:
+        """
+
+        Args:
+            draft: draft id
+            send:
+            share_automatically:
+
+        Returns:
+
+        """
+        return await self._request(
+            "POST",
+            f"{self.publication_url}/drafts/{draft}/publish",
+            json={"send": send, "share_automatically": share_automatically},
+        )
+
+    async def schedule_draft(self, draft, draft_datetime: datetime) -> dict:
+        """
+
+        Args:
+            draft: draft id
+            draft_datetime: datetime to schedule the draft
+
+        Returns:
+
+        """
+        return await self._request(
+            "POST",
+            f"{self.publication_url}/drafts/{draft}/schedule",
+            json={"post_date": draft_datetime.isoformat()},
+        )
+
+    async def unschedule_draft(self, draft) -> dict:
+        """
+
+        Args:
+            draft: draft id
+
+        Returns:
+
+        """
+        return await self._request(
+            "POST",
+            f"{self.publication_url}/drafts/{draft}/schedule",
+            json={"post_date": None},
+        )
+
+    async def get_image(self, image):
+        """
+
+        This method generates a new substack link that contains the image.
+
+        Args:
+            image: filepath or original url of image, binary file object, or bytes-like object.
+
+        Returns:
+
+        """
+        if isinstance(image, str) and not os.path.exists(image):
+            return await self._request(
+                "POST", f"{self.publication_url}/image", data={"image": image}
+            )
+
+        body = await asyncio.to_thread(encode_image_form, image)
+        return await self._request(
+            "POST",
+            f"{self.publication_url}/image",
+            content=bytes(body),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+    async def add_tags_to_post(self, post_id: int, tag_names: list) -> dict:
+        """
+        Add multiple tags to a post.
+
+        Args:
+            post_id: The ID of the post to tag.
+            tag_names: A list of tag names to add.
+
+        Returns:
+            A dictionary with the results of applying all tags.
+        """
+        results = []
+        for tag_name in tag_names:
+            results.append(await self.add_tag_to_post(post_id, tag_name))
+        return {"tags_added": results}
+
+    async def get_publication_post_tags(self) -> list:
+        """
+        Retrieve all post tags for the current publication.
+
+        Returns:
+            List of tag dicts as returned by Substack API.
+        """
+        return await self._request(
+            "GET", f"{self.publication_url}/publication/post-tag"
+        )
+
+    async def add_tag_to_post(self, post_id: int, tag_name: str) -> dict:
+        """
+        Add a tag to a post by first checking published tags and creating only if needed.
+
+        Args:
+            post_id: The ID of the post to tag.
+            tag_name: The name of the tag to add.
+
+        Returns:
+            The response from applying the tag to the post.
+        """
+        existing_tags = await self.get_publication_post_tags() or []
+        existing_tag = next(
+            (tag for tag in existing_tags if tag.get("name") == tag_name),
+            None,
+        )
+
+        if existing_tag is not None:
+            tag_id = existing_tag["id"]
+        else:
+            tag_data = await self._request(
+                "POST",
+                f"{self.publication_url}/publication/post-tag",
+                json={"name": tag_name},
+            )
+            tag_id = tag_data["id"]
+
+        return await self._request(
+            "POST", f"{self.publication_url}/post/{post_id}/tag/{tag_id}"
+        )
+
+    async def get_categories(self):
+        """
+        Retrieve list of all available categories.
+        """
+        return await self._request("GET", f"{self.base_url}/categories")
+
+    async def get_category(self, category_id, category_type, page):
+        """
+
+        Args:
+            category_id:
+            category_type:
+            page:
+
+        Returns:
+
+        """
+        return await self._request(
+            "GET",
+            f"{self.base_url}/category/public/{category_id}/{category_type}",
+            params={"page": page},
+        )
+
+    async def get_single_category(
+        self, category_id, category_type, page=None, limit=None
+    ):
+        """
+
+        Args:
+            category_id:
+            category_type: paid or all
+            page: if left None, then all pages will be retrieved.
+            limit:
+        Returns:
+
+        """
+        if page is not None:
+            return await self.get_category(category_id, category_type, page)
+
+        publications = []
+        page = 0
+        while True:
+            page_output = await self.get_category(category_id, category_type, page)
+            publications.extend(page_output.get("publications", []))
+            if (
+                limit is not None and limit <= len(publications)
+            ) or not page_output.get("more", False):
+                publications = publications[:limit]
+                break
+            page += 1
+        return {
+            "publications": publications,
+            "more": page_output.get("more", False),
+        }
+
+    async def delete_all_drafts(self):
+        """
+        Delete every draft of the publication.
+
+        Returns:
+            The response of the last deletion.
+        """
+        response = None
+        while True:
+            drafts = await self.get_drafts(filter="draft", limit=10, offset=0)
+            if len(drafts) == 0:
+                break
+            responses = await asyncio.gather(
+                *(self.delete_draft(draft.get("id")) for draft in drafts)
+            )
+            response = responses[-1]
+        return response
+
+    async def get_sections(self):
+        """
+        Get a list of the sections of your publication.
+        """
+        content = await self._request("GET", f"{self.publication_url}/subscriptions")
+        sections = [
+            p.get("sections")
+            for p in content.get("publications")
+            if p.get("hostname") in self.publication_url
+        ]
+        return sections[0]
+
+    async def publication_embed(self, url):
+        """
+
+        Args:
+            url:
+
+        Returns:
+
+        """
+        return await self.call("/publication/embed", "GET", url=url)
+
+    async def call(self, endpoint, method, **params):
+        """
+
+        Args:
+            endpoint:
+            method:
+            **params:
+
+        Returns:
+
+        """
+        return await self._request(
+            method, f"{self.publication_url}/{endpoint}", params=params
+        )
@@ -0,0 +1,86 @@
+"""
+
+Request Cancellation
+
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from substack.exceptions import RequestCancelledException
+
+__all__ = ["cancel_scope", "raise_if_cancelled", "bind_context"]
+
+_cancel_event: contextvars.ContextVar[
+    Optional[threading.Event]
+] = contextvars.ContextVar("substack_cancel_event", default=None)
+
+
+@contextmanager
+def cancel_scope(event: Optional[threading.Event] = None):
+    """
+    Make the Api calls run inside the block cancellable from another thread.
+
+    Setting the event stops a call before its next attempt and interrupts its retry
+    and rate limiter waits; a request already on the wire completes, bounded by
+    Api.timeout.
+
+        >>> event = threading.Event()
+        >>> with cancel_scope(event):
+        ...     api.publish_draft(draft_id)  # event.set() elsewhere aborts it
+
+    Args:
+        event: the event signalling cancellation, a new one if not given.
+
+    Returns:
+        The event.
+    """
+    event = event if event is not None else threading.Event()
+    token = _cancel_event.set(event)
+    try:
+        yield event
+    finally:
+        _cancel_event.reset(token)
+
+
+def raise_if_cancelled():
+    """
+    Raise RequestCancelledException if the current cancel scope was cancelled.
+    """
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise RequestCancelledException("Request cancelled")
+
+
+def sleep(delay: float):
+    """
+    Sleep for delay seconds, waking up early if the current cancel scope is cancelled.
+    """
+    event = _cancel_event.get()
+    if event is None:
+        time.sleep(delay)
+    elif event.wait(delay):
+        raise RequestCancelledException("Request cancelled")
+
+
+def bind_context(function: Callable) -> Callable:
+    """
+    Bind function to the caller's context, so that worker threads running it see the
+    caller's cancel scope.
+
+    Args:
+        function: function to run in another thread.
+
+    Returns:
+        A wrapper running function in a copy of the current context on each call.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # a context cannot be entered by two threads at once: one copy per call
+        return context.copy().run(function, *args, **kwargs)
+
+    return run
@@ -0,0 +1,267 @@
+"""
+
+Markdown Conversion
+
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from difflib import SequenceMatcher
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from substack import timing
+from substack.post import Post, _iter_markdown_blocks, _markdown_image, _upload_images
+
+__all__ = [
+    "IncrementalConverter",
+    "convert_markdown_many",
+    "iter_convert_markdown_many",
+]
+
+
+def _block_key(block: Dict) -> bytes:
+    text = f"{block['type']}\0{block.get('language') or ''}\0{block.get('content', '')}"
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _diff(old: Sequence, new: Sequence) -> List[Tuple[int, int, int, int]]:
+    """
+    Returns:
+        (old_start, old_end, new_start, new_end) of every range of old replaced by a
+        range of new, in order.
+    """
+    # edits are usually local: only diff what lies between the common ends
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    old_middle = old[prefix : len(old) - suffix]
+    new_middle = new[prefix : len(new) - suffix]
+    if not old_middle and not new_middle:
+        return []
+    if not old_middle or not new_middle:
+        return [(prefix, prefix + len(old_middle), prefix, prefix + len(new_middle))]
+    matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    return [
+        (prefix + i1, prefix + i2, prefix + j1, prefix + j2)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+class IncrementalConverter:
+    """
+
+    Keeps the draft body of a post in sync with a Markdown document edited over time.
+
+    Each update splits the document into blocks and converts only the blocks whose
+    content is new; the nodes of the other blocks are reused from a cache keyed by
+    the hash of the block. The changes are spliced into the post's draft body in
+    place, and images are uploaded once for the lifetime of the converter.
+
+        >>> converter = IncrementalConverter(post, api=api)
+        >>> converter.update(markdown)
+        [(0, 0, 0, 120)]
+        >>> converter.update(edited_markdown)
+        [(41, 42, 41, 42)]
+
+    The state is kept here rather than on the Post, whose attributes are the draft
+    sent to Substack.
+
+    """
+
+    def __init__(self, post: Post, api=None, max_workers: int = 8):
+        """
+
+        Args:
+            post: the post whose draft body is updated. Nodes already in it, or
+                added after the converter's, are left alone.
+            api: Optional Api instance for uploading local images.
+            max_workers: Number of images uploaded concurrently.
+        """
+        self.post = post
+        self.api = api
+        self.max_workers = max_workers
+        # blocks converted by the last update
+        self.converted = 0
+        # index in the draft body of the first node managed by the converter
+        self._start: Optional[int] = None
+        # key and number of nodes of each block of the current document
+        self._blocks: List[Tuple[bytes, int]] = []
+        self._nodes: Dict[bytes, List[Dict]] = {}
+        self._images: Dict[str, str] = {}
+
+    def update(self, markdown_content: str) -> List[Tuple[int, int, int, int]]:
+        """
+        Convert a new version of the document and apply it to the draft body.
+
+        Args:
+            markdown_content: the whole Markdown document.
+
+        Returns:
+            The changed node ranges, as (old_start, old_end, new_start, new_end)
+            indices in the draft body content: nodes old_start:old_end of the
+            previous content were replaced by nodes new_start:new_end. Empty when
+            nothing changed.
+        """
+        content = self.post.draft_body.setdefault("content", [])
+        if self._start is None:
+            self._start = len(content)
+
+        blocks = list(_iter_markdown_blocks(markdown_content.split("\n")))
+        keys = [_block_key(block) for block in blocks]
+        fresh = self._convert(
+            {key: block for key, block in zip(keys, blocks) if key not in self._nodes}
+        )
+
+        old_offsets = list(accumulate((count for _, count in self._blocks), initial=0))
+        new_counts = [len(self._nodes[key]) for key in keys]
+        new_offsets = list(accumulate(new_counts, initial=0))
+
+        changes = _diff([key for key, _ in self._blocks], keys)
+        start = self._start
+        # splice from the end, so the offsets of the earlier changes stay valid
+        for i1, i2, j1, j2 in reversed(changes):
+            replacement = []
+            for key in keys[j1:j2]:
+                if key in fresh:
+                    # the nodes just built, used as they are the first time
+                    replacement.extend(self._nodes[key])
+                    fresh.discard(key)
+                else:
+                    # a moved or repeated block, copied so no node appears twice
+                    replacement.extend(json.loads(json.dumps(self._nodes[key])))
+            content[start + old_offsets[i1] : start + old_offsets[i2]] = replacement
+
+        self._blocks = list(zip(keys, new_counts))
+        # forget the blocks no longer in the document
+        self._nodes = {key: self._nodes[key] for key in keys}
+        return [
+            (
+                start + old_offsets[i1],
+                start + old_offsets[i2],
+                start + new_offsets[j1],
+                start + new_offsets[j2],
+            )
+            for i1, i2, j1, j2 in changes
+        ]
+
+    def _convert(self, blocks: Dict[bytes, Dict]) -> set:
+        """
+        Convert the given blocks into the node cache, uploading their new images.
+
+        Returns:
+            The keys converted.
+        """
+        self.converted = len(blocks)
+        if self.api is not None:
+            image_urls = []
+            for block in blocks.values():
+                image = _markdown_image(block)
+                if image is not None and image[1] not in self._images:
+                    image_urls.append(image[1])
+            if image_urls:
+                with timing.stage("images"):
+                    self._images.update(
+                        _upload_images(self.api, image_urls, self.max_workers)
+                    )
+
+        builder = Post(title="", subtitle="", user_id=0)
+        nodes = builder.draft_body["content"]
+        for key, block in blocks.items():
+            builder._add_markdown_block(block, self._images)
+            self._nodes[key] = list(nodes)
+            nodes.clear()
+        return set(blocks)
+
+
+def _convert_chunk(chunk: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+    # runs in the worker processes
+    converted = []
+    for index, markdown_content in chunk:
+        post = Post(title="", subtitle="", user_id=0)
+        post.from_markdown(markdown_content)
+        converted.append((index, json.dumps(post.draft_body)))
+    return converted
+
+
+def iter_convert_markdown_many(
+    documents: Iterable[str], workers: Optional[int] = None, chunksize: int = 16
+) -> Iterator[Tuple[int, str]]:
+    """
+    Convert many Markdown documents on a process pool, yielding them as they complete.
+
+    Documents are sent to the workers in chunks of chunksize and read from the
+    iterable only as the workers need them, so a long iterable (e.g. a generator
+    reading files) is never held in memory. Images are not uploaded: the workers
+    cannot share an Api, the image urls are kept as they are.
+
+        >>> for index, draft_body in iter_convert_markdown_many(documents, workers=8):
+        ...     store(paths[index], draft_body)
+
+    Args:
+        documents: Markdown documents.
+        workers: number of processes, os.cpu_count() by default. With 1 the
+            documents are converted in this process.
+        chunksize: documents sent to a worker at once; larger chunks cost less
+            dispatch but balance the load less evenly.
+
+    Returns:
+        A generator of (index in documents, draft body serialized as by
+        Post.get_draft), in completion order.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(documents, max(1, chunksize))
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _convert_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # keep every worker busy with a chunk queued behind the running one
+        pending = {
+            executor.submit(_convert_chunk, chunk)
+            for chunk in islice(chunks, 2 * workers)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+                for chunk in islice(chunks, 1):
+                    pending.add(executor.submit(_convert_chunk, chunk))
+
+
+def convert_markdown_many(
+    documents: Iterable[str], workers: Optional[int] = None, chunksize: int = 16
+) -> List[str]:
+    """
+    Convert many Markdown documents on a process pool.
+
+    Args:
+        documents: Markdown documents.
+        workers: number of processes, os.cpu_count() by default.
+        chunksize: documents sent to a worker at once.
+
+    Returns:
+        The serialized draft body of each document, in input order.
+    """
+    bodies: Dict[int, str] = dict(
+        iter_convert_markdown_many(documents, workers=workers, chunksize=chunksize)
+    )
+    return [bodies[index] for index in range(len(bodies))]
+
+
+def _chunks(documents: Iterable[str], size: int) -> Iterator[List[Tuple[int, str]]]:
+    iterator = enumerate(documents)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -1,8 +1,10 @@
 import json
 
+from substack.retry import RetryPolicy
+
 
 class SubstackAPIException(Exception):
-    def __init__(self, status_code, text):
+    def __init__(self, status_code, text, retry_after=None, method=None):
         try:
             json_res = json.loads(text)
         except ValueError:
@@ -15,6 +17,23 @@ class SubstackAPIException(Exception):
             )
             self.message = self.message or json_res.get("error", "")
         self.status_code = status_code
+        # seconds the server asked to wait (Retry-After), if any
+        self.retry_after = retry_after
+        # HTTP method of the failed request, if known
+        self.method = method
+
+    @property
+    def retryable(self):
+        """
+        True if the request can be sent again safely, as decided by
+        RetryPolicy.is_retryable: a 429 always, a server error only for an
+        idempotent method, since a POST may already have been applied.
+        """
+        if self.status_code == 429:
+            return True
+        if self.status_code not in RetryPolicy.RETRY_STATUSES or self.method is None:
+            return False
+        return self.method.upper() in RetryPolicy.IDEMPOTENT_METHODS
 
     def __str__(self):
         return f"APIError(code={self.status_code}): {self.message}"
@@ -30,3 +49,7 @@ class SubstackRequestException(Exception):
 
 class SectionNotExistsException(SubstackRequestException):
     pass
+
+
+class RequestCancelledException(SubstackRequestException):
+    pass
@@ -0,0 +1,110 @@
+"""
+
+Request Lifecycle Hooks
+
+"""
+
+import logging
+from typing import Iterable
+
+__all__ = ["RequestHook", "LoggingHook"]
+
+logger = logging.getLogger(__name__)
+
+
+class RequestHook:
+    """
+
+    Receives the lifecycle events of every HTTP attempt made by an Api.
+
+    Subclass it and override the events of interest, or pass any object with some of
+    these methods. Hooks run synchronously in the thread making the request, so they
+    should be quick; an exception raised by a hook is logged and otherwise ignored.
+    Retries are separate attempts, each with its own events.
+
+    """
+
+    def on_request(self, method: str, url: str, attempt: int):
+        """
+        Called before an attempt is sent.
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the request.
+            attempt: 0 for the first attempt, then 1, 2, ... for retries.
+        """
+
+    def on_response(self, method: str, url: str, response, elapsed: float):
+        """
+        Called when a response is received, whatever its status code.
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the request.
+            response: the requests (or httpx for AsyncApi) response.
+            elapsed: seconds between sending the request and receiving the response.
+        """
+
+    def on_error(self, method: str, url: str, error: Exception, elapsed: float):
+        """
+        Called when an attempt fails: an error status or invalid response (after
+        on_response), or a connection error or timeout (without any response).
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the request.
+            error: the exception the attempt raised.
+            elapsed: seconds between sending the request and the failure.
+        """
+
+    def on_retry(self, method: str, url: str, attempt: int, delay: float):
+        """
+        Called when a failed attempt is going to be retried, before waiting.
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the request.
+            attempt: the attempt that failed, 0 for the first one.
+            delay: seconds to wait before the next attempt.
+        """
+
+
+class LoggingHook(RequestHook):
+    """
+
+    Logs every attempt with its status, latency and size at DEBUG level.
+    Api(debug=True) installs one.
+
+    """
+
+    def __init__(self, log: logging.Logger = logger):
+        self.log = log
+
+    def on_response(self, method, url, response, elapsed):
+        self.log.debug(
+            "%s %s -> %s in %.1f ms (%d bytes)",
+            method,
+            url,
+            response.status_code,
+            elapsed * 1000,
+            len(response.content),
+        )
+
+    def on_error(self, method, url, error, elapsed):
+        self.log.debug(
+            "%s %s failed after %.1f ms: %s", method, url, elapsed * 1000, error
+        )
+
+
+def call_hooks(hooks: Iterable, event: str, *args):
+    """
+    Call the event method of every hook that has one, logging hook failures.
+    """
+    for hook in hooks:
+        method = getattr(hook, event, None)
+        if method is None:
+            continue
+        try:
+            method(*args)
+        except Exception:
+            logger.exception("%s hook %r failed", event, hook)
@@ -0,0 +1,177 @@
+"""
+
+Image Upload Cache
+
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Optional
+
+__all__ = ["ImageCache"]
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ImageCache:
+    """
+
+    Persistent cache of uploaded images, shared by processes through a SQLite file.
+
+    Local images are keyed by the SHA-256 of their bytes, remote images by their url,
+    so re-uploading an unchanged image costs no request. Entries older than max_age
+    are ignored and removed; beyond max_entries the least recently used are evicted.
+
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 10000,
+        max_age: float = 30 * 24 * 3600,
+    ):
+        """
+
+        To skip the upload of images already uploaded by any process on this machine:
+            >>> api = Api(email=..., password=..., image_cache=ImageCache())
+
+        Args:
+            path: path of the SQLite file, defaults to ~/.cache/python-substack/images.sqlite3.
+            max_entries: maximum number of cached images.
+            max_age: seconds after which a cached url is uploaded again.
+        """
+        if path is None:
+            path = os.path.join(
+                os.path.expanduser("~"), ".cache", "python-substack", "images.sqlite3"
+            )
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with closing(self._connect()) as conn, conn:
+            # WAL lets readers in other processes proceed while one process writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                "key TEXT PRIMARY KEY, url TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # a connection per operation: sqlite connections cannot be shared between threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key_for(image) -> Optional[str]:
+        """
+        Cache key of an image as accepted by Api.get_image.
+
+        Args:
+            image: url, path of a local file, bytes-like object or binary file object.
+
+        Returns:
+            "sha256:<hex digest>" for image content, "url:<url>" for remote images,
+            or None when the content cannot be read without consuming it.
+        """
+        if isinstance(image, str) and not os.path.exists(image):
+            return f"url:{image}"
+
+        digest = hashlib.sha256()
+        if isinstance(image, (str, os.PathLike)):
+            with open(image, "rb") as file:
+                for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+        elif hasattr(image, "read"):
+            if not (hasattr(image, "seekable") and image.seekable()):
+                return None
+            position = image.tell()
+            for chunk in iter(lambda: image.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+            image.seek(position)
+        else:
+            digest.update(image)
+        return f"sha256:{digest.hexdigest()}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up the uploaded url of an image.
+
+        Args:
+            key: cache key, see key_for.
+
+        Returns:
+            The Substack CDN url, or None on a miss.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT url FROM images WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE images SET last_used = ? WHERE key = ?", (now, key)
+                )
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row[0] if row is not None else None
+
+    def put(self, key: str, url: str):
+        """
+        Store the uploaded url of an image, evicting stale and least recently used entries.
+
+        Args:
+            key: cache key, see key_for.
+            url: the Substack CDN url.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO images (key, url, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, url, now, now),
+            )
+            conn.execute(
+                "DELETE FROM images WHERE created_at < ?", (now - self.max_age,)
+            )
+            conn.execute(
+                "DELETE FROM images WHERE key IN ("
+                "SELECT key FROM images ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        """
+        Remove every cached image.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM images")
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counts of this process and the number of cached images.
+        """
+        with closing(self._connect()) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
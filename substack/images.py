@@ -0,0 +1,142 @@
+"""
+
+Image Utilities
+
+"""
+
+import base64
+import mmap
+import os
+from typing import Iterator, Optional, Union
+from urllib.parse import quote_plus
+
+__all__ = ["encode_image_form", "sniff_image_type"]
+
+# a multiple of 3, so that every chunk but the last encodes to base64 without padding
+CHUNK_SIZE = 3 * 256 * 1024
+
+DEFAULT_IMAGE_TYPE = "image/jpeg"
+
+# number of leading bytes needed to recognize every supported format
+SNIFF_SIZE = 64
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"\x00\x00\x01\x00", "image/x-icon"),
+)
+
+_FTYP_BRANDS = {
+    b"avif": "image/avif",
+    b"avis": "image/avif",
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"mif1": "image/heif",
+    b"msf1": "image/heif",
+}
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Guess the MIME type of an image from its first bytes.
+
+    Args:
+        head: the first bytes of the file, SNIFF_SIZE are enough.
+
+    Returns:
+        The MIME type, or None if the format is not recognized.
+    """
+    head = bytes(head[:512])
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in _FTYP_BRANDS:
+        return _FTYP_BRANDS[head[8:12]]
+    stripped = head.lstrip()
+    if stripped.startswith(b"<svg") or (
+        stripped.startswith(b"<?xml") and b"<svg" in stripped
+    ):
+        return "image/svg+xml"
+    return None
+
+
+def _form_escape(encoded: bytes) -> bytes:
+    """
+    Form-encode base64 output, only "+", "/" and "=" need escaping.
+    """
+    return encoded.replace(b"+", b"%2B").replace(b"/", b"%2F").replace(b"=", b"%3D")
+
+
+def _form_prefix(head, field: str) -> bytearray:
+    mime_type = sniff_image_type(head) or DEFAULT_IMAGE_TYPE
+    return bytearray(f"{field}={quote_plus(f'data:{mime_type};base64,')}".encode())
+
+
+def _iter_chunks(source) -> Iterator[Union[bytes, memoryview]]:
+    """
+    Yield the content of a bytes-like object or a binary file object in chunks.
+    """
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        view = memoryview(source).cast("B")
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield view[start : start + CHUNK_SIZE]
+
+
+def _encode_chunks(chunks, field: str) -> bytearray:
+    body = None
+    rest = b""
+    for chunk in chunks:
+        data = rest + chunk if rest else chunk
+        if body is None:
+            # short reads: wait for enough bytes to recognize the format
+            if len(data) < SNIFF_SIZE:
+                rest = bytes(data)
+                continue
+            body = _form_prefix(data, field)
+        cut = len(data) - len(data) % 3
+        body += _form_escape(base64.b64encode(data[:cut]))
+        rest = bytes(data[cut:])
+    if body is None:
+        if not rest:
+            raise ValueError("Cannot upload an empty image")
+        body = _form_prefix(rest, field)
+    body += _form_escape(base64.b64encode(rest))
+    return body
+
+
+def encode_image_form(source, field: str = "image") -> bytearray:
+    """
+    Build the form-encoded body of an image upload.
+
+    The image is base64 encoded chunk by chunk straight into the body, and files are
+    memory-mapped, so peak memory stays close to the size of the encoded payload.
+    The data uri is labelled with the MIME type sniffed from the image content.
+
+    Args:
+        source: path of a local file, binary file object, or bytes-like object
+            (bytes, bytearray, memoryview, mmap).
+        field: name of the form field.
+
+    Returns:
+        The application/x-www-form-urlencoded body.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return _encode_chunks(_iter_chunks(file), field)
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return _encode_chunks(_iter_chunks(mapped), field)
+    return _encode_chunks(_iter_chunks(source), field)
@@ -0,0 +1,347 @@
+"""
+
+Request Metrics
+
+"""
+
+import math
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from substack.exceptions import SubstackAPIException, SubstackRequestException
+from substack.hooks import RequestHook
+
+__all__ = [
+    "MetricsCollector",
+    "LatencyHistogram",
+    "endpoint_template",
+    "prometheus_histogram",
+    "prometheus_sample",
+]
+
+# upper bounds of the latency buckets: 1 ms to about 3 minutes, each 25% wider than
+# the previous one, so a percentile read from a bucket is within 25% of the truth
+BUCKET_BOUNDS = tuple(0.001 * 1.25**i for i in range(55))
+
+_API_PREFIX = "/api/v1"
+
+# numeric ids and uuid / hex ids
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{32,36})$")
+
+
+def endpoint_template(url: str) -> str:
+    """
+    Reduce a request url to the endpoint it calls.
+
+        >>> endpoint_template("https://example.substack.com/api/v1/drafts/123/publish")
+        '/drafts/{id}/publish'
+
+    Args:
+        url: absolute url of the request.
+
+    Returns:
+        The path relative to /api/v1, with ids replaced by {id}.
+    """
+    path = urlsplit(url).path
+    prefix = path.find(_API_PREFIX)
+    if prefix != -1:
+        path = path[prefix + len(_API_PREFIX) :]
+    segments = [
+        "{id}" if _ID_SEGMENT.match(segment) else segment
+        for segment in path.strip("/").split("/")
+    ]
+    return "/" + "/".join(segments)
+
+
+class LatencyHistogram:
+    """
+
+    Latency histogram with fixed logarithmic buckets, see BUCKET_BOUNDS.
+
+    Recording is a binary search and an increment; memory is constant.
+    Not thread-safe on its own, MetricsCollector serializes access.
+
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def copy(self) -> "LatencyHistogram":
+        copy = LatencyHistogram()
+        copy.counts = list(self.counts)
+        copy.count = self.count
+        copy.total = self.total
+        copy.max = self.max
+        return copy
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate a latency percentile.
+
+        Args:
+            q: the percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            The upper bound of the bucket holding the percentile, capped by the largest
+            latency recorded, or None if nothing was recorded.
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        cumulative = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                break
+        if bucket == len(BUCKET_BOUNDS):
+            return self.max
+        return min(BUCKET_BOUNDS[bucket], self.max)
+
+
+class _EndpointStats:
+    __slots__ = (
+        "count",
+        "errors",
+        "retries",
+        "statuses",
+        "bytes_sent",
+        "bytes_received",
+        "latency",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.statuses: Dict[int, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+    def copy(self) -> "_EndpointStats":
+        copy = _EndpointStats()
+        copy.count = self.count
+        copy.errors = self.errors
+        copy.retries = self.retries
+        copy.statuses = dict(self.statuses)
+        copy.bytes_sent = self.bytes_sent
+        copy.bytes_received = self.bytes_received
+        copy.latency = self.latency.copy()
+        return copy
+
+    def as_dict(self) -> dict:
+        latency = self.latency
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "statuses": dict(self.statuses),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency": {
+                "mean": latency.total / latency.count if latency.count else None,
+                "p50": latency.percentile(0.50),
+                "p95": latency.percentile(0.95),
+                "p99": latency.percentile(0.99),
+                "max": latency.max if latency.count else None,
+            },
+        }
+
+
+def _request_size(response) -> int:
+    # the prepared request (requests) or the request (httpx) the response answers
+    request = getattr(response, "request", None)
+    body = getattr(request, "body", None)
+    if body is None:
+        body = getattr(request, "content", None)
+    if body is None or not hasattr(body, "__len__"):
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    return len(body)
+
+
+class MetricsCollector(RequestHook):
+    """
+
+    Request hook aggregating, per endpoint template (e.g. "POST /drafts/{id}/publish"),
+    the number of attempts, failures, status codes, bytes and a latency histogram.
+
+        >>> metrics = MetricsCollector()
+        >>> api = Api(email=..., password=..., metrics=metrics)
+        >>> metrics.snapshot()["GET /drafts"]["latency"]["p95"]
+
+    Every attempt is counted, retries included. It can be shared between several Api
+    instances and threads.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Tuple[str, str], _EndpointStats] = {}
+
+    def _stats(self, key: Tuple[str, str]) -> _EndpointStats:
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = _EndpointStats()
+        return stats
+
+    def on_response(self, method, url, response, elapsed):
+        key = (method.upper(), endpoint_template(url))
+        sent = _request_size(response)
+        received = len(response.content)
+        with self._lock:
+            stats = self._stats(key)
+            stats.count += 1
+            stats.statuses[response.status_code] = (
+                stats.statuses.get(response.status_code, 0) + 1
+            )
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+            stats.latency.record(elapsed)
+
+    def on_error(self, method, url, error, elapsed):
+        key = (method.upper(), endpoint_template(url))
+        responded = isinstance(error, (SubstackAPIException, SubstackRequestException))
+        with self._lock:
+            stats = self._stats(key)
+            stats.errors += 1
+            if not responded:
+                # no response, on_response was not called for this attempt
+                stats.count += 1
+                stats.latency.record(elapsed)
+
+    def on_retry(self, method, url, attempt, delay):
+        key = (method.upper(), endpoint_template(url))
+        with self._lock:
+            self._stats(key).retries += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Current metrics of every endpoint called so far.
+
+        Returns:
+            A dict keyed by "METHOD /endpoint/template", with count, errors, retries,
+            statuses, bytes_sent, bytes_received and latency (mean, p50, p95, p99 and max,
+            in seconds).
+        """
+        with self._lock:
+            return {
+                f"{method} {template}": stats.as_dict()
+                for (method, template), stats in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        """
+        Forget everything recorded so far.
+        """
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_prometheus(self, prefix: str = "substack") -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix: prefix of the metric names.
+
+        Returns:
+            {prefix}_requests_total (by method, endpoint and status),
+            {prefix}_request_errors_total, {prefix}_request_retries_total,
+            {prefix}_request_bytes_sent_total, {prefix}_request_bytes_received_total
+            and the {prefix}_request_duration_seconds histogram.
+        """
+        # copy under the lock, format outside of it
+        with self._lock:
+            endpoints = [
+                ({"method": method, "endpoint": template}, stats.copy())
+                for (method, template), stats in sorted(self._endpoints.items())
+            ]
+
+        name = f"{prefix}_requests_total"
+        lines = [
+            f"# HELP {name} Responses received, by status.",
+            f"# TYPE {name} counter",
+        ]
+        for labels, stats in endpoints:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(
+                    prometheus_sample(name, dict(labels, status=status), count)
+                )
+        counters = (
+            ("request_errors_total", "Failed attempts.", "errors"),
+            ("request_retries_total", "Retried attempts.", "retries"),
+            ("request_bytes_sent_total", "Request body bytes.", "bytes_sent"),
+            ("request_bytes_received_total", "Response body bytes.", "bytes_received"),
+        )
+        for suffix, description, attribute in counters:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, stats in endpoints:
+                lines.append(prometheus_sample(name, labels, getattr(stats, attribute)))
+        name = f"{prefix}_request_duration_seconds"
+        lines.append(f"# HELP {name} Latency of the attempts.")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, stats in endpoints:
+            lines.extend(prometheus_histogram(name, labels, stats.latency))
+        return "\n".join(lines) + "\n"
+
+
+def prometheus_sample(name: str, labels: dict, value) -> str:
+    """
+    Format one sample line of the Prometheus text exposition format.
+
+    Args:
+        name: metric name.
+        labels: labels of the series, values are escaped.
+        value: the sample value.
+    """
+    if not labels:
+        return f"{name} {value}"
+    escaped = (
+        str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for label in labels.values()
+    )
+    pairs = ",".join(f'{key}="{label}"' for key, label in zip(labels, escaped))
+    return f"{name}{{{pairs}}} {value}"
+
+
+def prometheus_histogram(name: str, labels: dict, histogram: LatencyHistogram) -> list:
+    """
+    Render a LatencyHistogram as the sample lines of a Prometheus histogram.
+
+    Args:
+        name: metric name, without the _bucket/_sum/_count suffixes.
+        labels: labels of the series.
+        histogram: the histogram, not modified concurrently.
+
+    Returns:
+        The _bucket lines (cumulative, one per bound and +Inf), then _sum and _count.
+    """
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKET_BOUNDS, histogram.counts):
+        cumulative += count
+        bucket_labels = dict(labels, le=f"{bound:.6g}")
+        lines.append(prometheus_sample(f"{name}_bucket", bucket_labels, cumulative))
+    bucket_labels = dict(labels, le="+Inf")
+    lines.append(prometheus_sample(f"{name}_bucket", bucket_labels, histogram.count))
+    lines.append(prometheus_sample(f"{name}_sum", labels, histogram.total))
+    lines.append(prometheus_sample(f"{name}_count", labels, histogram.count))
+    return lines
@@ -0,0 +1,134 @@
+"""
+
+Publishing Pipeline
+
+"""
+
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+
+from substack.post import Post
+from substack.timing import STAGE_HOOK, StageTimings, record_stages, stage
+
+__all__ = ["publish_markdown"]
+
+
+def publish_markdown(
+    api,
+    title: str,
+    markdown: str,
+    subtitle: str = "",
+    audience: str = "everyone",
+    write_comment_permissions: str = "everyone",
+    search_engine_title: Optional[str] = None,
+    search_engine_description: Optional[str] = None,
+    slug: Optional[str] = None,
+    draft_section_id: Optional[int] = None,
+    tags: Optional[List[str]] = None,
+    prepublish: bool = False,
+    publish: bool = False,
+    send: bool = True,
+    share_automatically: bool = False,
+    image_uploader=None,
+    timings: bool = False,
+    result: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Create a draft from Markdown, then optionally tag, prepublish and publish it.
+
+        >>> result = publish_markdown(api, "Title", "# Hello", tags=["news"], timings=True)
+        >>> result["timings"]["stages"]["post_draft"]
+        {'elapsed': 0.21, 'requests': 1, 'bytes_sent': 812, 'bytes_received': 1534}
+
+    Args:
+        api: the Api to use.
+        title: draft title.
+        markdown: Markdown body.
+        subtitle: draft subtitle.
+        audience: one of "everyone", "only_paid", "founding", "only_free".
+        write_comment_permissions: one of "none", "only_paid", "everyone".
+        search_engine_title: optional SEO title, set with put_draft.
+        search_engine_description: optional SEO description, set with put_draft.
+        slug: optional url slug, set with put_draft.
+        draft_section_id: optional section id, set with put_draft.
+        tags: tag names to add to the post.
+        prepublish: if True, run the prepublish checks.
+        publish: if True, publish the draft.
+        send: passed to publish_draft, whether to email subscribers.
+        share_automatically: passed to publish_draft.
+        image_uploader: object whose get_image uploads the images of the Markdown,
+            defaults to api.
+        timings: if True, add a "timings" entry with the elapsed time, requests and
+            bytes of each stage: user, convert, images, post_draft, put_draft, tags,
+            prepublish, publish, and other for anything in between. The first timed
+            call installs STAGE_HOOK on the api for good: concurrent timed calls
+            share it, and it records nothing outside of record_stages.
+        result: dict to fill in, step by step, instead of a new one. After a failure
+            it tells which steps went through (e.g. that the draft exists).
+
+    Returns:
+        The result dict, with "draft", "tags", "prepublish" and "publish" (None for the
+        steps not run), and "timings" if requested.
+    """
+    if result is None:
+        result = {}
+    result.update(draft=None, tags=None, prepublish=None, publish=None)
+
+    stage_timings = StageTimings()
+    if timings:
+        api.add_hook(STAGE_HOOK)
+        recording = record_stages(stage_timings)
+    else:
+        recording = nullcontext()
+
+    try:
+        with recording:
+            with stage("user"):
+                user_id = api.get_user_id()
+
+            post = Post(
+                title=title,
+                subtitle=subtitle or "",
+                user_id=user_id,
+                audience=audience,
+                write_comment_permissions=write_comment_permissions,
+            )
+            # image uploads are timed as their own "images" stage
+            with stage("convert"):
+                post.from_markdown(markdown, api=image_uploader or api)
+
+            with stage("post_draft"):
+                draft = api.post_draft(post.get_draft())
+            result["draft"] = draft
+            draft_id = draft.get("id")
+
+            update_payload: Dict[str, Any] = {}
+            if search_engine_title:
+                update_payload["search_engine_title"] = search_engine_title
+            if search_engine_description:
+                update_payload["search_engine_description"] = search_engine_description
+            if slug:
+                update_payload["slug"] = slug
+            if draft_section_id is not None:
+                update_payload["draft_section_id"] = draft_section_id
+            if update_payload:
+                with stage("put_draft"):
+                    result["draft"] = api.put_draft(draft_id, **update_payload)
+
+            if tags:
+                with stage("tags"):
+                    result["tags"] = api.add_tags_to_post(draft_id, tags)
+
+            if prepublish:
+                with stage("prepublish"):
+                    result["prepublish"] = api.prepublish_draft(draft_id)
+
+            if publish:
+                with stage("publish"):
+                    result["publish"] = api.publish_draft(
+                        draft_id, send=send, share_automatically=share_automatically
+                    )
+    finally:
+        if timings:
+            result["timings"] = stage_timings.as_dict()
+    return result
@@ -6,11 +6,23 @@ Post Utilities
 
 import json
 import re
-from typing import Dict, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Union
 
-__all__ = ["Post", "parse_inline"]
+__all__ = ["Post", "parse_inline", "iter_markdown_nodes"]
 
-from substack.exceptions import SectionNotExistsException
+from substack import cancellation, timing
+from substack.exceptions import RequestCancelledException, SectionNotExistsException
+
+
+# one alternation scanned left to right: a link, **bold** or *italic* (not part of
+# ** or of a longer run of asterisks); links are not matched right after "!" (images)
+_INLINE_PATTERN = re.compile(
+    r"(?<!!)\[(?P<link>[^\]]+)\]\((?P<href>[^)]+)\)"
+    r"|\*\*(?P<strong>[^*]+)\*\*"
+    r"|(?<!\*)\*(?P<em>[^*]+)\*(?!\*)"
+)
 
 
 def parse_inline(text: str) -> List[Dict]:
@@ -23,6 +35,9 @@ def parse_inline(text: str) -> List[Dict]:
       - *Italic*: Text wrapped in single asterisks.
       - [Links]: Text wrapped in square brackets followed by URL in parentheses.
 
+    Marks can be nested, e.g. bold text inside a link or a link inside bold text: the
+    tokens inside carry the outer mark first, then the inner one.
+
     Args:
         text: Text string containing inline Markdown formatting.
 
@@ -33,76 +48,57 @@ def parse_inline(text: str) -> List[Dict]:
         >>> parse_inline("This is **bold** and this is [a link](https://example.com)")
         [{'content': 'This is '}, {'content': 'bold', 'marks': [{'type': 'strong'}]}, {'content': ' and this is '}, {'content': 'a link', 'marks': [{'type': 'link', 'attrs': {'href': 'https://example.com'}}]}]
     """
-    if not text:
-        return []
-
-    tokens = []
-    # Process text character by character to handle nested formatting
-    # We'll use regex to find all markdown patterns, then process them in order
-
-    # Find all markdown patterns: links, bold, italic
-    # Pattern order: links first (to avoid conflicts), then bold, then italic
-    link_pattern = r'\[([^\]]+)\]\(([^)]+)\)'
-    bold_pattern = r'\*\*([^*]+)\*\*'
-    italic_pattern = r'(?<!\*)\*([^*]+)\*(?!\*)'  # Not preceded or followed by *
-
-    # Find all matches with their positions
-    matches = []
-    for match in re.finditer(link_pattern, text):
-        # Skip if it's an image link (starts with ![)
-        # But do NOT skip normal links at position 0.
-        if match.start() == 0 or text[match.start()-1:match.start()+1] != "![":
-            matches.append((match.start(), match.end(), "link", match.group(1), match.group(2)))
-
-    for match in re.finditer(bold_pattern, text):
-        # Check if this range is already covered by a link
-        if not any(start <= match.start() < end for start, end, _, _, _ in matches):
-            matches.append((match.start(), match.end(), "bold", match.group(1), None))
-
-    for match in re.finditer(italic_pattern, text):
-        # Check if this range is already covered by a link or bold
-        if not any(start <= match.start() < end for start, end, _, _, _ in matches):
-            matches.append((match.start(), match.end(), "italic", match.group(1), None))
-
-    # Sort matches by position
-    matches.sort(key=lambda x: x[0])
-
-    # Build tokens
-    last_pos = 0
-    for start, end, match_type, content, url in matches:
-        # Add text before this match
-        if start > last_pos:
-            tokens.append({"content": text[last_pos:start]})
-
-        # Add the formatted content
-        if match_type == "link":
-            tokens.append({
-                "content": content,
-                "marks": [{"type": "link", "attrs": {"href": url}}]
-            })
-        elif match_type == "bold":
-            tokens.append({
-                "content": content,
-                "marks": [{"type": "strong"}]
-            })
-        elif match_type == "italic":
-            tokens.append({
-                "content": content,
-                "marks": [{"type": "em"}]
-            })
-
-        last_pos = end
-
-    # Add remaining text
-    if last_pos < len(text):
-        tokens.append({"content": text[last_pos:]})
-
-    # Filter out empty tokens
-    tokens = [t for t in tokens if t.get("content")]
-
+    tokens: List[Dict] = []
+    if text:
+        _scan_inline(text, (), tokens)
     return tokens
 
 
+def _scan_inline(text: str, marks: tuple, tokens: List[Dict]):
+    """
+    Append the tokens of text to tokens, each with the enclosing marks.
+
+    Args:
+        text: non-empty inline Markdown.
+        marks: (type, href) of the marks enclosing text, outermost first.
+        tokens: list the tokens are appended to.
+    """
+    last = 0
+    for match in _INLINE_PATTERN.finditer(text):
+        start = match.start()
+        if start > last:
+            tokens.append(_inline_token(text[last:start], marks))
+        kind = match.lastgroup
+        if kind == "href":
+            content = match.group("link")
+            inner = marks + (("link", match.group("href")),)
+        else:
+            content = match.group(kind)
+            inner = marks + ((kind, None),)
+        # only rescan the content of a mark when it may hold another one
+        if "*" in content or "[" in content:
+            _scan_inline(content, inner, tokens)
+        else:
+            tokens.append(_inline_token(content, inner))
+        last = match.end()
+    if last < len(text):
+        tokens.append(_inline_token(text[last:], marks))
+
+
+def _inline_token(content: str, marks: tuple) -> Dict:
+    if not marks:
+        return {"content": content}
+    return {
+        "content": content,
+        "marks": [
+            {"type": "link", "attrs": {"href": href}}
+            if href is not None
+            else {"type": kind}
+            for kind, href in marks
+        ],
+    }
+
+
 class Post:
     """
 
@@ -169,9 +165,8 @@ class Post:
 
         """
 
-        self.draft_body["content"] = self.draft_body.get("content", []) + [
-            {"type": item.get("type")}
-        ]
+        # grow the body in place, rebuilding the list made long posts quadratic
+        self.draft_body.setdefault("content", []).append({"type": item.get("type")})
         content = item.get("content")
         if item.get("type") == "captionedImage":
             self.captioned_image(**item)
@@ -260,7 +255,7 @@ class Post:
         node: Dict = {"type": "blockquote"}
         if paragraphs:
             node["content"] = paragraphs
-        self.draft_body["content"] = self.draft_body.get("content", []) + [node]
+        self.draft_body.setdefault("content", []).append(node)
         return self
 
     def horizontal_rule(self):
@@ -404,7 +399,8 @@ class Post:
         Returns:
 
         """
-        out = vars(self)
+        # a copy, so the post can still be edited and serialized again
+        out = dict(vars(self))
         out["draft_body"] = json.dumps(out["draft_body"])
         return out
 
@@ -490,7 +486,7 @@ class Post:
 
         return self
 
-    def from_markdown(self, markdown_content: str, api=None):
+    def from_markdown(self, markdown_content: str, api=None, max_workers: int = 8):
         """
         Parse Markdown content and add it to the post.
 
@@ -503,12 +499,15 @@ class Post:
           - Blockquotes: Lines starting with '>' (consecutive lines grouped)
           - Paragraphs: Regular text blocks
           - Bullet lists: Lines starting with '*' or '-'
-          - Inline formatting: **bold** and *italic* within paragraphs
+          - Inline formatting: **bold** and *italic* within paragraphs, nested in
+            links or around them
 
         Args:
             markdown_content: Markdown string to parse and add to the post.
             api: Optional Api instance for uploading local images. If provided,
                  local image paths will be uploaded via api.get_image().
+            max_workers: Number of images uploaded concurrently. Every image of the
+                 document is uploaded before the nodes are built in document order.
 
         Returns:
             Self for method chaining.
@@ -517,229 +516,446 @@ class Post:
             >>> post = Post("Title", "Subtitle", user_id)
             >>> post.from_markdown("# Heading\\n\\nThis is **bold** text with [a link](https://example.com).")
         """
-        lines = markdown_content.split("\n")
-        blocks = []
-        current_block: List[str] = []
-        in_code_block = False
-        code_block_language = None
-
-        for line in lines:
-            # Check for fenced code block start/end
-            if line.strip().startswith("```"):
-                if in_code_block:
-                    # End of code block
-                    if current_block:
-                        blocks.append({
-                            "type": "code",
-                            "language": code_block_language,
-                            "content": "\n".join(current_block)
-                        })
-                    current_block = []
-                    in_code_block = False
-                    code_block_language = None
-                else:
-                    # Start of code block
-                    if current_block:
-                        blocks.append({"type": "text", "content": "\n".join(current_block)})
-                        current_block = []
-                    # Extract language if specified
-                    language = line.strip()[3:].strip()
-                    code_block_language = language if language else None
-                    in_code_block = True
-                continue
-
-            if in_code_block:
-                # Inside code block - collect lines as-is
-                current_block.append(line)
-            else:
-                # Regular content
-                if line.strip() == "":
-                    # Empty line - end current block if it has content
-                    if current_block:
-                        blocks.append({"type": "text", "content": "\n".join(current_block)})
-                        current_block = []
-                else:
-                    current_block.append(line)
+        blocks = list(_iter_markdown_blocks(markdown_content.split("\n")))
 
-        # Add any remaining content
-        if current_block:
-            if in_code_block:
-                blocks.append({
-                    "type": "code",
-                    "language": code_block_language,
-                    "content": "\n".join(current_block)
-                })
-            else:
-                blocks.append({"type": "text", "content": "\n".join(current_block)})
+        images = {}
+        if api is not None:
+            image_urls = []
+            for block in blocks:
+                image = _markdown_image(block)
+                if image is not None:
+                    image_urls.append(image[1])
+            with timing.stage("images"):
+                images = _upload_images(api, image_urls, max_workers)
 
-        # Process blocks
         for block in blocks:
-            if block["type"] == "code":
-                # Add code block
-                code_content = block.get("content", "").strip()
-                if code_content:
-                    # Substack uses "codeBlock" type
-                    code_attrs = {}
-                    if block.get("language"):
-                        code_attrs["language"] = block["language"]
+            self._add_markdown_block(block, images)
+
+        return self
+
+    def from_markdown_stream(
+        self, lines: Union[str, Iterable[str]], api=None, max_workers: int = 8
+    ):
+        """
+        Parse Markdown read line by line and add it to the post.
+
+        Unlike from_markdown, the document is never held in memory as a whole: the
+        nodes are built block by block, see iter_markdown_nodes.
+
+        Args:
+            lines: file object or iterable of lines, with or without line endings.
+            api: Optional Api instance for uploading local images.
+            max_workers: Number of images uploaded concurrently.
+
+        Returns:
+            Self for method chaining.
+
+        Example:
+            >>> with open("post.md") as file:
+            ...     post.from_markdown_stream(file, api=api)
+        """
+        self.draft_body.setdefault("content", []).extend(
+            iter_markdown_nodes(lines, api=api, max_workers=max_workers)
+        )
+        return self
+
+    def _add_markdown_block(self, block: Dict, images: Dict):
+        """
+        Add the nodes of one Markdown block to the post.
+
+        Args:
+            block: block as produced by _iter_markdown_blocks.
+            images: uploaded url of each image url, images missing here are used as they are.
+        """
+        if block["type"] == "code":
+            # Add code block
+            code_content = block.get("content", "").strip()
+            if code_content:
+                # Substack uses "codeBlock" type
+                code_attrs = {}
+                if block.get("language"):
+                    code_attrs["language"] = block["language"]
+                self.add({
+                    "type": "codeBlock",
+                    "content": code_content,  # Pass as string, code_block method will handle it
+                    "attrs": code_attrs
+                })
+            return
+
+        # Process text block
+        text_content = block.get("content", "").strip()
+        if not text_content:
+            return
+
+        # Process headings (lines starting with '#' characters)
+        if text_content.startswith("#"):
+            level = len(text_content) - len(text_content.lstrip("#"))
+            heading_text = text_content.lstrip("#").strip()
+            if heading_text:  # Only add if there's actual text
+                self.heading(content=heading_text, level=min(level, 6))
+
+        # Process images using Markdown image syntax: ![Alt](URL)
+        # Also handle linked images: [![Alt](image_url)](link_url)
+        elif _is_image_block(text_content):
+            image = _markdown_image(block)
+            if image is not None:
+                alt_text, image_url, link_url = image
+                image_url = images.get(image_url, image_url)
+                if link_url is not None:
+                    # Linked image - create image with href
                     self.add({
-                        "type": "codeBlock",
-                        "content": code_content,  # Pass as string, code_block method will handle it
-                        "attrs": code_attrs
+                        "type": "captionedImage",
+                        "src": image_url,
+                        "alt": alt_text,
+                        "href": link_url
                     })
-            else:
-                # Process text block
-                text_content = block.get("content", "").strip()
-                if not text_content:
-                    continue
-
-                # Process headings (lines starting with '#' characters)
-                if text_content.startswith("#"):
-                    level = len(text_content) - len(text_content.lstrip("#"))
-                    heading_text = text_content.lstrip("#").strip()
-                    if heading_text:  # Only add if there's actual text
-                        self.heading(content=heading_text, level=min(level, 6))
-
-                # Process images using Markdown image syntax: ![Alt](URL)
-                # Also handle linked images: [![Alt](image_url)](link_url)
-                elif text_content.startswith("!") or (text_content.startswith("[") and "![" in text_content):
-                    # Check for linked image first: [![alt](img)](link)
-                    linked_image_match = re.match(r'\[!\[([^\]]*)\]\(([^)]+)\)\]\(([^)]+)\)', text_content)
-                    if linked_image_match:
-                        # Linked image - create image with href
-                        alt_text = linked_image_match.group(1)
-                        image_url = linked_image_match.group(2)
-                        link_url = linked_image_match.group(3)
-
-                        # Adjust image URL if it starts with a slash
-                        image_url = image_url[1:] if image_url.startswith("/") else image_url
-
-                        # If api is provided and image_url is a local file, upload it
-                        if api is not None:
-                            try:
-                                image = api.get_image(image_url)
-                                image_url = image.get("url")
-                            except Exception:
-                                # If upload fails, use original URL
-                                pass
-
-                        self.add({
-                            "type": "captionedImage",
-                            "src": image_url,
-                            "alt": alt_text,
-                            "href": link_url
-                        })
-                    else:
-                        # Regular image: ![Alt](URL)
-                        match = re.match(r"!\[.*?\]\((.*?)\)", text_content)
-                        if match:
-                            image_url = match.group(1)
-                            # Adjust image URL if it starts with a slash
-                            image_url = image_url[1:] if image_url.startswith("/") else image_url
-
-                            # If api is provided and image_url is a local file, upload it
-                            if api is not None:
-                                try:
-                                    image = api.get_image(image_url)
-                                    image_url = image.get("url")
-                                except Exception:
-                                    # If upload fails, use original URL
-                                    pass
-
-                            self.add({"type": "captionedImage", "src": image_url})
-
-                # Process paragraphs, bullet lists, or blockquotes
                 else:
-                    if "\n" in text_content:
-                        # Process each line, grouping consecutive bullets
-                        # into a single bullet_list node and consecutive
-                        # blockquote lines into a single blockquote node.
-                        pending_bullets: List[List[Dict]] = []
-                        pending_quotes: List[str] = []
-
-                        def flush_bullets():
-                            if not pending_bullets:
-                                return
-                            list_items = []
-                            for bullet_nodes in pending_bullets:
-                                list_items.append({
-                                    "type": "list_item",
-                                    "content": [{"type": "paragraph", "content": bullet_nodes}],
-                                })
-                            self.draft_body["content"].append(
-                                {"type": "bullet_list", "content": list_items}
-                            )
-                            pending_bullets.clear()
-
-                        def flush_quotes():
-                            if not pending_quotes:
-                                return
-                            paragraphs: List[Dict] = []
-                            for quote_line in pending_quotes:
-                                tokens = parse_inline(quote_line)
-                                text_nodes = [
-                                    {"type": "text", "text": t["content"]}
-                                    for t in tokens if t
-                                ]
-                                if text_nodes:
-                                    paragraphs.append({"type": "paragraph", "content": text_nodes})
-                            node: Dict = {"type": "blockquote"}
-                            if paragraphs:
-                                node["content"] = paragraphs
-                            self.draft_body["content"].append(node)
-                            pending_quotes.clear()
-
-                        for line in text_content.split("\n"):
-                            line = line.strip()
-                            if not line:
-                                flush_bullets()
-                                flush_quotes()
-                                continue
-
-                            # Check for blockquote marker
-                            if line.startswith("> ") or line == ">":
-                                flush_bullets()
-                                quote_text = line[2:] if line.startswith("> ") else ""
-                                pending_quotes.append(quote_text)
-                                continue
-
-                            # Check for bullet marker
-                            bullet_text = None
-                            if line.startswith("* "):
-                                bullet_text = line[2:].strip()
-                            elif line.startswith("- "):
-                                bullet_text = line[2:].strip()
-                            elif line.startswith("*") and not line.startswith("**"):
-                                bullet_text = line[1:].strip()
-
-                            if bullet_text is not None:
-                                flush_quotes()
-                                tokens = parse_inline(bullet_text)
-                                if tokens:
-                                    pending_bullets.append(tokens)
-                            else:
-                                flush_bullets()
-                                flush_quotes()
-                                tokens = parse_inline(line)
-                                self.add({"type": "paragraph", "content": tokens})
+                    self.add({"type": "captionedImage", "src": image_url})
 
+        # Process paragraphs, bullet lists, or blockquotes
+        else:
+            if "\n" in text_content:
+                # Process each line, grouping consecutive bullets
+                # into a single bullet_list node and consecutive
+                # blockquote lines into a single blockquote node.
+                pending_bullets: List[List[Dict]] = []
+                pending_quotes: List[str] = []
+
+                def flush_bullets():
+                    if not pending_bullets:
+                        return
+                    list_items = []
+                    for bullet_nodes in pending_bullets:
+                        list_items.append({
+                            "type": "list_item",
+                            "content": [{"type": "paragraph", "content": bullet_nodes}],
+                        })
+                    self.draft_body["content"].append(
+                        {"type": "bullet_list", "content": list_items}
+                    )
+                    pending_bullets.clear()
+
+                def flush_quotes():
+                    if not pending_quotes:
+                        return
+                    paragraphs: List[Dict] = []
+                    for quote_line in pending_quotes:
+                        tokens = parse_inline(quote_line)
+                        text_nodes = [
+                            {"type": "text", "text": t["content"]}
+                            for t in tokens if t
+                        ]
+                        if text_nodes:
+                            paragraphs.append({"type": "paragraph", "content": text_nodes})
+                    node: Dict = {"type": "blockquote"}
+                    if paragraphs:
+                        node["content"] = paragraphs
+                    self.draft_body["content"].append(node)
+                    pending_quotes.clear()
+
+                for line in text_content.split("\n"):
+                    line = line.strip()
+                    if not line:
+                        flush_bullets()
+                        flush_quotes()
+                        continue
+
+                    # Check for blockquote marker
+                    if line.startswith("> ") or line == ">":
                         flush_bullets()
+                        quote_text = line[2:] if line.startswith("> ") else ""
+                        pending_quotes.append(quote_text)
+                        continue
+
+                    # Check for bullet marker
+                    bullet_text = None
+                    if line.startswith("* "):
+                        bullet_text = line[2:].strip()
+                    elif line.startswith("- "):
+                        bullet_text = line[2:].strip()
+                    elif line.startswith("*") and not line.startswith("**"):
+                        bullet_text = line[1:].strip()
+
+                    if bullet_text is not None:
                         flush_quotes()
+                        tokens = parse_inline(bullet_text)
+                        if tokens:
+                            pending_bullets.append(tokens)
                     else:
-                        # Single line — could be a blockquote or paragraph
-                        if text_content.startswith("> ") or text_content == ">":
-                            quote_text = text_content[2:] if text_content.startswith("> ") else ""
-                            tokens = parse_inline(quote_text)
-                            text_nodes = [
-                                {"type": "text", "text": t["content"]}
-                                for t in tokens if t
-                            ]
-                            para = {"type": "paragraph", "content": text_nodes} if text_nodes else {"type": "paragraph"}
-                            self.draft_body["content"] = self.draft_body.get("content", []) + [
-                                {"type": "blockquote", "content": [para]}
-                            ]
-                        else:
-                            tokens = parse_inline(text_content)
-                            self.add({"type": "paragraph", "content": tokens})
+                        flush_bullets()
+                        flush_quotes()
+                        tokens = parse_inline(line)
+                        self.add({"type": "paragraph", "content": tokens})
 
-        return self
+                flush_bullets()
+                flush_quotes()
+            else:
+                # Single line — could be a blockquote or paragraph
+                if text_content.startswith("> ") or text_content == ">":
+                    quote_text = text_content[2:] if text_content.startswith("> ") else ""
+                    tokens = parse_inline(quote_text)
+                    text_nodes = [
+                        {"type": "text", "text": t["content"]}
+                        for t in tokens if t
+                    ]
+                    para = {"type": "paragraph", "content": text_nodes} if text_nodes else {"type": "paragraph"}
+                    self.draft_body.setdefault("content", []).append(
+                        {"type": "blockquote", "content": [para]}
+                    )
+                else:
+                    tokens = parse_inline(text_content)
+                    self.add({"type": "paragraph", "content": tokens})
+
+
+_LINKED_IMAGE_PATTERN = re.compile(r"\[!\[([^\]]*)\]\(([^)]+)\)\]\(([^)]+)\)")
+_IMAGE_PATTERN = re.compile(r"!\[.*?\]\((.*?)\)")
+
+
+def iter_markdown_nodes(
+    lines: Union[str, Iterable[str]], api=None, max_workers: int = 8
+) -> Iterator[Dict]:
+    """
+    Convert Markdown to draft body nodes, block by block.
+
+    Memory is bounded by the largest block rather than by the document: lines are
+    grouped into blocks as they are read and each block's nodes are yielded once
+    built. Images are uploaded concurrently ahead of the block being converted, at
+    most _STREAM_WINDOW blocks ahead.
+
+        >>> with open("post.md") as file:
+        ...     for node in iter_markdown_nodes(file):
+        ...         print(node["type"])
+
+    Args:
+        lines: file object or iterable of lines, with or without line endings, or a
+            Markdown string.
+        api: Optional Api instance for uploading local images.
+        max_workers: Number of images uploaded concurrently.
+
+    Returns:
+        A generator of the nodes from_markdown would add, in document order.
+    """
+    if isinstance(lines, str):
+        lines = lines.split("\n")
+    lines = (line[:-1] if line.endswith("\n") else line for line in lines)
+    builder = Post(title="", subtitle="", user_id=0)
+    nodes = builder.draft_body["content"]
+    blocks = _iter_markdown_blocks(lines)
+    for block, images in _stream_images(blocks, api, max_workers):
+        builder._add_markdown_block(block, images)
+        yield from nodes
+        nodes.clear()
+
+
+# blocks read ahead of the one being converted while their images upload
+_STREAM_WINDOW = 64
+
+
+def _stream_images(blocks: Iterable[Dict], api, max_workers: int):
+    """
+    Pair each block with the uploaded url of its image, uploading ahead.
+
+    Returns:
+        A generator of (block, {image url: uploaded url}) in block order.
+    """
+    if api is None:
+        for block in blocks:
+            yield block, {}
+        return
+
+    with timing.stage("images"):
+        # requests made by the upload threads are attributed to this stage
+        upload = _image_uploader(api)
+
+    if max_workers <= 1:
+        uploaded: Dict[str, str] = {}
+        for block in blocks:
+            image = _markdown_image(block)
+            if image is None:
+                yield block, {}
+                continue
+            image_url = image[1]
+            if image_url not in uploaded:
+                with timing.stage("images"):
+                    uploaded[image_url] = upload(image_url)
+            yield block, {image_url: uploaded[image_url]}
+        return
+
+    def resolve(entry):
+        block, image_url, future = entry
+        if future is None:
+            return block, {}
+        if not future.done():
+            with timing.stage("images"):
+                future.result()
+        return block, {image_url: future.result()}
+
+    futures = {}
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for block in blocks:
+            image = _markdown_image(block)
+            if image is None:
+                pending.append((block, None, None))
+            else:
+                image_url = image[1]
+                future = futures.get(image_url)
+                if future is None:
+                    future = futures[image_url] = executor.submit(upload, image_url)
+                pending.append((block, image_url, future))
+            while pending and (
+                pending[0][2] is None
+                or pending[0][2].done()
+                or len(pending) > _STREAM_WINDOW
+            ):
+                yield resolve(pending.popleft())
+        while pending:
+            yield resolve(pending.popleft())
+
+
+def _iter_markdown_blocks(lines):
+    """
+    Group Markdown lines into blocks.
+
+    Args:
+        lines: iterable of lines without their line endings.
+
+    Returns:
+        A generator of {"type": "code", "language": ..., "content": ...} and
+        {"type": "text", "content": ...} dicts, in document order.
+    """
+    current_block: List[str] = []
+    in_code_block = False
+    code_block_language = None
+
+    for line in lines:
+        # Check for fenced code block start/end
+        if line.strip().startswith("```"):
+            if in_code_block:
+                # End of code block
+                if current_block:
+                    yield {
+                        "type": "code",
+                        "language": code_block_language,
+                        "content": "\n".join(current_block)
+                    }
+                current_block = []
+                in_code_block = False
+                code_block_language = None
+            else:
+                # Start of code block
+                if current_block:
+                    yield {"type": "text", "content": "\n".join(current_block)}
+                    current_block = []
+                # Extract language if specified
+                language = line.strip()[3:].strip()
+                code_block_language = language if language else None
+                in_code_block = True
+            continue
+
+        if in_code_block:
+            # Inside code block - collect lines as-is
+            current_block.append(line)
+        else:
+            # Regular content
+            if line.strip() == "":
+                # Empty line - end current block if it has content
+                if current_block:
+                    yield {"type": "text", "content": "\n".join(current_block)}
+                    current_block = []
+            else:
+                current_block.append(line)
+
+    # Add any remaining content
+    if current_block:
+        if in_code_block:
+            yield {
+                "type": "code",
+                "language": code_block_language,
+                "content": "\n".join(current_block)
+            }
+        else:
+            yield {"type": "text", "content": "\n".join(current_block)}
+
+
+def _is_image_block(text_content: str) -> bool:
+    return text_content.startswith("!") or (
+        text_content.startswith("[") and "![" in text_content
+    )
+
+
+def _markdown_image(block: Dict):
+    """
+    Extract the image of an image block.
+
+    Args:
+        block: block as produced by _iter_markdown_blocks.
+
+    Returns:
+        (alt text, image url, link url) with link url None for a plain image,
+        or None if the block is not an image.
+    """
+    if block["type"] != "text":
+        return None
+    text_content = block.get("content", "").strip()
+    if text_content.startswith("#") or not _is_image_block(text_content):
+        return None
+
+    # Check for linked image first: [![alt](img)](link)
+    linked_image_match = _LINKED_IMAGE_PATTERN.match(text_content)
+    if linked_image_match:
+        alt_text, image_url, link_url = linked_image_match.groups()
+    else:
+        # Regular image: ![Alt](URL)
+        match = _IMAGE_PATTERN.match(text_content)
+        if not match:
+            return None
+        alt_text, image_url, link_url = None, match.group(1), None
+
+    # Adjust image URL if it starts with a slash
+    image_url = image_url[1:] if image_url.startswith("/") else image_url
+    return alt_text, image_url, link_url
+
+
+def _upload_images(api, image_urls: List[str], max_workers: int) -> Dict[str, str]:
+    """
+    Upload images concurrently.
+
+    Args:
+        api: object with a get_image method, usually an Api.
+        image_urls: image urls or local paths, duplicates are uploaded once.
+        max_workers: number of concurrent uploads.
+
+    Returns:
+        The uploaded url of each image. If an upload fails the original url is kept.
+    """
+
+    upload = _image_uploader(api)
+    image_urls = list(dict.fromkeys(image_urls))
+    if max_workers <= 1 or len(image_urls) <= 1:
+        uploaded = [upload(image_url) for image_url in image_urls]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            uploaded = list(executor.map(upload, image_urls))
+    return dict(zip(image_urls, uploaded))
+
+
+def _image_uploader(api):
+    """
+    Returns:
+        A function uploading an image with api and returning its url, or the
+        original url if the upload fails, bound to the caller's context.
+    """
+
+    @cancellation.bind_context
+    def upload(image_url):
+        try:
+            image = api.get_image(image_url)
+            return image.get("url")
+        except RequestCancelledException:
+            raise
+        except Exception:
+            # If upload fails, use original URL
+            return image_url
+
+    return upload
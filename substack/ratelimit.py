@@ -0,0 +1,194 @@
+"""
+
+Rate Limiting Utilities
+
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+__all__ = ["RateLimiter", "TokenBucket", "endpoint_class"]
+
+
+def endpoint_class(method: str, url: str) -> str:
+    """
+    Classify a request into the bucket class it is limited by.
+
+    Args:
+        method: HTTP method.
+        url: absolute url of the request.
+
+    Returns:
+        One of "publish", "image", "write" or "read".
+    """
+    path = urlsplit(url).path.rstrip("/")
+    if path.endswith("/publish") or path.endswith("/schedule"):
+        return "publish"
+    if path.endswith("/image"):
+        return "image"
+    if method.upper() != "GET":
+        return "write"
+    return "read"
+
+
+class TokenBucket:
+    """
+
+    A token bucket refilled at a constant rate.
+
+    Tokens are reserved rather than waited for: the balance may go negative and
+    the caller is told how long to wait for its token. This keeps the critical
+    section to a few arithmetic operations, the sleep happens outside of it.
+    Not thread-safe on its own, RateLimiter serializes access.
+
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+
+        Args:
+            rate: tokens added per second.
+            capacity: maximum burst size, defaults to one second worth of tokens.
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """
+        Take one token.
+
+        Returns:
+            Seconds to wait before the token is actually available.
+        """
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+
+class RateLimiter:
+    """
+
+    Client-side rate limiter shared by every request of an Api.
+
+    Each request takes a token from the bucket of its host and from the bucket
+    of its endpoint class on that host (see endpoint_class), and waits for the
+    later of the two.
+
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: Optional[float] = None,
+        class_limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+    ):
+        """
+
+        To throttle every host to 5 requests per second and publications to one every 10 seconds:
+            >>> limiter = RateLimiter(rate=5, class_limits={"publish": (0.1, 1)})
+            >>> api = Api(email=..., password=..., rate_limiter=limiter)
+
+        Args:
+            rate: requests per second allowed per host.
+            burst: bucket capacity per host, defaults to one second worth of requests.
+            class_limits: optional (rate, burst) per endpoint class, e.g. {"write": (1, 3)}.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.class_limits = dict(class_limits or {})
+        self._buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+        self.last_delay = 0.0
+
+    def _bucket(self, host: str, klass: Optional[str]) -> Optional[TokenBucket]:
+        key = (host, klass)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if klass is None:
+                bucket = TokenBucket(self.rate, self.burst)
+            elif klass in self.class_limits:
+                bucket = TokenBucket(*self.class_limits[klass])
+            else:
+                return None
+            self._buckets[key] = bucket
+        return bucket
+
+    def reserve(self, method: str, url: str) -> float:
+        """
+        Reserve a slot for a request without sleeping.
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the request.
+
+        Returns:
+            Seconds the caller has to wait before sending the request.
+        """
+        host = urlsplit(url).netloc
+        klass = endpoint_class(method, url)
+        with self._lock:
+            now = time.monotonic()
+            delay = self._bucket(host, None).reserve(now)
+            class_bucket = self._bucket(host, klass)
+            if class_bucket is not None:
+                delay = max(delay, class_bucket.reserve(now))
+
+            self.requests += 1
+            self.last_delay = delay
+            if delay > 0:
+                self.throttled += 1
+                self.total_delay += delay
+                self.max_delay = max(self.max_delay, delay)
+        return delay
+
+    def acquire(
+        self, method: str, url: str, sleep: Callable[[float], None] = time.sleep
+    ) -> float:
+        """
+        Block until a request may be sent.
+
+        Args:
+            method: HTTP method.
+            url: absolute url of the request.
+            sleep: function waiting for the delay, e.g. one that a cancellation
+                interrupts by raising.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        delay = self.reserve(method, url)
+        if delay > 0:
+            sleep(delay)
+        return delay
+
+    def stats(self) -> dict:
+        """
+        Queueing statistics, to tell when the client is throttling itself.
+
+        Returns:
+            Counts of requests and throttled requests, and total, max, mean and last delay in seconds.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "total_delay": self.total_delay,
+                "max_delay": self.max_delay,
+                "mean_delay": self.total_delay / self.requests
+                if self.requests
+                else 0.0,
+                "last_delay": self.last_delay,
+            }
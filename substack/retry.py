@@ -0,0 +1,130 @@
+"""
+
+Retry Utilities
+
+"""
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+__all__ = ["RetryPolicy", "parse_retry_after"]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse the value of a Retry-After header.
+
+    Args:
+        value: either a number of seconds or an HTTP date.
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+
+    Decides whether, and after how long, a failed request is sent again.
+
+    A 429 means the request was rejected before being processed, so it is retried
+    for every method. Server errors and connection errors are retried only for
+    idempotent methods, since a POST may already have been applied.
+
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        max_retry_time: float = 60.0,
+        jitter: bool = True,
+    ):
+        """
+
+        Args:
+            max_retries: maximum number of retries per call, 0 disables retries.
+            backoff_factor: base delay, the n-th retry waits up to backoff_factor * 2 ** n seconds.
+            max_backoff: upper bound of a single exponential backoff delay.
+            max_retry_time: total number of seconds a call may spend retrying. A wait that
+                would exceed this budget is not attempted and the error is raised instead.
+            jitter: if True, use full jitter (a random delay between 0 and the backoff).
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_time = max_retry_time
+        self.jitter = jitter
+
+    def is_retryable(self, method: str, status_code: Optional[int] = None) -> bool:
+        """
+
+        Args:
+            method: HTTP method of the request.
+            status_code: status of the response, None for a connection error.
+
+        Returns:
+            True if the failure can be retried safely.
+        """
+        if status_code == 429:
+            return True
+        if status_code is not None and status_code not in self.RETRY_STATUSES:
+            return False
+        return method.upper() in self.IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Exponential backoff delay of the given (zero based) retry attempt.
+        """
+        delay = min(self.max_backoff, self.backoff_factor * (2**attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def next_delay(
+        self,
+        method: str,
+        attempt: int,
+        started: float,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ) -> Optional[float]:
+        """
+
+        Args:
+            method: HTTP method of the request.
+            attempt: number of retries already made.
+            started: time.monotonic() of the first attempt.
+            status_code: status of the failed response, None for a connection error.
+            retry_after: seconds requested by the server through Retry-After.
+
+        Returns:
+            Seconds to sleep before the next attempt, or None to give up.
+        """
+        if attempt >= self.max_retries or not self.is_retryable(method, status_code):
+            return None
+        delay = retry_after if retry_after is not None else self.backoff(attempt)
+        if time.monotonic() - started + delay > self.max_retry_time:
+            return None
+        return delay
@@ -0,0 +1,171 @@
+"""
+
+Stage Timing
+
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from substack.exceptions import SubstackAPIException, SubstackRequestException
+from substack.hooks import RequestHook
+from substack.metrics import _request_size
+
+__all__ = ["StageTimings", "record_stages", "stage", "STAGE_HOOK"]
+
+_current_stage: contextvars.ContextVar[Optional["_Stage"]] = contextvars.ContextVar(
+    "substack_stage", default=None
+)
+
+# requests made while recording but outside any named stage
+OTHER_STAGE = "other"
+
+
+class StageTimings:
+    """
+
+    Elapsed time, number of requests and bytes of each stage of an operation.
+
+    The elapsed time of a stage excludes the stages nested in it, so the stages add up
+    to the total. Requests are attributed to the innermost stage, including requests
+    made by worker threads that inherited the context (see cancellation.bind_context).
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, dict] = {}
+        self.total: Optional[float] = None
+
+    def _stage(self, name: str) -> dict:
+        stats = self._stages.get(name)
+        if stats is None:
+            stats = self._stages[name] = {
+                "elapsed": 0.0,
+                "requests": 0,
+                "bytes_sent": 0,
+                "bytes_received": 0,
+            }
+        return stats
+
+    def add_time(self, name: str, elapsed: float):
+        with self._lock:
+            self._stage(name)["elapsed"] += elapsed
+
+    def add_request(self, name: str, sent: int = 0, received: int = 0):
+        with self._lock:
+            stats = self._stage(name)
+            stats["requests"] += 1
+            stats["bytes_sent"] += sent
+            stats["bytes_received"] += received
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            {"total": seconds, "stages": {name: {"elapsed", "requests", "bytes_sent",
+            "bytes_received"}}}, stages in the order they started.
+        """
+        with self._lock:
+            stages = {name: dict(stats) for name, stats in self._stages.items()}
+        return {"total": self.total, "stages": stages}
+
+
+class _Stage:
+    __slots__ = ("name", "timings", "nested")
+
+    def __init__(self, name: str, timings: StageTimings):
+        self.name = name
+        self.timings = timings
+        # time spent in the stages nested in this one
+        self.nested = 0.0
+
+
+@contextmanager
+def record_stages(timings: Optional[StageTimings] = None):
+    """
+    Record the stages entered in the block, and the requests made in them.
+
+    The Api making the requests must have STAGE_HOOK installed.
+
+        >>> api.add_hook(STAGE_HOOK)
+        >>> with record_stages() as timings:
+        ...     with stage("drafts"):
+        ...         api.get_drafts()
+        >>> timings.as_dict()["stages"]["drafts"]["requests"]
+        1
+
+    Args:
+        timings: StageTimings to record into, a new one if not given.
+
+    Returns:
+        The StageTimings, complete when the block exits.
+    """
+    timings = timings if timings is not None else StageTimings()
+    root = _Stage(OTHER_STAGE, timings)
+    token = _current_stage.set(root)
+    started = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        _current_stage.reset(token)
+        timings.total = time.perf_counter() - started
+        own = timings.total - root.nested
+        stats = timings.as_dict()["stages"]
+        if OTHER_STAGE in stats or own > 0.001:
+            timings.add_time(OTHER_STAGE, own)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time the block as the stage name of the operation being recorded.
+
+    A no-op when no record_stages block is active, so library code can mark its
+    stages unconditionally.
+
+    Args:
+        name: name of the stage, a stage entered several times accumulates.
+    """
+    parent = _current_stage.get()
+    if parent is None:
+        yield
+        return
+    current = _Stage(name, parent.timings)
+    # registered on entry, so stages are listed in the order they started
+    current.timings.add_time(name, 0.0)
+    token = _current_stage.set(current)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+        elapsed = time.perf_counter() - started
+        parent.nested += elapsed
+        current.timings.add_time(name, elapsed - current.nested)
+
+
+class StageHook(RequestHook):
+    """
+
+    Request hook attributing every request to the stage being recorded, if any.
+
+    """
+
+    def on_response(self, method, url, response, elapsed):
+        current = _current_stage.get()
+        if current is not None:
+            current.timings.add_request(
+                current.name, _request_size(response), len(response.content)
+            )
+
+    def on_error(self, method, url, error, elapsed):
+        current = _current_stage.get()
+        responded = isinstance(error, (SubstackAPIException, SubstackRequestException))
+        if current is not None and not responded:
+            current.timings.add_request(current.name)
+
+
+STAGE_HOOK = StageHook()
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import inspect
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
 try:
     from dotenv import load_dotenv
@@ -11,38 +16,141 @@ except ImportError:
 from mcp.server.fastmcp import FastMCP
 
 from substack.api import Api
-from substack.post import Post
+from substack.cancellation import cancel_scope
+from substack.exceptions import SubstackAPIException
+from substack.image_cache import ImageCache
+from substack.pipeline import publish_markdown
+from substack.timing import STAGE_HOOK
+from substack_mcp.metrics import ServerMetrics, start_metrics_export
 
 if load_dotenv is not None:
     load_dotenv()
 
+T = TypeVar("T")
 
-def get_api() -> Api:
+
+_api: Optional[Api] = None
+_api_lock = threading.Lock()
+
+# statuses meaning the session of the shared client may no longer be valid
+_AUTH_ERROR_STATUSES = (401, 403)
+
+# outlives the clients: a re-login keeps the request metrics
+metrics = ServerMetrics()
+metrics.image_cache = lambda: _api.image_cache if _api is not None else None
+
+
+def _build_api() -> Api:
     email = os.getenv("EMAIL")
     password = os.getenv("PASSWORD")
     cookies_path = os.getenv("COOKIES_PATH")
     cookies_string = os.getenv("COOKIES_STRING")
     publication_url = os.getenv("PUBLICATION_URL")
+    image_cache_path = os.getenv("SUBSTACK_IMAGE_CACHE")
+    options = {
+        "publication_url": publication_url,
+        "lazy": True,
+        "metrics": metrics.requests,
+        # lets publish_markdown(timings=True) attribute requests to its stages
+        "hooks": [STAGE_HOOK],
+        "image_cache": ImageCache(image_cache_path) if image_cache_path else None,
+    }
 
+    # lazy: authentication happens on the first tool call, not at server start
     if cookies_path or cookies_string:
-        return Api(
-            cookies_path=cookies_path,
-            cookies_string=cookies_string,
-            publication_url=publication_url,
-        )
+        return Api(cookies_path=cookies_path, cookies_string=cookies_string, **options)
 
     if email and password:
-        return Api(
-            email=email,
-            password=password,
-            publication_url=publication_url,
-        )
+        return Api(email=email, password=password, **options)
 
     raise ValueError(
         "Missing Substack auth configuration: set EMAIL/PASSWORD or COOKIES_PATH/COOKIES_STRING"
     )
 
 
+def get_api() -> Api:
+    """Return the client shared by every tool call, creating it on first use.
+
+    The client keeps its session, pooled connections and caches (profile, tags)
+    for the lifetime of the server.
+    """
+    global _api
+    with _api_lock:
+        if _api is None:
+            _api = _build_api()
+        return _api
+
+
+def reset_api(stale: Optional[Api] = None) -> None:
+    """Drop the shared client so that the next call builds and authenticates a new one.
+
+    Args:
+        stale: only drop the shared client if it is still this one, so that concurrent
+            callers seeing the same expired session rebuild it once.
+    """
+    global _api
+    with _api_lock:
+        if stale is None or _api is stale:
+            _api = None
+
+
+def _session_expired(client: Api, error: SubstackAPIException) -> bool:
+    """Tell whether an error means the session of client is dead.
+
+    A 401 always does. A 403 may also reject the request itself (permissions, draft
+    state), so it only counts if fetching the user profile is rejected too.
+    """
+    if error.status_code not in _AUTH_ERROR_STATUSES:
+        return False
+    if error.status_code == 401:
+        return True
+    try:
+        client.get_user_profile(refresh=True)
+    except SubstackAPIException as e:
+        return e.status_code in _AUTH_ERROR_STATUSES
+    return False
+
+
+def _with_api(operation: Callable[[Api], T]) -> T:
+    """Run operation with the shared client, re-authenticating once if the session expired."""
+    client = get_api()
+    try:
+        return operation(client)
+    except SubstackAPIException as e:
+        if not _session_expired(client, e):
+            raise
+        reset_api(client)
+    return operation(get_api())
+
+
+# tool bodies block on HTTP: they run on these threads so the event loop keeps serving
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SUBSTACK_MCP_WORKERS", "8")),
+    thread_name_prefix="substack-mcp",
+)
+
+
+async def _run_blocking(function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function on the tool executor without blocking the event loop.
+
+    If the awaiting task is cancelled (e.g. the client cancels the tool call), the
+    function's Substack requests stop before their next attempt or retry wait.
+    """
+    event = threading.Event()
+
+    def run() -> T:
+        with cancel_scope(event):
+            return function(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    try:
+        return await loop.run_in_executor(_executor, context.run, run)
+    except asyncio.CancelledError:
+        event.set()
+        raise
+
+
 def _normalize_tags(tags: Optional[Any]) -> List[str]:
     if tags is None:
         return []
@@ -53,10 +161,114 @@ def _normalize_tags(tags: Optional[Any]) -> List[str]:
     raise ValueError("tags must be a string or a list of strings")
 
 
+class _SharedClient:
+    """Stands in for an Api, running each method call on the shared client.
+
+    Every call goes through `_with_api`, so it is retried on its own after a re-login
+    and a refreshed session never repeats a write that already went through.
+    """
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return _with_api(lambda client: getattr(client, name)(*args, **kwargs))
+
+        return call
+
+
+_shared_client = _SharedClient()
+
+
+def _post_draft_from_markdown(
+    title: str,
+    markdown: str,
+    subtitle: Optional[str] = "",
+    audience: str = "everyone",
+    write_comment_permissions: str = "everyone",
+    search_engine_title: Optional[str] = None,
+    search_engine_description: Optional[str] = None,
+    slug: Optional[str] = None,
+    draft_section_id: Optional[int] = None,
+    tags: Optional[Any] = None,
+    prepublish: bool = False,
+    publish: bool = False,
+    send: bool = True,
+    share_automatically: bool = False,
+    timings: bool = False,
+    image_uploader: Optional[Any] = None,
+    result: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Blocking implementation of `post_draft_from_markdown`, see `publish_markdown`."""
+    return publish_markdown(
+        _shared_client,
+        title,
+        markdown,
+        subtitle=subtitle or "",
+        audience=audience,
+        write_comment_permissions=write_comment_permissions,
+        search_engine_title=search_engine_title,
+        search_engine_description=search_engine_description,
+        slug=slug,
+        draft_section_id=draft_section_id,
+        tags=_normalize_tags(tags),
+        prepublish=prepublish,
+        publish=publish,
+        send=send,
+        share_automatically=share_automatically,
+        image_uploader=image_uploader,
+        timings=timings,
+        result=result,
+    )
+
+
+_POST_SPEC_FIELDS = frozenset(
+    inspect.signature(_post_draft_from_markdown).parameters
+) - {"image_uploader", "result"}
+
+
+def _check_post_spec(spec: Any) -> None:
+    if not isinstance(spec, dict):
+        raise ValueError("each post must be a dict")
+    missing = {"title", "markdown"} - spec.keys()
+    if missing:
+        raise ValueError(f"missing post fields: {', '.join(sorted(missing))}")
+    unknown = spec.keys() - _POST_SPEC_FIELDS
+    if unknown:
+        raise ValueError(f"unknown post fields: {', '.join(sorted(unknown))}")
+
+
+class _SharedImageUploader:
+    """Image uploader for `Post.from_markdown` that uploads each image once per batch.
+
+    Posts asking for an image already being uploaded wait for that upload instead of
+    starting their own. Failed uploads are forgotten, so a later post tries again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._uploads: Dict[str, Future] = {}
+
+    def get_image(self, image: str) -> Dict[str, Any]:
+        with self._lock:
+            upload = self._uploads.get(image)
+            owner = upload is None
+            if owner:
+                upload = self._uploads[image] = Future()
+        metrics.record_shared_image(hit=not owner)
+        if owner:
+            try:
+                upload.set_result(_with_api(lambda client: client.get_image(image)))
+            except BaseException as ex:
+                with self._lock:
+                    del self._uploads[image]
+                upload.set_exception(ex)
+        return upload.result()
+
+
 mcp = FastMCP("substack")
 
 
 @mcp.tool()
+@metrics.instrument
 async def post_draft_from_markdown(
     title: str,
     markdown: str,
@@ -72,6 +284,7 @@ async def post_draft_from_markdown(
     publish: bool = False,
     send: bool = True,
     share_automatically: bool = False,
+    timings: bool = False,
 ) -> Dict[str, Any]:
     """Create or update a Substack draft from Markdown.
 
@@ -93,9 +306,13 @@ async def post_draft_from_markdown(
         publish: If true, calls `publish_draft` after creation (and optionally prepublish).
         send: Passed to `publish_draft` for newsletter delivery.
         share_automatically: Passed to `publish_draft`.
+        timings: If true, also return `timings`: the total and, per stage (`user`,
+            `convert`, `images`, `post_draft`, `put_draft`, `tags`, `prepublish`,
+            `publish`), the elapsed seconds, number of requests and bytes.
 
     Returns:
-        dict containing drafted post (`draft`), optional `tags`, `prepublish`, `publish` results.
+        dict containing drafted post (`draft`), optional `tags`, `prepublish`, `publish` results,
+        and `timings` if requested.
 
     Examples:
         With the YAML structure from the README, a caller can map fields like:
@@ -162,58 +379,97 @@ async def post_draft_from_markdown(
 
         This docstring example is meant to mirror the YAML-driven workflow and show how to decompose the same operations into explicit tool calls.
     """
-    client = get_api()
-    user_id = client.get_user_id()
 
-    post = Post(
-        title=title,
-        subtitle=subtitle or "",
-        user_id=user_id,
+    return await _run_blocking(
+        _post_draft_from_markdown,
+        title,
+        markdown,
+        subtitle=subtitle,
         audience=audience,
         write_comment_permissions=write_comment_permissions,
+        search_engine_title=search_engine_title,
+        search_engine_description=search_engine_description,
+        slug=slug,
+        draft_section_id=draft_section_id,
+        tags=tags,
+        prepublish=prepublish,
+        publish=publish,
+        send=send,
+        share_automatically=share_automatically,
+        timings=timings,
     )
 
-    post.from_markdown(markdown, api=client)
 
-    draft = client.post_draft(post.get_draft())
+@mcp.tool()
+@metrics.instrument
+async def post_drafts_from_markdown_batch(
+    posts: List[Dict[str, Any]],
+    max_concurrency: int = 4,
+) -> Dict[str, Any]:
+    """Create many drafts from Markdown, processing several posts at once.
 
-    update_payload: Dict[str, Any] = {}
-    if search_engine_title:
-        update_payload["search_engine_title"] = search_engine_title
-    if search_engine_description:
-        update_payload["search_engine_description"] = search_engine_description
-    if slug:
-        update_payload["slug"] = slug
-    if draft_section_id is not None:
-        update_payload["draft_section_id"] = draft_section_id
+    Each post goes through the same steps as `post_draft_from_markdown` (create,
+    update, tag, prepublish, publish). Up to `max_concurrency` posts are in progress at
+    a time, all on the server's shared client, so tag lookups are resolved once and an
+    image used by several posts is uploaded once. A failing post does not stop the
+    others.
 
-    if update_payload:
-        draft = client.put_draft(draft.get("id"), **update_payload)
+    Args:
+        posts: list of post specs, each a dict with the arguments of
+            `post_draft_from_markdown` (`title` and `markdown` are required).
+        max_concurrency: maximum number of posts in progress at once, further bounded
+            by the server's worker threads.
 
-    tags_list = _normalize_tags(tags)
-    tags_result = None
-    if tags_list:
-        tags_result = client.add_tags_to_post(draft.get("id"), tags_list)
-
-    prepublish_result = None
-    if prepublish:
-        prepublish_result = client.prepublish_draft(draft.get("id"))
-
-    publish_result = None
-    if publish:
-        publish_result = client.publish_draft(
-            draft.get("id"), send=send, share_automatically=share_automatically
-        )
+    Returns:
+        dict with `results`, one per post in input order, and the `succeeded` and
+        `failed` counts. Each result has the post `index` and the `draft`, `tags`,
+        `prepublish` and `publish` results of `post_draft_from_markdown`; a failed post
+        also has `error`, and its fields show the steps completed before the failure.
 
-    return {
-        "draft": draft,
-        "tags": tags_result,
-        "prepublish": prepublish_result,
-        "publish": publish_result,
-    }
+    Examples:
+        ```python
+        from substack_mcp.mcp_server import post_drafts_from_markdown_batch
+
+        batch = await post_drafts_from_markdown_batch(
+            posts=[
+                {'title': 'Part 1', 'markdown': '# One', 'tags': ['series']},
+                {'title': 'Part 2', 'markdown': '# Two', 'tags': ['series']},
+            ],
+            max_concurrency=2,
+        )
+        failed = [r for r in batch['results'] if 'error' in r]
+        ```
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    image_uploader = _SharedImageUploader()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(index: int, spec: Any) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"index": index}
+        async with semaphore:
+            try:
+                _check_post_spec(spec)
+                await _run_blocking(
+                    _post_draft_from_markdown,
+                    image_uploader=image_uploader,
+                    result=result,
+                    **spec,
+                )
+            except Exception as ex:
+                result["error"] = str(ex)
+        return result
+
+    results = await asyncio.gather(
+        *(run(index, spec) for index, spec in enumerate(posts))
+    )
+    failed = sum(1 for result in results if "error" in result)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
 
 
 @mcp.tool()
+@metrics.instrument
 async def put_draft(
     draft_id: int,
     update_payload: Dict[str, Any],
@@ -227,11 +483,13 @@ async def put_draft(
     Returns:
         API response dict for the updated draft.
     """
-    client = get_api()
-    return client.put_draft(draft_id, **update_payload)
+    return await _run_blocking(
+        _with_api, lambda client: client.put_draft(draft_id, **update_payload)
+    )
 
 
 @mcp.tool()
+@metrics.instrument
 async def add_tags(draft_id: int, tags: Any) -> Dict[str, Any]:
     """Add tags to a specific draft/post.
 
@@ -242,14 +500,16 @@ async def add_tags(draft_id: int, tags: Any) -> Dict[str, Any]:
     Returns:
         Response from `add_tags_to_post` (tag IDs + names).
     """
-    client = get_api()
     tags_list = _normalize_tags(tags)
     if not tags_list:
         raise ValueError("tags is required and cannot be empty")
-    return client.add_tags_to_post(draft_id, tags_list)
+    return await _run_blocking(
+        _with_api, lambda client: client.add_tags_to_post(draft_id, tags_list)
+    )
 
 
 @mcp.tool()
+@metrics.instrument
 async def prepublish_draft(draft_id: int) -> Dict[str, Any]:
     """Invoke prepublish checks for a draft.
 
@@ -259,11 +519,13 @@ async def prepublish_draft(draft_id: int) -> Dict[str, Any]:
     Returns:
         Prepublish response dict from Substack API.
     """
-    client = get_api()
-    return client.prepublish_draft(draft_id)
+    return await _run_blocking(
+        _with_api, lambda client: client.prepublish_draft(draft_id)
+    )
 
 
 @mcp.tool()
+@metrics.instrument
 async def publish_draft(
     draft_id: int,
     send: bool = True,
@@ -279,13 +541,16 @@ async def publish_draft(
     Returns:
         Response from Substack `publish_draft`.
     """
-    client = get_api()
-    return client.publish_draft(
-        draft_id, send=send, share_automatically=share_automatically
+    return await _run_blocking(
+        _with_api,
+        lambda client: client.publish_draft(
+            draft_id, send=send, share_automatically=share_automatically
+        ),
     )
 
 
 def main() -> None:
+    start_metrics_export(metrics)
     mcp.run(transport="stdio")
 
 
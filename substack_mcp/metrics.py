@@ -0,0 +1,220 @@
+"""Metrics of the MCP server, exported in the Prometheus text format.
+
+Recording a tool call or a request is a lock, a bisect and a few increments; the
+exposition text is only built when scraped or dumped.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+from substack.metrics import (
+    LatencyHistogram,
+    MetricsCollector,
+    prometheus_histogram,
+    prometheus_sample,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+
+class ServerMetrics:
+    """Tool call statistics, the Substack request metrics and cache hit counts."""
+
+    def __init__(self):
+        self.requests = MetricsCollector()
+        self._lock = threading.Lock()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._shared_images = {"hit": 0, "miss": 0}
+        # returns the ImageCache in use, if any, read when rendering
+        self.image_cache: Callable[[], Any] = lambda: None
+
+    def record_tool(self, name: str, elapsed: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._tools.get(name)
+            if stats is None:
+                stats = self._tools[name] = _ToolStats()
+            stats.calls += 1
+            stats.errors += failed
+            stats.latency.record(elapsed)
+
+    def record_shared_image(self, hit: bool) -> None:
+        with self._lock:
+            self._shared_images["hit" if hit else "miss"] += 1
+
+    def instrument(self, function: Callable) -> Callable:
+        """Decorate an async tool so that its calls, failures and latency are recorded."""
+
+        @functools.wraps(function)
+        async def tool(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = await function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self.record_tool(
+                    function.__name__, time.perf_counter() - started, failed
+                )
+
+        return tool
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            tools = [
+                (name, stats.calls, stats.errors, stats.latency.copy())
+                for name, stats in sorted(self._tools.items())
+            ]
+            shared_images = dict(self._shared_images)
+
+        lines = [
+            "# HELP substack_mcp_tool_calls_total Tool calls.",
+            "# TYPE substack_mcp_tool_calls_total counter",
+        ]
+        for name, calls, _, _ in tools:
+            lines.append(
+                prometheus_sample(
+                    "substack_mcp_tool_calls_total", {"tool": name}, calls
+                )
+            )
+        lines.append("# HELP substack_mcp_tool_errors_total Failed tool calls.")
+        lines.append("# TYPE substack_mcp_tool_errors_total counter")
+        for name, _, errors, _ in tools:
+            lines.append(
+                prometheus_sample(
+                    "substack_mcp_tool_errors_total", {"tool": name}, errors
+                )
+            )
+        name = "substack_mcp_tool_duration_seconds"
+        lines.append(f"# HELP {name} Latency of the tool calls.")
+        lines.append(f"# TYPE {name} histogram")
+        for tool, _, _, latency in tools:
+            lines.extend(prometheus_histogram(name, {"tool": tool}, latency))
+
+        name = "substack_mcp_shared_image_lookups_total"
+        lines.append(f"# HELP {name} Batch image lookups, by result.")
+        lines.append(f"# TYPE {name} counter")
+        for result, count in shared_images.items():
+            lines.append(prometheus_sample(name, {"result": result}, count))
+
+        image_cache = self.image_cache()
+        if image_cache is not None:
+            stats = image_cache.stats()
+            name = "substack_image_cache_lookups_total"
+            lines.append(f"# HELP {name} Image cache lookups, by result.")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(prometheus_sample(name, {"result": "hit"}, stats["hits"]))
+            lines.append(prometheus_sample(name, {"result": "miss"}, stats["misses"]))
+            name = "substack_image_cache_entries"
+            lines.append(f"# HELP {name} Images in the cache.")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(prometheus_sample(name, {}, stats["entries"]))
+
+        return "\n".join(lines) + "\n" + self.requests.to_prometheus()
+
+
+def serve_metrics(
+    metrics: ServerMetrics, port: int, host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """Serve `/metrics` from a daemon thread.
+
+    Args:
+        metrics: the metrics to expose.
+        port: port to listen on, 0 for any free port.
+        host: interface to listen on, only the local one by default.
+
+    Returns:
+        The running server, `shutdown()` stops it.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # stdout and stderr belong to the MCP transport
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="substack-mcp-metrics", daemon=True
+    ).start()
+    return server
+
+
+def write_metrics(metrics: ServerMetrics, path: str) -> None:
+    """Write the metrics to path atomically, e.g. for the node exporter textfile collector."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(metrics.to_prometheus())
+    os.replace(tmp_path, path)
+
+
+def dump_metrics_periodically(
+    metrics: ServerMetrics, path: str, interval: float = 15.0
+) -> threading.Event:
+    """Rewrite the metrics file every interval seconds from a daemon thread.
+
+    Returns:
+        An event, set it to stop the dumps.
+    """
+    stopped = threading.Event()
+
+    def dump() -> None:
+        while True:
+            try:
+                write_metrics(metrics, path)
+            except OSError:
+                pass
+            if stopped.wait(interval):
+                return
+
+    threading.Thread(target=dump, name="substack-mcp-metrics-dump", daemon=True).start()
+    return stopped
+
+
+def start_metrics_export(metrics: ServerMetrics) -> Optional[ThreadingHTTPServer]:
+    """Start the exports configured by the environment.
+
+    SUBSTACK_MCP_METRICS_PORT serves `/metrics` on that port (of
+    SUBSTACK_MCP_METRICS_HOST, 127.0.0.1 by default); SUBSTACK_MCP_METRICS_FILE is
+    rewritten every SUBSTACK_MCP_METRICS_INTERVAL seconds (15 by default).
+
+    Returns:
+        The metrics HTTP server, if one was started.
+    """
+    server = None
+    port = os.getenv("SUBSTACK_MCP_METRICS_PORT")
+    if port:
+        host = os.getenv("SUBSTACK_MCP_METRICS_HOST", "127.0.0.1")
+        server = serve_metrics(metrics, int(port), host)
+    path = os.getenv("SUBSTACK_MCP_METRICS_FILE")
+    if path:
+        interval = float(os.getenv("SUBSTACK_MCP_METRICS_INTERVAL", "15"))
+        dump_metrics_periodically(metrics, path, interval)
+    return server
@@ -0,0 +1,75 @@
+"""Offline stand-ins for the Substack server used by the Api tests."""
+
+import json
+from unittest import mock
+
+import requests
+
+from substack import Api
+
+PUBLICATION_URL = "https://example.substack.com/api/v1"
+
+PROFILE = {
+    "id": 42,
+    "publicationUsers": [
+        {
+            "is_primary": True,
+            "publication": {"id": 1, "subdomain": "example", "custom_domain": None},
+        }
+    ],
+}
+
+
+def make_response(status_code=200, payload=None, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload if payload is not None else {}).encode()
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeServer:
+    """
+    Routes requests to handlers keyed by (method, path suffix) and records them.
+
+    The longest matching suffix wins. Unrouted requests answer 200 with an empty
+    json object, which is what the sign-in page handling expects.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = {("GET", "/user/profile/self"): PROFILE}
+        self.routes.update(routes or {})
+        self.calls = []
+
+    def __call__(self, session, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        path = url.split("?")[0]
+        routes = sorted(self.routes.items(), key=lambda route: -len(route[0][1]))
+        for (route_method, suffix), handler in routes:
+            if route_method == method and path.endswith(suffix):
+                result = (
+                    handler(method, url, **kwargs) if callable(handler) else handler
+                )
+                if isinstance(result, requests.Response):
+                    return result
+                return make_response(200, result)
+        return make_response(200, {})
+
+    def count(self, method, suffix):
+        return sum(
+            1
+            for call_method, url, _ in self.calls
+            if call_method == method and url.split("?")[0].endswith(suffix)
+        )
+
+    def patch(self):
+        return mock.patch.object(
+            requests.Session, "request", autospec=True, side_effect=self
+        )
+
+
+def make_api(server, **kwargs):
+    """Build an Api authenticated by cookie whose requests go to server."""
+    kwargs.setdefault("cookies_string", "substack.sid=abc")
+    with server.patch():
+        return Api(**kwargs)
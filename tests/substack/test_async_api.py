@@ -0,0 +1,100 @@
+"""Tests for AsyncApi."""
+
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from substack.async_api import AsyncApi
+from substack.metrics import MetricsCollector
+
+PROFILE = {
+    "id": 42,
+    "publicationUsers": [
+        {
+            "is_primary": True,
+            "publication": {"id": 1, "subdomain": "example", "custom_domain": None},
+        }
+    ],
+}
+
+
+def make_api(handler):
+    api = AsyncApi(cookies_string="substack.sid=abc")
+    api._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return api
+
+
+class TestAsyncApi:
+    def test_requires_credentials(self):
+        with pytest.raises(ValueError):
+            AsyncApi()
+
+    def test_connect_resolves_primary_publication(self):
+        def handler(request):
+            if request.url.path == "/api/v1/user/profile/self":
+                return httpx.Response(200, json=PROFILE)
+            return httpx.Response(200, json={})
+
+        async def run():
+            api = make_api(handler)
+            await api.connect()
+            await api.aclose()
+            return api
+
+        api = asyncio.run(run())
+        assert api.publication_url == "https://example.substack.com/api/v1"
+
+    def test_concurrent_drafts(self):
+        seen = []
+
+        def handler(request):
+            seen.append(json.loads(request.content))
+            return httpx.Response(200, json={"id": len(seen)})
+
+        async def run():
+            api = make_api(handler)
+            api.publication_url = "https://example.substack.com/api/v1"
+            drafts = await asyncio.gather(
+                *(api.post_draft({"n": i}) for i in range(20))
+            )
+            await api.aclose()
+            return drafts
+
+        drafts = asyncio.run(run())
+        assert len(drafts) == 20
+        assert sorted(body["n"] for body in seen) == list(range(20))
+
+    def test_none_params_are_dropped(self):
+        def handler(request):
+            assert dict(request.url.params) == {"limit": "10"}
+            return httpx.Response(200, json=[])
+
+        async def run():
+            api = make_api(handler)
+            api.publication_url = "https://example.substack.com/api/v1"
+            drafts = await api.get_drafts(limit=10)
+            await api.aclose()
+            return drafts
+
+        assert asyncio.run(run()) == []
+
+    def test_metrics(self):
+        def handler(request):
+            return httpx.Response(200, json={"id": 1})
+
+        async def run():
+            api = make_api(handler)
+            api.add_hook(metrics)
+            api.publication_url = "https://example.substack.com/api/v1"
+            await api.post_draft({"n": 1})
+            await api.aclose()
+
+        metrics = MetricsCollector()
+        asyncio.run(run())
+        stats = metrics.snapshot()["POST /drafts"]
+        assert stats["count"] == 1
+        assert stats["statuses"] == {200: 1}
+        assert stats["bytes_sent"] == len(b'{"n":1}')
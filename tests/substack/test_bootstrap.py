@@ -0,0 +1,116 @@
+"""Tests for bootstrap snapshots."""
+
+import json
+import threading
+
+import pytest
+
+from substack import Api
+from substack.exceptions import SubstackAPIException
+
+from .fakes import PROFILE, PUBLICATION_URL, FakeServer, make_api, make_response
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "bootstrap.json"
+    server = FakeServer()
+    make_api(server, bootstrap_path=str(path))
+    return path
+
+
+class TestBootstrapSnapshot:
+    def test_handshake_saves_snapshot(self, snapshot_path):
+        snapshot = json.loads(snapshot_path.read_text())
+        assert snapshot["user_id"] == 42
+        assert snapshot["publication_url"] == PUBLICATION_URL
+        assert snapshot["cookies"] == {"substack.sid": "abc"}
+
+    def test_fresh_snapshot_starts_without_requests(self, snapshot_path):
+        server = FakeServer()
+        with server.patch():
+            api = Api(bootstrap_path=str(snapshot_path))
+            assert api.get_user_id() == 42
+            assert api.publication_url == PUBLICATION_URL
+        assert server.calls == []
+
+    def test_stale_snapshot_runs_handshake(self, snapshot_path):
+        server = FakeServer()
+        make_api(server, bootstrap_path=str(snapshot_path), bootstrap_max_age=-1)
+        assert server.count("GET", "/user/profile/self") == 1
+
+    def test_stale_snapshot_without_credentials(self, snapshot_path):
+        with pytest.raises(ValueError):
+            Api(bootstrap_path=str(snapshot_path), bootstrap_max_age=-1)
+
+    def test_snapshot_of_other_publication_is_ignored(self, snapshot_path):
+        server = FakeServer()
+        api = make_api(
+            server,
+            lazy=True,
+            bootstrap_path=str(snapshot_path),
+            publication_url="https://other.substack.com",
+        )
+        assert not api._from_snapshot
+
+    def test_rejected_snapshot_falls_back_to_handshake(self, snapshot_path):
+        rejections = [make_response(401, {"error": "Not authorized"})]
+        server = FakeServer(
+            {("GET", "/drafts"): lambda *a, **k: rejections.pop() if rejections else []}
+        )
+        api = make_api(server, bootstrap_path=str(snapshot_path))
+        assert server.calls == []
+        with server.patch():
+            assert api.get_drafts() == []
+        assert server.count("GET", "/drafts") == 2
+        assert server.count("GET", "/user/profile/self") == 1
+        assert not api._from_snapshot
+
+    def test_rejected_profile_fetch_does_not_deadlock(self, snapshot_path):
+        rejections = [make_response(401, {"error": "Not authorized"})]
+
+        def profile(*args, **kwargs):
+            return rejections.pop() if rejections else PROFILE
+
+        server = FakeServer({("GET", "/user/profile/self"): profile})
+        api = make_api(server, bootstrap_path=str(snapshot_path))
+        results = []
+        with server.patch():
+            # a daemon thread, so that a deadlock fails the test instead of hanging
+            thread = threading.Thread(
+                target=lambda: results.append(api.get_user_publications()), daemon=True
+            )
+            thread.start()
+            thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert results[0][0]["subdomain"] == "example"
+        assert not api._from_snapshot
+
+    def test_only_the_rejected_snapshot_request_is_sent_again(self, snapshot_path):
+        rejections = [make_response(401, {"error": "Not authorized"})]
+        server = FakeServer(
+            {
+                ("GET", "/drafts"): lambda *a, **k: rejections.pop()
+                if rejections
+                else [],
+                ("POST", "/drafts/7/publish"): make_response(403, {"error": "No"}),
+            }
+        )
+        api = make_api(server, bootstrap_path=str(snapshot_path))
+        with server.patch():
+            api.get_drafts()
+            with pytest.raises(SubstackAPIException):
+                api.publish_draft(7)
+        assert server.count("POST", "/drafts/7/publish") == 1
+
+    def test_write_rejected_on_live_snapshot_session_is_not_sent_again(
+        self, snapshot_path
+    ):
+        server = FakeServer(
+            {("POST", "/drafts/7/publish"): make_response(403, {"error": "No"})}
+        )
+        api = make_api(server, bootstrap_path=str(snapshot_path))
+        with server.patch(), pytest.raises(SubstackAPIException):
+            api.publish_draft(7)
+        assert server.count("POST", "/drafts/7/publish") == 1
+        assert api._from_snapshot
@@ -0,0 +1,77 @@
+"""Tests for cancelling in-flight Api calls."""
+
+import threading
+import time
+
+import pytest
+
+from substack.cancellation import bind_context, cancel_scope, raise_if_cancelled
+from substack.exceptions import RequestCancelledException
+from substack.ratelimit import RateLimiter
+
+from .fakes import FakeServer, make_api, make_response
+
+
+class TestCancelScope:
+    def test_cancelled_scope_sends_nothing(self):
+        server = FakeServer({("GET", "/drafts"): []})
+        api = make_api(server)
+        with server.patch(), cancel_scope() as event:
+            event.set()
+            with pytest.raises(RequestCancelledException):
+                api.get_drafts()
+        assert server.count("GET", "/drafts") == 0
+
+    def test_cancel_interrupts_retry_wait(self):
+        server = FakeServer(
+            {("GET", "/drafts"): make_response(503, {}, {"Retry-After": "20"})}
+        )
+        api = make_api(server)
+        with server.patch(), cancel_scope() as event:
+            threading.Timer(0.1, event.set).start()
+            started = time.monotonic()
+            with pytest.raises(RequestCancelledException):
+                api.get_drafts()
+        assert time.monotonic() - started < 5
+        assert server.count("GET", "/drafts") == 1
+
+    def test_cancel_interrupts_rate_limiter_wait(self):
+        server = FakeServer({("POST", "/drafts/1/publish"): {}})
+        limiter = RateLimiter(class_limits={"publish": (0.05, 1)})
+        api = make_api(server, rate_limiter=limiter)
+        with server.patch(), cancel_scope() as event:
+            api.publish_draft(1)
+            threading.Timer(0.1, event.set).start()
+            started = time.monotonic()
+            with pytest.raises(RequestCancelledException):
+                api.publish_draft(1)
+        assert time.monotonic() - started < 5
+        assert server.count("POST", "/drafts/1/publish") == 1
+
+    def test_scope_ends_with_block(self):
+        with cancel_scope() as event:
+            event.set()
+        raise_if_cancelled()
+
+    def test_bound_function_sees_scope_in_other_thread(self):
+        errors = []
+
+        def work():
+            try:
+                raise_if_cancelled()
+            except RequestCancelledException as ex:
+                errors.append(ex)
+
+        with cancel_scope() as event:
+            event.set()
+            thread = threading.Thread(target=bind_context(work))
+        thread.start()
+        thread.join()
+        assert len(errors) == 1
+
+    def test_requests_are_bounded_by_the_timeout(self):
+        server = FakeServer({("GET", "/drafts"): []})
+        api = make_api(server, timeout=5.0)
+        with server.patch():
+            api.get_drafts()
+        assert all(kwargs["timeout"] == 5.0 for _, _, kwargs in server.calls)
@@ -0,0 +1,143 @@
+"""Tests for the incremental and batch Markdown conversion."""
+
+import json
+
+from substack.convert import (
+    IncrementalConverter,
+    convert_markdown_many,
+    iter_convert_markdown_many,
+)
+from substack.post import Post
+
+BLOCKS = [
+    "# Title",
+    "Some **bold** text.",
+    "- one\n- two",
+    "> a quote",
+    "```python\nprint(1)\n```",
+    "![a](one.png)",
+    "Last paragraph.",
+]
+
+
+def markdown(blocks):
+    return "\n\n".join(blocks)
+
+
+def converted(blocks, api=None):
+    post = Post(title="T", subtitle="S", user_id=1)
+    return post.from_markdown(markdown(blocks), api=api).draft_body["content"]
+
+
+class FakeImageApi:
+    def __init__(self):
+        self.calls = []
+
+    def get_image(self, image):
+        self.calls.append(image)
+        return {"url": f"https://cdn.example.com/{image}"}
+
+
+class TestIncrementalConverter:
+    def setup_method(self):
+        self.post = Post(title="T", subtitle="S", user_id=1)
+        self.converter = IncrementalConverter(self.post)
+        self.first = self.converter.update(markdown(BLOCKS))
+
+    def content(self):
+        return self.post.draft_body["content"]
+
+    def test_first_update_converts_everything(self):
+        assert self.content() == converted(BLOCKS)
+        assert self.first == [(0, 0, 0, len(self.content()))]
+        assert self.converter.converted == len(BLOCKS)
+
+    def test_unchanged_document(self):
+        nodes = list(self.content())
+        assert self.converter.update(markdown(BLOCKS)) == []
+        assert self.converter.converted == 0
+        assert all(a is b for a, b in zip(nodes, self.content()))
+
+    def test_edited_block_is_the_only_one_converted(self):
+        nodes = list(self.content())
+        edited = list(BLOCKS)
+        edited[1] = "Some *italic* text."
+        assert self.converter.update(markdown(edited)) == [(1, 2, 1, 2)]
+        assert self.converter.converted == 1
+        assert self.content() == converted(edited)
+        # the other nodes are the same objects, spliced around the new one
+        assert self.content()[0] is nodes[0]
+        assert self.content()[2:] == nodes[2:]
+        assert all(a is b for a, b in zip(nodes[2:], self.content()[2:]))
+
+    def test_insert_and_delete(self):
+        edited = ["Intro."] + BLOCKS[:3] + BLOCKS[4:]
+        changes = self.converter.update(markdown(edited))
+        assert changes == [(0, 0, 0, 1), (3, 4, 4, 4)]
+        assert self.content() == converted(edited)
+        assert self.converter.converted == 1
+
+    def test_moved_and_repeated_blocks_are_copies(self):
+        edited = BLOCKS + [BLOCKS[1], BLOCKS[0]]
+        self.converter.update(markdown(edited))
+        assert self.converter.converted == 0
+        assert self.content() == converted(edited)
+        assert len({id(node) for node in self.content()}) == len(self.content())
+
+    def test_existing_nodes_are_left_alone(self):
+        post = Post(title="T", subtitle="S", user_id=1).paragraph("before")
+        converter = IncrementalConverter(post)
+        assert converter.update(markdown(BLOCKS[:2])) == [(1, 1, 1, 3)]
+        assert converter.update(markdown(BLOCKS[1:2])) == [(1, 2, 1, 1)]
+        assert [node["type"] for node in post.draft_body["content"]] == [
+            "paragraph",
+            "paragraph",
+        ]
+
+    def test_draft_can_be_serialized_between_updates(self):
+        self.post.get_draft()
+        self.converter.update(markdown(BLOCKS[:2]))
+        body = json.loads(self.post.get_draft()["draft_body"])
+        assert body["content"] == converted(BLOCKS[:2])
+
+    def test_images_are_uploaded_once(self):
+        api = FakeImageApi()
+        post = Post(title="T", subtitle="S", user_id=1)
+        converter = IncrementalConverter(post, api=api)
+        converter.update(markdown(BLOCKS))
+        converter.update(markdown(BLOCKS + ["![again](one.png)"]))
+        assert api.calls == ["one.png"]
+        assert post.draft_body["content"] == converted(
+            BLOCKS + ["![again](one.png)"], api=FakeImageApi()
+        )
+
+
+class TestConvertMarkdownMany:
+    DOCUMENTS = [markdown(BLOCKS[i:] + BLOCKS[:i]) for i in range(len(BLOCKS))] * 3
+
+    def expected(self):
+        return [
+            Post(title="T", subtitle="S", user_id=1)
+            .from_markdown(document)
+            .get_draft()["draft_body"]
+            for document in self.DOCUMENTS
+        ]
+
+    def test_in_process(self):
+        bodies = convert_markdown_many(iter(self.DOCUMENTS), workers=1, chunksize=4)
+        assert bodies == self.expected()
+
+    def test_process_pool_keeps_input_order(self):
+        bodies = convert_markdown_many(self.DOCUMENTS, workers=2, chunksize=2)
+        assert bodies == self.expected()
+
+    def test_streaming_yields_every_index_once(self):
+        results = list(
+            iter_convert_markdown_many(self.DOCUMENTS, workers=2, chunksize=3)
+        )
+        assert sorted(index for index, _ in results) == list(range(len(self.DOCUMENTS)))
+        expected = self.expected()
+        assert all(body == expected[index] for index, body in results)
+
+    def test_empty_batch(self):
+        assert convert_markdown_many([], workers=2) == []
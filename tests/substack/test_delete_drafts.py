@@ -0,0 +1,51 @@
+"""Tests for bulk draft deletion."""
+
+from .fakes import FakeServer, make_api, make_response
+
+
+def drafts_server(count):
+    drafts = {
+        i: {"id": i, "draft_title": f"test {i}" if i % 2 else f"keep {i}"}
+        for i in range(count)
+    }
+
+    def list_drafts(method, url, params=None, **kwargs):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 25)
+        return list(drafts.values())[offset : offset + limit]
+
+    def delete_draft(method, url, **kwargs):
+        draft_id = int(url.rsplit("/", 1)[1])
+        if draft_id == 7:
+            return make_response(404, {"error": "Not found"})
+        drafts.pop(draft_id)
+        return {"deleted": draft_id}
+
+    server = FakeServer({("GET", "/drafts"): list_drafts})
+    for i in range(count):
+        server.routes[("DELETE", f"/drafts/{i}")] = delete_draft
+    return server, drafts
+
+
+class TestDeleteDrafts:
+    def test_dry_run_deletes_nothing(self):
+        server, drafts = drafts_server(30)
+        api = make_api(server)
+        with server.patch():
+            results = api.delete_drafts(dry_run=True)
+        assert len(results) == 30
+        assert {result["status"] for result in results} == {"dry_run"}
+        assert len(drafts) == 30
+
+    def test_predicate_and_summary(self):
+        server, drafts = drafts_server(30)
+        api = make_api(server)
+        with server.patch():
+            results = api.delete_drafts(
+                predicate=lambda draft: draft["draft_title"].startswith("test"),
+                max_workers=8,
+            )
+        assert [result["id"] for result in results] == list(range(1, 30, 2))
+        errors = [result for result in results if result["status"] == "error"]
+        assert [error["id"] for error in errors] == [7]
+        assert sorted(drafts) == sorted(list(range(0, 30, 2)) + [7])
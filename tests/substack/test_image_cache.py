@@ -0,0 +1,77 @@
+"""Tests for the persistent image cache."""
+
+import io
+import time
+from unittest import mock
+
+import pytest
+
+from substack.image_cache import ImageCache
+
+from .fakes import FakeServer, make_api
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageCache(str(tmp_path / "images.sqlite3"), max_entries=3)
+
+
+class TestImageCache:
+    def test_keys(self, tmp_path):
+        path = tmp_path / "a.png"
+        path.write_bytes(PNG)
+        key = ImageCache.key_for(str(path))
+        assert key.startswith("sha256:")
+        assert ImageCache.key_for(PNG) == key
+        file = io.BytesIO(PNG)
+        assert ImageCache.key_for(file) == key
+        assert file.tell() == 0
+        assert ImageCache.key_for("https://example.com/a.png") == (
+            "url:https://example.com/a.png"
+        )
+
+    def test_get_put_and_stats(self, cache):
+        assert cache.get("sha256:a") is None
+        cache.put("sha256:a", "https://cdn/a.png")
+        assert cache.get("sha256:a") == "https://cdn/a.png"
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+    def test_shared_through_the_file(self, cache):
+        cache.put("sha256:a", "https://cdn/a.png")
+        assert ImageCache(cache.path).get("sha256:a") == "https://cdn/a.png"
+
+    def test_size_eviction_drops_least_recently_used(self, cache):
+        start = time.time() - 100
+        with mock.patch("substack.image_cache.time.time") as now:
+            for i, key in enumerate("abcd"):
+                now.return_value = start + i
+                if key == "d":
+                    cache.get("sha256:a")
+                cache.put(f"sha256:{key}", f"https://cdn/{key}.png")
+        assert cache.get("sha256:a") is not None
+        assert cache.get("sha256:b") is None
+        assert cache.stats()["entries"] == 3
+
+    def test_age_eviction(self, tmp_path):
+        cache = ImageCache(str(tmp_path / "images.sqlite3"), max_age=10)
+        cache.put("sha256:a", "https://cdn/a.png")
+        with mock.patch(
+            "substack.image_cache.time.time", return_value=time.time() + 11
+        ):
+            assert cache.get("sha256:a") is None
+
+
+class TestApiImageCache:
+    def test_unchanged_image_is_not_uploaded_again(self, cache, tmp_path):
+        path = tmp_path / "a.png"
+        path.write_bytes(PNG)
+        server = FakeServer({("POST", "/image"): {"url": "https://cdn/a.png"}})
+        api = make_api(server, image_cache=cache)
+        with server.patch():
+            assert api.get_image(str(path)) == {"url": "https://cdn/a.png"}
+            assert api.get_image(str(path)) == {"url": "https://cdn/a.png"}
+            assert api.get_image(PNG) == {"url": "https://cdn/a.png"}
+        assert server.count("POST", "/image") == 1
+        assert cache.stats()["hits"] == 2
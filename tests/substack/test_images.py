@@ -0,0 +1,102 @@
+"""Tests for image encoding and upload."""
+
+import base64
+import io
+import mmap
+from urllib.parse import parse_qs
+
+import pytest
+
+from substack import images
+from substack.images import encode_image_form, sniff_image_type
+
+from .fakes import FakeServer, make_api
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+
+
+def decoded_image(body):
+    return parse_qs(bytes(body).decode())["image"][0]
+
+
+class TestSniffImageType:
+    @pytest.mark.parametrize(
+        "head, mime_type",
+        [
+            (PNG, "image/png"),
+            (b"\xff\xd8\xff\xe0\x00\x10JFIF", "image/jpeg"),
+            (b"GIF89a\x01\x00", "image/gif"),
+            (b"RIFF\x24\x00\x00\x00WEBPVP8 ", "image/webp"),
+            (b"\x00\x00\x00\x1cftypavif\x00\x00", "image/avif"),
+            (b'<?xml version="1.0"?><svg xmlns="">', "image/svg+xml"),
+            (b"not an image", None),
+        ],
+    )
+    def test_signatures(self, head, mime_type):
+        assert sniff_image_type(head) == mime_type
+
+
+class TestEncodeImageForm:
+    @pytest.fixture(autouse=True)
+    def small_chunks(self, monkeypatch):
+        # force several chunks, including one that is not a multiple of 3
+        monkeypatch.setattr(images, "CHUNK_SIZE", 3 * 100)
+
+    def expected(self, data, mime_type="image/png"):
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+
+    def test_path(self, tmp_path):
+        path = tmp_path / "image.bin"
+        path.write_bytes(PNG)
+        assert decoded_image(encode_image_form(str(path))) == self.expected(PNG)
+
+    def test_bytes_like_sources(self, tmp_path):
+        path = tmp_path / "image.bin"
+        path.write_bytes(PNG)
+        with open(path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            assert decoded_image(encode_image_form(mapped)) == self.expected(PNG)
+        for source in (PNG, bytearray(PNG), memoryview(PNG)):
+            assert decoded_image(encode_image_form(source)) == self.expected(PNG)
+
+    def test_short_reads_from_file_object(self):
+        class Trickle(io.RawIOBase):
+            def __init__(self, data):
+                self.data = data
+
+            def read(self, size=-1):
+                chunk, self.data = self.data[:7], self.data[7:]
+                return chunk
+
+        body = encode_image_form(Trickle(PNG))
+        assert decoded_image(body) == self.expected(PNG)
+
+    def test_unknown_type_defaults_to_jpeg(self):
+        assert decoded_image(encode_image_form(b"abc")) == self.expected(
+            b"abc", "image/jpeg"
+        )
+
+    def test_empty_image(self):
+        with pytest.raises(ValueError):
+            encode_image_form(b"")
+
+
+class TestGetImage:
+    def test_local_file_is_uploaded_with_its_type(self, tmp_path):
+        path = tmp_path / "image.png"
+        path.write_bytes(PNG)
+        server = FakeServer({("POST", "/image"): {"url": "https://cdn/image.png"}})
+        api = make_api(server)
+        with server.patch():
+            assert api.get_image(str(path)) == {"url": "https://cdn/image.png"}
+        _, _, kwargs = server.calls[-1]
+        assert decoded_image(kwargs["data"]).startswith("data:image/png;base64,")
+
+    def test_remote_url_is_forwarded(self):
+        server = FakeServer({("POST", "/image"): {"url": "https://cdn/image.png"}})
+        api = make_api(server)
+        with server.patch():
+            api.get_image("https://example.com/image.png")
+        _, _, kwargs = server.calls[-1]
+        assert kwargs["data"] == {"image": "https://example.com/image.png"}
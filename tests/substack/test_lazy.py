@@ -0,0 +1,53 @@
+"""Tests for lazy construction of Api."""
+
+import threading
+import time
+
+from .fakes import PROFILE, PUBLICATION_URL, FakeServer, make_api
+
+
+class TestLazyApi:
+    def test_construction_makes_no_request(self):
+        server = FakeServer()
+        make_api(server, lazy=True)
+        assert server.calls == []
+
+    def test_first_call_bootstraps(self):
+        server = FakeServer({("GET", "/drafts"): []})
+        api = make_api(server, email="e", password="p", cookies_string=None, lazy=True)
+        with server.patch():
+            api.get_drafts()
+            api.get_drafts()
+        assert [call[0] for call in server.calls[:3]] == ["POST", "GET", "GET"]
+        assert server.count("POST", "/login") == 1
+        assert server.count("GET", "/user/profile/self") == 1
+        assert server.count("GET", "/drafts") == 2
+        assert api.publication_url == PUBLICATION_URL
+
+    def test_concurrent_first_calls_bootstrap_once(self):
+        def slow_profile(*args, **kwargs):
+            time.sleep(0.05)
+            return PROFILE
+
+        server = FakeServer(
+            {("GET", "/user/profile/self"): slow_profile, ("GET", "/drafts"): []}
+        )
+        api = make_api(server, lazy=True)
+        with server.patch():
+            threads = [threading.Thread(target=api.get_drafts) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert server.count("GET", "/user/profile/self") == 1
+        assert server.count("GET", "/drafts") == 8
+
+    def test_change_publication_before_bootstrap_is_kept(self):
+        server = FakeServer()
+        api = make_api(server, lazy=True)
+        with server.patch():
+            api.change_publication(
+                {"subdomain": "other", "publication_url": "https://other.substack.com"}
+            )
+        assert api.publication_url == "https://other.substack.com/api/v1"
+        assert server.count("GET", "/user/profile/self") == 0
@@ -0,0 +1,162 @@
+"""Tests for request hooks and the metrics collector."""
+
+import pytest
+import requests
+
+from substack.exceptions import SubstackAPIException
+from substack.hooks import RequestHook
+from substack.metrics import LatencyHistogram, MetricsCollector, endpoint_template
+from substack.retry import RetryPolicy
+
+from .fakes import PUBLICATION_URL, FakeServer, make_api, make_response
+
+
+class RecordingHook(RequestHook):
+    def __init__(self):
+        self.events = []
+
+    def on_request(self, method, url, attempt):
+        self.events.append(("request", method, url, attempt))
+
+    def on_response(self, method, url, response, elapsed):
+        self.events.append(("response", method, url, response.status_code))
+
+    def on_error(self, method, url, error, elapsed):
+        self.events.append(("error", method, url, type(error).__name__))
+
+
+class TestEndpointTemplate:
+    def test_ids_are_replaced(self):
+        assert (
+            endpoint_template(f"{PUBLICATION_URL}/drafts/123/publish")
+            == "/drafts/{id}/publish"
+        )
+        assert endpoint_template(f"{PUBLICATION_URL}/post/3/tag/1") == (
+            "/post/{id}/tag/{id}"
+        )
+        assert (
+            endpoint_template(
+                f"{PUBLICATION_URL}/drafts/0b5e0c3a-6f0e-4b8a-9a43-1d2c3e4f5a6b"
+            )
+            == "/drafts/{id}"
+        )
+
+    def test_query_and_trailing_slash_are_ignored(self):
+        assert endpoint_template(f"{PUBLICATION_URL}/drafts/?offset=25") == "/drafts"
+
+    def test_urls_outside_the_api(self):
+        assert endpoint_template("https://substack.com/sign-in") == "/sign-in"
+
+
+class TestLatencyHistogram:
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.record(0.010)
+        for _ in range(10):
+            histogram.record(1.0)
+        assert 0.010 <= histogram.percentile(0.50) < 0.0125
+        assert histogram.percentile(0.95) == 1.0
+        assert histogram.percentile(0.99) == 1.0
+
+    def test_empty(self):
+        assert LatencyHistogram().percentile(0.5) is None
+
+    def test_latency_beyond_last_bucket(self):
+        histogram = LatencyHistogram()
+        histogram.record(1000.0)
+        assert histogram.percentile(0.5) == 1000.0
+
+
+class TestHooks:
+    def test_every_attempt_is_reported(self):
+        hook = RecordingHook()
+        responses = iter([make_response(503), make_response(200, [])])
+        server = FakeServer({("GET", "/drafts"): lambda *a, **k: next(responses)})
+        api = make_api(server, retry_policy=RetryPolicy(backoff_factor=0.001))
+        api.add_hook(hook)
+        with server.patch():
+            api.get_drafts()
+        url = f"{PUBLICATION_URL}/drafts"
+        assert hook.events == [
+            ("request", "GET", url, 0),
+            ("response", "GET", url, 503),
+            ("error", "GET", url, "SubstackAPIException"),
+            ("request", "GET", url, 1),
+            ("response", "GET", url, 200),
+        ]
+
+    def test_connection_error_has_no_response(self):
+        hook = RecordingHook()
+
+        def fail(method, url, **kwargs):
+            raise requests.ConnectionError("down")
+
+        server = FakeServer({("POST", "/drafts"): fail})
+        api = make_api(server, hooks=[hook])
+        with server.patch(), pytest.raises(requests.ConnectionError):
+            api.post_draft({})
+        assert [event[0] for event in hook.events[-2:]] == ["request", "error"]
+
+    def test_failing_hook_does_not_break_requests(self):
+        class Broken(RequestHook):
+            def on_response(self, method, url, response, elapsed):
+                raise RuntimeError("broken hook")
+
+        server = FakeServer({("GET", "/drafts"): []})
+        api = make_api(server, hooks=[Broken()])
+        with server.patch():
+            assert api.get_drafts() == []
+
+    def test_removed_hook_is_not_called(self):
+        hook = RecordingHook()
+        server = FakeServer({("GET", "/drafts"): []})
+        api = make_api(server)
+        api.add_hook(hook)
+        api.remove_hook(hook)
+        with server.patch():
+            api.get_drafts()
+        assert hook.events == []
+
+    def test_hook_removed_during_a_request_sees_its_response(self):
+        hook = RecordingHook()
+        server = FakeServer()
+        api = make_api(server)
+        # the request is on the wire when the hook is removed
+        server.routes[("GET", "/drafts")] = lambda *a, **k: api.remove_hook(hook) or []
+        api.add_hook(hook)
+        with server.patch():
+            api.get_drafts()
+        assert [event[0] for event in hook.events] == ["request", "response"]
+        assert hook not in api._hooks
+
+
+class TestMetricsCollector:
+    def test_per_endpoint_metrics(self):
+        metrics = MetricsCollector()
+        server = FakeServer(
+            {
+                ("POST", "/publish"): {"ok": True},
+                ("GET", "/drafts/2"): make_response(404, {"error": "missing"}),
+            }
+        )
+        api = make_api(server, metrics=metrics)
+        metrics.reset()
+        with server.patch():
+            api.publish_draft(1)
+            api.publish_draft(2)
+            with pytest.raises(SubstackAPIException):
+                api.get_draft(2)
+        snapshot = metrics.snapshot()
+        assert set(snapshot) == {"POST /drafts/{id}/publish", "GET /drafts/{id}"}
+        publish = snapshot["POST /drafts/{id}/publish"]
+        assert publish["count"] == 2
+        assert publish["errors"] == 0
+        assert publish["statuses"] == {200: 2}
+        assert publish["bytes_received"] == 2 * len(b'{"ok": true}')
+        assert publish["latency"]["p50"] is not None
+        assert publish["latency"]["p50"] <= publish["latency"]["p99"]
+        missing = snapshot["GET /drafts/{id}"]
+        assert missing["statuses"] == {404: 1}
+        assert missing["errors"] == 1
+        assert api.metrics is metrics
@@ -0,0 +1,110 @@
+"""Tests for the paginated iterators."""
+
+import time
+
+import pytest
+
+from .fakes import FakeServer, make_api
+
+
+def paged(items, key=None, max_limit=None):
+    def handler(method, url, params=None, **kwargs):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 25)
+        if max_limit is not None:
+            limit = min(limit, max_limit)
+        page = items[offset : offset + limit]
+        return {key: page} if key else page
+
+    return handler
+
+
+def category_pages(pages):
+    def handler(method, url, params=None, **kwargs):
+        page = params["page"]
+        return {"publications": pages[page], "more": page + 1 < len(pages)}
+
+    return handler
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+class TestIterators:
+    def test_iter_drafts(self, prefetch):
+        drafts = [{"id": i} for i in range(23)]
+        server = FakeServer({("GET", "/drafts"): paged(drafts)})
+        api = make_api(server)
+        with server.patch():
+            assert list(api.iter_drafts(page_size=5, prefetch=prefetch)) == drafts
+        # iteration ends on the first empty page
+        assert server.count("GET", "/drafts") == 6
+
+    def test_server_capping_the_page_size(self, prefetch):
+        drafts = [{"id": i} for i in range(23)]
+        server = FakeServer({("GET", "/drafts"): paged(drafts, max_limit=4)})
+        api = make_api(server)
+        with server.patch():
+            assert list(api.iter_drafts(page_size=10, prefetch=prefetch)) == drafts
+
+    def test_iter_published_posts(self, prefetch):
+        posts = [{"id": i} for i in range(10)]
+        server = FakeServer(
+            {("GET", "/post_management/published"): paged(posts, key="posts")}
+        )
+        api = make_api(server)
+        with server.patch():
+            result = list(api.iter_published_posts(page_size=5, prefetch=prefetch))
+        assert result == posts
+        assert server.count("GET", "/post_management/published") == 3
+
+    def test_iter_category_publications(self, prefetch):
+        pages = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        server = FakeServer({("GET", "/category/public/4/all"): category_pages(pages)})
+        api = make_api(server)
+        with server.patch():
+            result = list(api.iter_category_publications(4, "all", prefetch=prefetch))
+        assert [p["id"] for p in result] == [1, 2, 3]
+
+    def test_first_item_before_last_page(self, prefetch):
+        drafts = [{"id": i} for i in range(100)]
+        server = FakeServer({("GET", "/drafts"): paged(drafts)})
+        api = make_api(server)
+        with server.patch():
+            iterator = api.iter_drafts(page_size=10, prefetch=prefetch)
+            assert next(iterator) == {"id": 0}
+            iterator.close()
+            # let an in-flight read-ahead finish while requests are still faked
+            time.sleep(0.05)
+        assert server.count("GET", "/drafts") <= 2
+
+
+class TestConcurrentCategory:
+    def test_matches_sequential_order(self):
+        pages = [[{"id": page * 10 + i} for i in range(3)] for page in range(7)]
+
+        def handler(method, url, params=None, **kwargs):
+            page = params["page"]
+            # later pages answer first
+            time.sleep(0.001 * (10 - page) if page < len(pages) else 0)
+            if page >= len(pages):
+                return {"publications": [], "more": False}
+            return {"publications": pages[page], "more": page + 1 < len(pages)}
+
+        server = FakeServer({("GET", "/category/public/4/all"): handler})
+        api = make_api(server)
+        with server.patch():
+            sequential = api.get_single_category(4, "all")
+            concurrent = api.get_single_category(4, "all", concurrency=4)
+            time.sleep(0.05)
+        assert concurrent == sequential
+        assert [p["id"] for p in concurrent["publications"]][:4] == [0, 1, 2, 10]
+        assert concurrent["more"] is False
+
+    def test_limit_is_trimmed(self):
+        pages = [[{"id": page * 10 + i} for i in range(3)] for page in range(5)]
+        server = FakeServer({("GET", "/category/public/4/all"): category_pages(pages)})
+        api = make_api(server)
+        with server.patch():
+            output = api.get_single_category(4, "all", limit=7, concurrency=3)
+            time.sleep(0.05)
+        assert [p["id"] for p in output["publications"]] == [0, 1, 2, 10, 11, 12, 20]
+        assert output["more"] is True
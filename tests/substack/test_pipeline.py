@@ -0,0 +1,129 @@
+"""Tests for publish_markdown and its stage timings."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from substack.exceptions import SubstackAPIException
+from substack.pipeline import publish_markdown
+from substack.timing import STAGE_HOOK, record_stages, stage
+
+from .fakes import FakeServer, make_api, make_response
+
+MARKDOWN = (
+    "# Title\n\n![a](https://example.com/a.png)\n\n![b](https://example.com/b.png)"
+)
+
+
+def slow_upload(method, url, **kwargs):
+    time.sleep(0.1)
+    return {"url": "https://cdn.example.com/image.png"}
+
+
+def publish_server(routes=None):
+    defaults = {
+        ("POST", "/image"): slow_upload,
+        ("POST", "/drafts"): {"id": 7},
+        ("PUT", "/drafts/7"): {"id": 7, "slug": "hello"},
+        ("GET", "/publication/post-tag"): [{"id": 1, "name": "news"}],
+        ("POST", "/tag/1"): {},
+        ("POST", "/publish"): {"published": True},
+    }
+    defaults.update(routes or {})
+    return FakeServer(defaults)
+
+
+class TestPublishMarkdown:
+    def test_steps(self):
+        server = publish_server()
+        api = make_api(server)
+        with server.patch():
+            result = publish_markdown(
+                api, "Hello", MARKDOWN, slug="hello", tags=["news"], publish=True
+            )
+        assert result["draft"] == {"id": 7, "slug": "hello"}
+        assert result["publish"] == {"published": True}
+        assert result["prepublish"] is None
+        assert "timings" not in result
+        assert STAGE_HOOK not in api._hooks
+
+    def test_timings_per_stage(self):
+        server = publish_server()
+        api = make_api(server)
+        with server.patch():
+            result = publish_markdown(
+                api, "Hello", MARKDOWN, slug="hello", tags=["news"], timings=True
+            )
+        timings = result["timings"]
+        stages = timings["stages"]
+        assert list(stages)[:6] == [
+            "user",
+            "convert",
+            "images",
+            "post_draft",
+            "put_draft",
+            "tags",
+        ]
+        # the two uploads ran in worker threads, still attributed to their stage
+        assert stages["images"]["requests"] == 2
+        assert stages["images"]["elapsed"] >= 0.1
+        # convert excludes the time spent uploading
+        assert stages["convert"]["elapsed"] < stages["images"]["elapsed"]
+        assert stages["post_draft"]["requests"] == 1
+        assert stages["post_draft"]["bytes_received"] == len(b'{"id": 7}')
+        assert stages["tags"]["requests"] == 2
+        assert "publish" not in stages
+        assert sum(s["elapsed"] for s in stages.values()) == pytest.approx(
+            timings["total"], abs=0.01
+        )
+        assert STAGE_HOOK in api._hooks
+
+    def test_concurrent_timed_calls(self):
+        def slow_draft(method, url, **kwargs):
+            time.sleep(0.05)
+            return {"id": 7}
+
+        server = publish_server({("POST", "/drafts"): slow_draft})
+        api = make_api(server)
+        with server.patch(), ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(
+                    lambda index: publish_markdown(
+                        api, "Hello", "Body", prepublish=True, timings=True
+                    ),
+                    range(4),
+                )
+            )
+        for result in results:
+            stages = result["timings"]["stages"]
+            assert stages["post_draft"]["requests"] == 1
+            assert stages["prepublish"]["requests"] == 1
+
+    def test_failure_keeps_completed_steps_and_timings(self):
+        server = publish_server({("POST", "/publish"): make_response(400, {})})
+        api = make_api(server)
+        result = {}
+        with server.patch(), pytest.raises(SubstackAPIException):
+            publish_markdown(
+                api, "Hello", "Body", publish=True, timings=True, result=result
+            )
+        assert result["draft"] == {"id": 7}
+        assert result["timings"]["stages"]["publish"]["requests"] == 1
+
+
+class TestStages:
+    def test_stage_outside_recording_is_a_no_op(self):
+        with stage("anything"):
+            pass
+
+    def test_nested_stages_are_exclusive(self):
+        with record_stages() as timings:
+            with stage("outer"):
+                time.sleep(0.05)
+                with stage("inner"):
+                    time.sleep(0.05)
+        stages = timings.as_dict()["stages"]
+        assert list(stages) == ["outer", "inner"]
+        assert stages["outer"]["elapsed"] == pytest.approx(0.05, abs=0.03)
+        assert stages["inner"]["elapsed"] == pytest.approx(0.05, abs=0.03)
@@ -1,8 +1,11 @@
 """Tests for Post and parse_inline."""
 
+import io
 import json
+import threading
+import time
 
-from substack.post import Post, parse_inline
+from substack.post import Post, iter_markdown_nodes, parse_inline
 
 
 class TestParseInline:
@@ -40,6 +43,60 @@ class TestParseInline:
         assert len(links) == 1
         assert links[0]["marks"][0]["attrs"]["href"] == "https://example.com"
 
+    def test_bold_italic_and_link(self):
+        """Flat marks produce one token each, in order."""
+        result = parse_inline("a **b** *c* [d](u) e")
+        assert result == [
+            {"content": "a "},
+            {"content": "b", "marks": [{"type": "strong"}]},
+            {"content": " "},
+            {"content": "c", "marks": [{"type": "em"}]},
+            {"content": " "},
+            {"content": "d", "marks": [{"type": "link", "attrs": {"href": "u"}}]},
+            {"content": " e"},
+        ]
+
+    def test_bold_inside_link(self):
+        """Marks inside a link carry the link mark first."""
+        link = {"type": "link", "attrs": {"href": "https://example.com"}}
+        result = parse_inline("[**bold** text](https://example.com)")
+        assert result == [
+            {"content": "bold", "marks": [link, {"type": "strong"}]},
+            {"content": " text", "marks": [link]},
+        ]
+
+    def test_link_inside_bold(self):
+        """A link inside bold text keeps the bold mark."""
+        link = {"type": "link", "attrs": {"href": "https://example.com"}}
+        result = parse_inline("**see [the docs](https://example.com) now**")
+        assert result == [
+            {"content": "see ", "marks": [{"type": "strong"}]},
+            {"content": "the docs", "marks": [{"type": "strong"}, link]},
+            {"content": " now", "marks": [{"type": "strong"}]},
+        ]
+
+    def test_asterisks_without_marks(self):
+        """Stray or tripled asterisks are kept as text."""
+        assert parse_inline("3 * 4 = 12") == [{"content": "3 * 4 = 12"}]
+        assert parse_inline("***x***") == [
+            {"content": "*"},
+            {"content": "x", "marks": [{"type": "strong"}]},
+            {"content": "*"},
+        ]
+
+    def test_dense_paragraph(self):
+        """Thousands of marks in one paragraph are all parsed."""
+        result = parse_inline(" ".join(f"**b{i}** [l{i}](u{i})" for i in range(2000)))
+        assert sum(1 for token in result if token.get("marks")) == 4000
+
+    def test_nested_marks_in_draft(self):
+        """Nested marks are added to the post as several marks on one text node."""
+        post = Post(title="T", subtitle="S", user_id=1)
+        post.from_markdown("[**bold**](https://example.com)")
+        node = post.draft_body["content"][0]["content"][0]
+        assert node["text"] == "bold"
+        assert [mark["type"] for mark in node["marks"]] == ["link", "strong"]
+
 
 class TestPostMarks:
     """Tests for Post.marks() link href handling."""
@@ -180,3 +237,188 @@ class TestBlockquoteMethod:
         body = json.loads(post.get_draft()["draft_body"])
         blockquotes = [n for n in body["content"] if n["type"] == "blockquote"]
         assert len(blockquotes) == 2
+
+
+class TestDraftBodyBuilder:
+    """Tests for the in-place growth of the draft body."""
+
+    def test_content_list_grows_in_place(self):
+        """Blocks are appended to the same content list, not to a copy."""
+        post = Post(title="T", subtitle="S", user_id=1)
+        content = post.draft_body["content"]
+        post.paragraph("one").blockquote("two").heading("three", level=2)
+        post.from_markdown("> four\n\nfive")
+        assert post.draft_body["content"] is content
+        assert [node["type"] for node in content] == [
+            "paragraph",
+            "blockquote",
+            "heading",
+            "blockquote",
+            "paragraph",
+        ]
+
+    def test_missing_content_is_created(self):
+        """A draft body without content gets one on the first block."""
+        post = Post(title="T", subtitle="S", user_id=1)
+        post.draft_body = {"type": "doc"}
+        post.blockquote("quote").paragraph("text")
+        assert [node["type"] for node in post.draft_body["content"]] == [
+            "blockquote",
+            "paragraph",
+        ]
+
+
+class FakeImageApi:
+    """Records get_image calls and the peak number of concurrent uploads."""
+
+    def __init__(self, delay=0.05, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get_image(self, image):
+        with self.lock:
+            self.calls.append(image)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if image in self.fail:
+                raise RuntimeError("upload failed")
+            return {"url": f"https://cdn.example.com/{image.strip('/')}"}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestFromMarkdownImages:
+    """Tests for the concurrent image upload pre-pass of from_markdown."""
+
+    MARKDOWN = "\n\n".join(
+        [
+            "![a](one.png)",
+            "text",
+            "![b](two.png)",
+            "[![c](three.png)](https://example.com/)",
+            "![a again](one.png)",
+        ]
+    )
+
+    def test_images_are_uploaded_concurrently_once_each(self):
+        api = FakeImageApi()
+        Post(title="T", subtitle="S", user_id=1).from_markdown(self.MARKDOWN, api=api)
+        assert sorted(api.calls) == ["one.png", "three.png", "two.png"]
+        assert api.peak > 1
+
+    def test_nodes_keep_document_order(self):
+        post = Post(title="T", subtitle="S", user_id=1)
+        post.from_markdown(self.MARKDOWN, api=FakeImageApi())
+        content = post.draft_body["content"]
+        assert [node["type"] for node in content] == [
+            "captionedImage",
+            "paragraph",
+            "captionedImage",
+            "captionedImage",
+            "captionedImage",
+        ]
+        sources = [
+            node["content"][0]["attrs"]["src"]
+            for node in content
+            if node["type"] == "captionedImage"
+        ]
+        assert sources == [
+            "https://cdn.example.com/one.png",
+            "https://cdn.example.com/two.png",
+            "https://cdn.example.com/three.png",
+            "https://cdn.example.com/one.png",
+        ]
+        linked = content[3]["content"][0]["attrs"]
+        assert linked["href"] == "https://example.com/"
+
+    def test_failed_upload_keeps_original_url(self):
+        post = Post(title="T", subtitle="S", user_id=1)
+        post.from_markdown(self.MARKDOWN, api=FakeImageApi(fail={"two.png"}))
+        assert post.draft_body["content"][2]["content"][0]["attrs"]["src"] == "two.png"
+
+
+class TestFromMarkdownStream:
+    """Tests for the streaming conversion of Markdown lines."""
+
+    MARKDOWN = "\n".join(
+        [
+            "# Title",
+            "",
+            "Some **bold** and [a link](https://example.com).",
+            "",
+            "- one",
+            "- two *italic*",
+            "",
+            "> quoted",
+            "> lines",
+            "",
+            "```python",
+            "print(1)",
+            "",
+            "print(2)",
+            "```",
+            "",
+            "![a](one.png)",
+            "",
+            "[![c](two.png)](https://example.com/)",
+            "",
+            "![a again](one.png)",
+            "last line",
+        ]
+    )
+
+    def expected(self, api=None):
+        post = Post(title="T", subtitle="S", user_id=1)
+        return post.from_markdown(self.MARKDOWN, api=api).draft_body["content"]
+
+    def test_file_object_matches_from_markdown(self):
+        post = Post(title="T", subtitle="S", user_id=1)
+        post.from_markdown_stream(io.StringIO(self.MARKDOWN))
+        assert post.draft_body["content"] == self.expected()
+
+    def test_line_iterator_and_string(self):
+        lines = iter(self.MARKDOWN.split("\n"))
+        assert list(iter_markdown_nodes(lines)) == self.expected()
+        assert list(iter_markdown_nodes(self.MARKDOWN)) == self.expected()
+
+    def test_nodes_are_yielded_block_by_block(self):
+        read = []
+
+        def lines():
+            for line in self.MARKDOWN.split("\n"):
+                read.append(line)
+                yield line
+
+        nodes = iter_markdown_nodes(lines())
+        assert next(nodes)["type"] == "heading"
+        # the first block ends at the first blank line, nothing is read past it
+        assert read == ["# Title", ""]
+
+    def test_images_are_uploaded_once_in_order(self):
+        api = FakeImageApi()
+        post = Post(title="T", subtitle="S", user_id=1)
+        post.from_markdown_stream(io.StringIO(self.MARKDOWN), api=api, max_workers=4)
+        assert sorted(api.calls) == ["one.png", "two.png"]
+        assert post.draft_body["content"] == self.expected(FakeImageApi(delay=0))
+
+    def test_sequential_uploads_and_failures(self):
+        api = FakeImageApi(delay=0, fail={"two.png"})
+        nodes = list(iter_markdown_nodes(self.MARKDOWN, api=api, max_workers=1))
+        assert api.calls == ["one.png", "two.png"]
+        sources = [
+            node["content"][0]["attrs"]["src"]
+            for node in nodes
+            if node["type"] == "captionedImage"
+        ]
+        assert sources == [
+            "https://cdn.example.com/one.png",
+            "two.png",
+            "https://cdn.example.com/one.png",
+        ]
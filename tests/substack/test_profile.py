@@ -0,0 +1,56 @@
+"""Tests for the cached user profile."""
+
+import threading
+import time
+from unittest import mock
+
+from .fakes import PROFILE, FakeServer, make_api
+
+
+class TestProfileCache:
+    def test_accessors_share_one_fetch(self):
+        server = FakeServer()
+        api = make_api(server)
+        with server.patch():
+            api.get_user_id()
+            api.get_user_publications()
+            api.get_user_primary_publication()
+        assert server.count("GET", "/user/profile/self") == 1
+
+    def test_refresh_and_invalidate(self):
+        server = FakeServer()
+        api = make_api(server)
+        with server.patch():
+            api.get_user_profile(refresh=True)
+            api.invalidate_user_profile()
+            api.get_user_id()
+        assert server.count("GET", "/user/profile/self") == 3
+
+    def test_expired_profile_is_fetched_again(self):
+        server = FakeServer()
+        api = make_api(server, profile_ttl=10)
+        with server.patch(), mock.patch("substack.api.time.monotonic") as monotonic:
+            monotonic.return_value = api._profile_fetched_at + 5
+            api.get_user_id()
+            monotonic.return_value = api._profile_fetched_at + 11
+            api.get_user_id()
+        assert server.count("GET", "/user/profile/self") == 2
+
+    def test_concurrent_callers_share_one_fetch(self):
+        def slow_profile(*args, **kwargs):
+            time.sleep(0.1)
+            return PROFILE
+
+        server = FakeServer({("GET", "/user/profile/self"): slow_profile})
+        api = make_api(server)
+        api.invalidate_user_profile()
+        with server.patch():
+            threads = [
+                threading.Thread(target=api.get_user_publications) for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # one fetch at construction, one after the invalidation
+        assert server.count("GET", "/user/profile/self") == 2
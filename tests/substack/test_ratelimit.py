@@ -0,0 +1,77 @@
+"""Tests for the client-side rate limiter."""
+
+import threading
+from unittest import mock
+
+from substack.ratelimit import RateLimiter, TokenBucket, endpoint_class
+
+from .fakes import PUBLICATION_URL, FakeServer, make_api
+
+
+class TestEndpointClass:
+    def test_classes(self):
+        assert endpoint_class("GET", f"{PUBLICATION_URL}/drafts") == "read"
+        assert endpoint_class("POST", f"{PUBLICATION_URL}/drafts") == "write"
+        assert (
+            endpoint_class("POST", f"{PUBLICATION_URL}/drafts/1/publish") == "publish"
+        )
+        assert endpoint_class("POST", f"{PUBLICATION_URL}/image") == "image"
+
+
+class TestTokenBucket:
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        now = bucket.updated
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now) == 0.5
+        assert bucket.reserve(now) == 1.0
+
+
+class TestRateLimiter:
+    def test_class_limit_is_stricter_than_host_limit(self):
+        limiter = RateLimiter(rate=100, burst=100, class_limits={"publish": (1, 1)})
+        url = f"{PUBLICATION_URL}/drafts/1/publish"
+        assert limiter.reserve("POST", url) == 0
+        assert limiter.reserve("POST", url) > 0
+        assert limiter.reserve("GET", f"{PUBLICATION_URL}/drafts") == 0
+        stats = limiter.stats()
+        assert stats["requests"] == 3
+        assert stats["throttled"] == 1
+
+    def test_hosts_have_separate_buckets(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        assert limiter.reserve("GET", "https://a.substack.com/api/v1/drafts") == 0
+        assert limiter.reserve("GET", "https://b.substack.com/api/v1/drafts") == 0
+
+    def test_thread_safe_reservations(self):
+        limiter = RateLimiter(rate=10, burst=10)
+        delays = []
+
+        def worker():
+            for _ in range(10):
+                delays.append(limiter.reserve("GET", f"{PUBLICATION_URL}/drafts"))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 40 requests at 10/s with a burst of 10: the last one waits about 3 seconds
+        assert limiter.stats()["requests"] == 40
+        assert 2.5 < max(delays) <= 3.0
+
+
+class TestApiRateLimiting:
+    def test_every_request_goes_through_the_limiter(self):
+        limiter = RateLimiter(rate=1000, burst=1000)
+        server = FakeServer({("GET", "/publication/embed"): {}})
+        api = make_api(server, rate_limiter=limiter)
+        with server.patch(), mock.patch.object(
+            limiter, "acquire", wraps=limiter.acquire
+        ) as acquire:
+            api.get_drafts()
+            api.call("/publication/embed", "GET", url="https://example.com")
+        assert acquire.call_count == 2
+        # construction requests (profile, sign-in) were throttled as well
+        assert limiter.stats()["requests"] == 4
@@ -0,0 +1,111 @@
+"""Tests for the retry policy and its use in Api._request."""
+
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from substack.exceptions import SubstackAPIException
+from substack.retry import RetryPolicy, parse_retry_after
+
+from .fakes import FakeServer, make_api, make_response
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after("12") == 12.0
+
+    def test_http_date_in_the_past(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_missing_or_malformed(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestRetryPolicy:
+    def test_post_retried_only_on_429(self):
+        policy = RetryPolicy()
+        assert policy.is_retryable("POST", 429)
+        assert not policy.is_retryable("POST", 503)
+        assert not policy.is_retryable("POST", None)
+        assert policy.is_retryable("GET", 503)
+        assert not policy.is_retryable("GET", 404)
+
+    def test_gives_up_after_max_retries(self):
+        policy = RetryPolicy(max_retries=2)
+        started = time.monotonic()
+        assert policy.next_delay("GET", 1, started, 503) is not None
+        assert policy.next_delay("GET", 2, started, 503) is None
+
+    def test_retry_after_beyond_budget_is_not_waited(self):
+        policy = RetryPolicy(max_retry_time=10)
+        started = time.monotonic()
+        assert policy.next_delay("GET", 0, started, 429, retry_after=5) == 5
+        assert policy.next_delay("GET", 0, started, 429, retry_after=60) is None
+
+
+class TestApiRetries:
+    @pytest.fixture(autouse=True)
+    def no_sleep(self):
+        with mock.patch("substack.api.time.sleep") as sleep:
+            self.sleep = sleep
+            yield
+
+    def test_retries_429_then_succeeds(self):
+        responses = [
+            make_response(429, {"error": "slow down"}, {"Retry-After": "2"}),
+            make_response(200, [{"id": 1}]),
+        ]
+        server = FakeServer({("GET", "/drafts"): lambda *a, **k: responses.pop(0)})
+        api = make_api(server)
+        with server.patch():
+            assert api.get_drafts() == [{"id": 1}]
+        self.sleep.assert_called_once_with(2.0)
+
+    def test_exception_exposes_retry_after(self):
+        server = FakeServer(
+            {
+                ("POST", "/drafts"): make_response(
+                    429, {"error": "slow down"}, {"Retry-After": "3600"}
+                )
+            }
+        )
+        api = make_api(server)
+        with server.patch(), pytest.raises(SubstackAPIException) as ex:
+            api.post_draft({})
+        assert ex.value.retryable
+        assert ex.value.retry_after == 3600.0
+        assert server.count("POST", "/drafts") == 1
+
+    def test_post_not_retried_on_server_error(self):
+        server = FakeServer({("POST", "/drafts"): make_response(502, {})})
+        api = make_api(server)
+        with server.patch(), pytest.raises(SubstackAPIException) as ex:
+            api.post_draft({})
+        assert server.count("POST", "/drafts") == 1
+        assert ex.value.method == "POST"
+        assert not ex.value.retryable
+
+    def test_server_error_retryable_for_get(self):
+        server = FakeServer({("GET", "/drafts"): make_response(503, {})})
+        api = make_api(server, retry_policy=RetryPolicy(max_retries=0))
+        with server.patch(), pytest.raises(SubstackAPIException) as ex:
+            api.get_drafts()
+        assert ex.value.method == "GET"
+        assert ex.value.retryable
+
+    def test_connection_error_retried_for_get(self):
+        errors = [requests.ConnectionError("reset")]
+
+        def handler(*args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return []
+
+        server = FakeServer({("GET", "/drafts"): handler})
+        api = make_api(server)
+        with server.patch():
+            assert api.get_drafts() == []
+        assert server.count("GET", "/drafts") == 2
@@ -0,0 +1,82 @@
+"""Tests for the tag id cache and batched tagging."""
+
+import threading
+import time
+
+from .fakes import FakeServer, make_api, make_response
+
+
+def tag_server(existing=None):
+    tags = [{"id": i, "name": name} for i, name in enumerate(existing or [], 1)]
+    lock = threading.Lock()
+
+    def create(method, url, json=None, **kwargs):
+        time.sleep(0.01)
+        with lock:
+            tag = {"id": len(tags) + 1, "name": json["name"]}
+            tags.append(tag)
+        return tag
+
+    return FakeServer(
+        {
+            ("GET", "/publication/post-tag"): lambda *a, **k: list(tags),
+            ("POST", "/publication/post-tag"): create,
+            ("POST", "/tag/1"): {"applied": 1},
+            ("POST", "/tag/2"): {"applied": 2},
+            ("POST", "/tag/3"): {"applied": 3},
+        }
+    )
+
+
+class TestTagCache:
+    def test_tag_list_fetched_once(self):
+        server = tag_server(["python", "news"])
+        api = make_api(server)
+        with server.patch():
+            api.add_tags_to_post(1, ["python", "news", "new"])
+            api.add_tag_to_post(2, "python")
+        assert server.count("GET", "/publication/post-tag") == 1
+        assert server.count("POST", "/publication/post-tag") == 1
+        assert api.get_tag_id("new", create=False) == 3
+
+    def test_concurrent_creation_creates_once(self):
+        server = tag_server()
+        api = make_api(server)
+        with server.patch():
+            threads = [
+                threading.Thread(target=api.add_tag_to_post, args=(i, "fresh"))
+                for i in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert server.count("POST", "/publication/post-tag") == 1
+        assert server.count("POST", "/tag/1") == 8
+
+    def test_failed_creation_rechecks_tag_list(self):
+        server = tag_server(["python"])
+        api = make_api(server)
+        with server.patch():
+            api.get_tag_id("python")
+            server.routes[("GET", "/publication/post-tag")] = [
+                {"id": 1, "name": "python"},
+                {"id": 2, "name": "elsewhere"},
+            ]
+            server.routes[("POST", "/publication/post-tag")] = make_response(
+                400, {"error": "Tag already exists"}
+            )
+            assert api.get_tag_id("elsewhere") == 2
+
+
+class TestBulkTagging:
+    def test_add_tags_to_posts(self):
+        server = tag_server(["python"])
+        server.routes[("POST", "/post/3/tag/1")] = make_response(500, {})
+        api = make_api(server)
+        with server.patch():
+            results = api.add_tags_to_posts([1, 2, 3], ["python", "news"])
+        assert [result["post_id"] for result in results] == [1, 2, 3]
+        assert results[0]["tags_added"] == [{"applied": 1}, {"applied": 2}]
+        assert "error" in results[2]
+        assert server.count("GET", "/publication/post-tag") == 1
@@ -0,0 +1,230 @@
+"""Tests for the client shared by the MCP server tools."""
+
+import asyncio
+import time
+
+import pytest
+
+from substack.exceptions import RequestCancelledException
+
+from tests.substack.fakes import PROFILE, PUBLICATION_URL, FakeServer, make_response
+
+pytest.importorskip("mcp")
+
+from substack_mcp import mcp_server  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    for name in ("EMAIL", "PASSWORD", "COOKIES_PATH"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("COOKIES_STRING", "substack.sid=abc")
+    monkeypatch.setenv("PUBLICATION_URL", "https://example.substack.com")
+    mcp_server.reset_api()
+    yield
+    mcp_server.reset_api()
+
+
+class TestSharedApi:
+    def test_client_is_built_lazily_and_reused(self):
+        server = FakeServer({("GET", "/drafts/1/prepublish"): {"ok": True}})
+        with server.patch():
+            client = mcp_server.get_api()
+            assert server.calls == []
+            asyncio.run(mcp_server.prepublish_draft(1))
+            asyncio.run(mcp_server.prepublish_draft(1))
+        assert mcp_server.get_api() is client
+        assert server.count("GET", "/user/profile/self") == 1
+        assert server.count("GET", "/drafts/1/prepublish") == 2
+        text = mcp_server.metrics.to_prometheus()
+        assert 'substack_mcp_tool_calls_total{tool="prepublish_draft"}' in text
+        assert 'endpoint="/drafts/{id}/prepublish"' in text
+
+    def test_expired_session_is_refreshed_once(self):
+        responses = iter([make_response(401, {"error": "expired"}), {"ok": True}])
+        server = FakeServer(
+            {("GET", "/drafts/1/prepublish"): lambda *a, **k: next(responses)}
+        )
+        with server.patch():
+            stale = mcp_server.get_api()
+            assert asyncio.run(mcp_server.prepublish_draft(1)) == {"ok": True}
+        assert mcp_server.get_api() is not stale
+        assert server.count("GET", "/drafts/1/prepublish") == 2
+
+    def test_forbidden_request_on_live_session_is_not_retried(self):
+        server = FakeServer(
+            {("POST", "/drafts/1/publish"): make_response(403, {"error": "no"})}
+        )
+        with server.patch():
+            client = mcp_server.get_api()
+            with pytest.raises(mcp_server.SubstackAPIException):
+                asyncio.run(mcp_server.publish_draft(1))
+        assert mcp_server.get_api() is client
+        assert server.count("POST", "/drafts/1/publish") == 1
+
+    def test_forbidden_on_dead_session_is_refreshed(self):
+        # the login of the first client, then the probe of its expired session
+        sessions = iter([PROFILE, make_response(403, {"error": "expired"})])
+
+        def profile(*args, **kwargs):
+            return next(sessions, PROFILE)
+
+        responses = iter([make_response(403, {"error": "expired"}), {"ok": True}])
+        server = FakeServer(
+            {
+                ("GET", "/drafts/1/prepublish"): lambda *a, **k: next(responses),
+                ("GET", "/user/profile/self"): profile,
+            }
+        )
+        with server.patch():
+            client = mcp_server.get_api()
+            assert asyncio.run(mcp_server.prepublish_draft(1)) == {"ok": True}
+        assert mcp_server.get_api() is not client
+        assert server.count("GET", "/drafts/1/prepublish") == 2
+
+    def test_other_errors_are_not_retried(self):
+        server = FakeServer(
+            {("GET", "/drafts/1/prepublish"): make_response(400, {"error": "bad"})}
+        )
+        with server.patch():
+            client = mcp_server.get_api()
+            with pytest.raises(mcp_server.SubstackAPIException):
+                asyncio.run(mcp_server.prepublish_draft(1))
+        assert mcp_server.get_api() is client
+        assert server.count("GET", f"{PUBLICATION_URL}/drafts/1/prepublish") == 1
+
+
+class TestNonBlockingTools:
+    def test_concurrent_tool_calls_overlap(self):
+        def slow(method, url, **kwargs):
+            time.sleep(0.3)
+            return {"ok": True}
+
+        server = FakeServer({("GET", "/drafts/1/prepublish"): slow})
+
+        async def run_all():
+            return await asyncio.gather(
+                *(mcp_server.prepublish_draft(1) for _ in range(4))
+            )
+
+        with server.patch():
+            mcp_server.get_api().get_user_id()
+            started = time.monotonic()
+            results = asyncio.run(run_all())
+        assert results == [{"ok": True}] * 4
+        assert time.monotonic() - started < 0.9
+
+    def test_cancelled_tool_stops_its_requests(self):
+        server = FakeServer(
+            {("GET", "/drafts"): make_response(503, {}, {"Retry-After": "20"})}
+        )
+        outcome = []
+
+        def work():
+            try:
+                mcp_server.get_api().get_drafts()
+            except Exception as ex:
+                outcome.append(ex)
+
+        async def cancel_soon():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(mcp_server._run_blocking(work), 0.2)
+
+        with server.patch():
+            mcp_server.get_api().get_user_id()
+            asyncio.run(cancel_soon())
+            deadline = time.monotonic() + 5
+            while not outcome and time.monotonic() < deadline:
+                time.sleep(0.01)
+        assert isinstance(outcome[0], RequestCancelledException)
+        assert server.count("GET", "/drafts") == 1
+
+
+def batch_server():
+    drafts = iter(range(1, 100))
+
+    def create_draft(method, url, **kwargs):
+        time.sleep(0.05)
+        return {"id": next(drafts)}
+
+    def upload(method, url, **kwargs):
+        time.sleep(0.05)
+        return {"url": "https://cdn.example.com/shared.png"}
+
+    return FakeServer(
+        {
+            ("POST", "/drafts"): create_draft,
+            ("POST", "/image"): upload,
+            ("GET", "/publication/post-tag"): [{"id": 1, "name": "series"}],
+            ("POST", "/tag/1"): {"applied": True},
+            ("POST", "/publish"): {"published": True},
+        }
+    )
+
+
+class TestBatchTool:
+    def test_posts_share_tags_and_images(self):
+        server = batch_server()
+        markdown = "![cover](https://example.com/cover.png)\n\nBody"
+        posts = [
+            {"title": f"Part {i}", "markdown": markdown, "tags": ["series"]}
+            for i in range(4)
+        ]
+        with server.patch():
+            batch = asyncio.run(
+                mcp_server.post_drafts_from_markdown_batch(posts, max_concurrency=4)
+            )
+        assert batch["succeeded"] == 4 and batch["failed"] == 0
+        assert [result["index"] for result in batch["results"]] == [0, 1, 2, 3]
+        assert sorted(result["draft"]["id"] for result in batch["results"]) == [
+            1,
+            2,
+            3,
+            4,
+        ]
+        assert server.count("POST", "/image") == 1
+        assert server.count("GET", "/publication/post-tag") == 1
+        assert server.count("POST", "/tag/1") == 4
+
+    def test_failures_are_reported_per_post(self):
+        server = batch_server()
+        server.routes[("POST", "/publish")] = make_response(400, {"error": "nope"})
+        posts = [
+            {"title": "Fine", "markdown": "Body"},
+            {"title": "No body"},
+            {"title": "Unpublishable", "markdown": "Body", "publish": True},
+        ]
+        with server.patch():
+            batch = asyncio.run(mcp_server.post_drafts_from_markdown_batch(posts))
+        fine, invalid, unpublishable = batch["results"]
+        assert batch["succeeded"] == 1 and batch["failed"] == 2
+        assert "error" not in fine and fine["draft"]["id"] in (1, 2)
+        assert "markdown" in invalid["error"]
+        assert "nope" in unpublishable["error"]
+        # the draft was created before publishing failed
+        assert unpublishable["draft"]["id"] in (1, 2)
+        assert unpublishable["publish"] is None
+
+
+class TestTimings:
+    def test_tool_returns_stage_timings(self):
+        server = FakeServer({("POST", "/drafts"): {"id": 5}})
+        with server.patch():
+            result = asyncio.run(
+                mcp_server.post_draft_from_markdown(
+                    title="T", markdown="Body", timings=True
+                )
+            )
+        assert result["draft"] == {"id": 5}
+        stages = result["timings"]["stages"]
+        assert stages["post_draft"]["requests"] == 1
+        # the lazy client authenticated while fetching the user id
+        assert stages["user"]["requests"] >= 1
+
+    def test_no_timings_by_default(self):
+        server = FakeServer({("POST", "/drafts"): {"id": 5}})
+        with server.patch():
+            result = asyncio.run(
+                mcp_server.post_draft_from_markdown(title="T", markdown="Body")
+            )
+        assert "timings" not in result
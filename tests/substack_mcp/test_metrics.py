@@ -0,0 +1,110 @@
+"""Tests for the metrics exported by the MCP server."""
+
+import asyncio
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from substack.image_cache import ImageCache
+from substack.retry import RetryPolicy
+from tests.substack.fakes import FakeServer, make_api, make_response
+
+pytest.importorskip("mcp")
+
+from substack_mcp.metrics import (  # noqa: E402
+    ServerMetrics,
+    dump_metrics_periodically,
+    serve_metrics,
+)
+
+
+def record_some(metrics):
+    @metrics.instrument
+    async def good_tool():
+        return 1
+
+    @metrics.instrument
+    async def bad_tool():
+        raise ValueError("nope")
+
+    asyncio.run(good_tool())
+    with pytest.raises(ValueError):
+        asyncio.run(bad_tool())
+
+
+class TestServerMetrics:
+    def test_tool_calls_and_errors(self):
+        metrics = ServerMetrics()
+        record_some(metrics)
+        text = metrics.to_prometheus()
+        assert 'substack_mcp_tool_calls_total{tool="good_tool"} 1' in text
+        assert 'substack_mcp_tool_errors_total{tool="good_tool"} 0' in text
+        assert 'substack_mcp_tool_errors_total{tool="bad_tool"} 1' in text
+        assert (
+            'substack_mcp_tool_duration_seconds_bucket{tool="good_tool",le="+Inf"} 1'
+            in text
+        )
+
+    def test_upstream_requests_and_retries(self):
+        metrics = ServerMetrics()
+        responses = iter([make_response(503), make_response(200, [])])
+        server = FakeServer({("GET", "/drafts"): lambda *a, **k: next(responses)})
+        api = make_api(
+            server,
+            metrics=metrics.requests,
+            retry_policy=RetryPolicy(backoff_factor=0.001),
+        )
+        with server.patch():
+            api.get_drafts()
+        text = metrics.to_prometheus()
+        assert (
+            'substack_requests_total{method="GET",endpoint="/drafts",status="503"} 1'
+            in text
+        )
+        assert (
+            'substack_request_retries_total{method="GET",endpoint="/drafts"} 1' in text
+        )
+
+    def test_image_cache_hit_rate(self, tmp_path):
+        cache = ImageCache(str(tmp_path / "images.sqlite3"))
+        cache.put("url:a", "https://cdn/a")
+        cache.get("url:a")
+        cache.get("url:b")
+        metrics = ServerMetrics()
+        metrics.image_cache = lambda: cache
+        text = metrics.to_prometheus()
+        assert 'substack_image_cache_lookups_total{result="hit"} 1' in text
+        assert 'substack_image_cache_lookups_total{result="miss"} 1' in text
+        assert "substack_image_cache_entries 1" in text
+
+
+class TestExport:
+    def test_http_endpoint(self):
+        metrics = ServerMetrics()
+        record_some(metrics)
+        server = serve_metrics(metrics, port=0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                body = response.read().decode()
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+        finally:
+            server.shutdown()
+        assert 'substack_mcp_tool_calls_total{tool="bad_tool"} 1' in body
+
+    def test_file_dump(self, tmp_path):
+        metrics = ServerMetrics()
+        record_some(metrics)
+        path = tmp_path / "substack.prom"
+        stop = dump_metrics_periodically(metrics, str(path), interval=0.05)
+        try:
+            deadline = time.monotonic() + 5
+            while not path.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            stop.set()
+        assert "substack_mcp_tool_calls_total" in path.read_text()